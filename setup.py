@@ -19,7 +19,7 @@
 """The setup."""
 
 import os
-from distutils.core import setup
+from setuptools import setup
 
 README = open(os.path.join(os.path.dirname(__file__), 'README.rst')).read()
 
@@ -45,7 +45,8 @@ setup(
     long_description=README,
     url='http://github.com/facundobatista/yaswfp',
     packages=['yaswfp'],
-    scripts=["bin/swfparser"],
+    python_requires='>=3.10',
+    scripts=["bin/swfparser", "bin/swfsynth"],
     package_data={
         '': ['COPYING', 'README.rst'],
     }
@@ -0,0 +1,103 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Parse SWF files from asyncio code, without blocking the event loop."""
+
+import asyncio
+import concurrent.futures
+import os
+
+from .batch import BatchResult, _parse_chunk
+from .swfparser import IncrementalSWFParser, SWFParser
+
+
+async def aparse(reader, chunk_size=65536, executor=None, **options):
+    """Parse the SWF read from the given asyncio StreamReader.
+
+    The bytes are read in the event loop and decoded in the executor (by
+    default, the loop's one); a new chunk is not read until the previous
+    one is decoded, so a slow parsing also slows down the reading.
+
+    The options are the same than for IncrementalSWFParser.
+    """
+    loop = asyncio.get_running_loop()
+    parser = IncrementalSWFParser(**options)
+    tags = []
+    while not parser.finished:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            break
+        tags.extend(await loop.run_in_executor(executor, parser.feed, chunk))
+    parser.close()
+    return SWFParser._from_parts(parser.header, tags)
+
+
+async def aparse_many(paths, jobs=None, max_pending=None, timeout=None,
+                      executor=None, **options):
+    """Parse the given files, yielding the results in completion order.
+
+    The files are parsed by a pool of `jobs` processes (or the given
+    executor), with at most `max_pending` of them submitted at any time
+    (by default, twice `jobs`, or twice the quantity of CPUs if not given);
+    no new files are submitted until the consumer takes the results.  Each
+    result is a BatchResult, as in `batch.parse_many`.
+
+    If the executor is not a process pool the timeout is enforced here
+    waiting for each file (and the parser's deadline stops its work in the
+    thread).
+
+    The rest of the options are passed to `parsefile`.
+    """
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+    if max_pending is None:
+        max_pending = 2 * (jobs or os.cpu_count() or 1)
+    in_processes = isinstance(
+        executor, concurrent.futures.ProcessPoolExecutor)
+
+    paths = iter(paths)
+    pending = {}
+    try:
+        while True:
+            for path in paths:
+                future = loop.run_in_executor(
+                    executor, _parse_chunk, [path], timeout, options)
+                if timeout is not None and not in_processes:
+                    future = asyncio.ensure_future(
+                        asyncio.wait_for(future, timeout))
+                pending[future] = path
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+
+            done, _ = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    (result,) = future.result()
+                except Exception as err:
+                    # the worker itself failed
+                    result = BatchResult(path, None, err)
+                yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,111 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Parse many SWF files at once, using several processes."""
+
+import collections
+import concurrent.futures
+import signal
+import threading
+import time
+
+from .swfparser import parsefile
+
+# the result of parsing each file: the parsed SWF or the error, one is None
+BatchResult = collections.namedtuple("BatchResult", "path swf error")
+
+
+def _alarm_handler(signum, frame):
+    """Interrupt the parsing of a file that took too long."""
+    raise TimeoutError("parsing took too long")
+
+
+def _parse_chunk(paths, timeout, options):
+    """Parse several files, returning the results (this runs in a worker).
+
+    The timeout is enforced with a timer signal, which is only possible in
+    the main thread; otherwise (or without timers in the platform) the
+    parser checks the time by itself.
+    """
+    use_timer = (timeout is not None and hasattr(signal, 'setitimer') and
+                 threading.current_thread() is threading.main_thread())
+    if use_timer:
+        previous_handler = signal.signal(signal.SIGALRM, _alarm_handler)
+
+    results = []
+    try:
+        for path in paths:
+            file_options = options
+            try:
+                if use_timer:
+                    signal.setitimer(signal.ITIMER_REAL, timeout)
+                elif timeout is not None:
+                    file_options = dict(options,
+                                        deadline=time.monotonic() + timeout)
+                try:
+                    swf = parsefile(path, **file_options)
+                finally:
+                    if use_timer:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+            except Exception as err:
+                results.append(BatchResult(path, None, err))
+            else:
+                results.append(BatchResult(path, swf, None))
+    finally:
+        if use_timer:
+            # leave the process as it was
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+    return results
+
+
+def parse_many(paths, jobs=None, chunksize=1, timeout=None, **options):
+    """Parse the given files, yielding the results in completion order.
+
+    The files are spread across a pool of `jobs` processes (by default as
+    many as CPUs), sending them to each worker in groups of `chunksize`.
+    Each result is a BatchResult with the parsed SWF or the error found
+    for that file (a TimeoutError if it took more than `timeout` seconds;
+    out of the main thread, or in the platforms without timers, the
+    parser's deadline is used, which is checked between tags and records,
+    not at any moment).
+
+    The rest of the options are passed to `parsefile`.
+    """
+    paths = list(paths)
+    chunks = [paths[i:i + chunksize] for i in range(0, len(paths), chunksize)]
+
+    if jobs == 1:
+        # no need of other processes
+        for chunk in chunks:
+            yield from _parse_chunk(chunk, timeout, options)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(_parse_chunk, chunk, timeout, options): chunk
+                   for chunk in chunks}
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as err:
+                    # the worker itself failed (e.g. it was killed)
+                    results = [BatchResult(path, None, err)
+                               for path in futures[future]]
+                yield from results
+        finally:
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,370 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Measure the parser speed and memory, and compare with previous runs.
+
+Each benchmark is measured on the sample files and on synthetic files
+built to stress a specific part of the parser; the results can be saved
+as JSON and compared later against a new run, failing if something got
+slower (or uses more memory) than the configured threshold.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import warnings
+
+from . import serialize, synth
+from .helpers import BitConsumer
+from .swfparser import VERSION, SWFParser
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), 'tests', 'samples')
+
+# the synthetic files that stress each part of the parser, at scale 1 (the
+# quantity of structures is scaled, not the size of each one or depth)
+_NOTHING = dict(shapes=0, fonts=0, bitmaps=0, sprite_depth=0, actions=0)
+SUBSYSTEMS = {
+    'shape-records': dict(_NOTHING, shapes=200, edges=500),
+    'fonts': dict(_NOTHING, fonts=4, glyphs=500, edges=100),
+    'actions': dict(_NOTHING, actions=20000),
+    'bitmaps': dict(_NOTHING, bitmaps=4, bitmap_size=512),
+    'sprites': dict(_NOTHING, shapes=1, edges=1, sprite_depth=100),
+}
+
+_NOT_SCALED = ('edges', 'bitmap_size', 'sprite_depth')
+
+# the file decoded in several processes (many tags of similar cost), and
+# the quantity of processes (at least two, even if there is only one CPU)
+PARALLEL_MIX = dict(_NOTHING, shapes=400, edges=500)
+PARALLEL_JOBS = max(min(os.cpu_count() or 1, 4), 2)
+
+
+def _count_tags(tags):
+    """Count the tags, also those inside sprites."""
+    total = 0
+    pending = [tags]
+    while pending:
+        for tag in pending.pop():
+            total += 1
+            if tag.name == 'DefineSprite' and hasattr(tag, 'ControlTags'):
+                pending.append(tag.ControlTags)
+    return total
+
+
+def _scaled(mix, scale):
+    """Return the synthetic file mix with its quantities scaled."""
+    return {key: value if key in _NOT_SCALED else
+            max(int(value * scale), 1) if value else 0
+            for key, value in mix.items()}
+
+
+def _best_time(func, repeat):
+    """Return the best time of several calls to the function."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _memory(func):
+    """Return the peak memory and the memory blocks held by the result."""
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    del result
+    return peak, blocks
+
+
+def measure_parse(data, repeat):
+    """Measure the parsing of the SWF content."""
+    def parse():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return SWFParser(io.BytesIO(data))
+
+    tags = _count_tags(parse().tags)
+    seconds = _best_time(parse, repeat)
+    peak, blocks = _memory(parse)
+    return {
+        'seconds': seconds,
+        'mb_s': len(data) / seconds / 1024 ** 2,
+        'tags_s': tags / seconds,
+        'peak_memory': peak,
+        'blocks': blocks,
+    }
+
+
+def measure_parallel(data, repeat, jobs):
+    """Measure the parsing of the SWF content in several processes.
+
+    The sequential parsing is also measured, to get the speedup; the
+    memory is only the one used in this process.
+    """
+    def parse(jobs):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return SWFParser(io.BytesIO(data), jobs=jobs)
+
+    tags = _count_tags(parse(jobs).tags)
+    sequential = _best_time(lambda: parse(None), repeat)
+    seconds = _best_time(lambda: parse(jobs), repeat)
+    peak, blocks = _memory(lambda: parse(jobs))
+    return {
+        'seconds': seconds,
+        'mb_s': len(data) / seconds / 1024 ** 2,
+        'tags_s': tags / seconds,
+        'peak_memory': peak,
+        'blocks': blocks,
+        'jobs': jobs,
+        'sequential_seconds': sequential,
+        'speedup': sequential / seconds,
+    }
+
+
+def measure_load(data, repeat):
+    """Measure loading the serialized result of parsing the SWF content.
+
+    The parsing is also measured, to get the speedup of loading instead.
+    """
+    def parse():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return SWFParser(io.BytesIO(data))
+
+    serialized = serialize.dumps(parse())
+    tags = _count_tags(serialize.loads(serialized).tags)
+    parsing = _best_time(parse, repeat)
+    seconds = _best_time(lambda: serialize.loads(serialized), repeat)
+    peak, blocks = _memory(lambda: serialize.loads(serialized))
+    return {
+        'seconds': seconds,
+        'mb_s': len(data) / seconds / 1024 ** 2,
+        'tags_s': tags / seconds,
+        'peak_memory': peak,
+        'blocks': blocks,
+        'serialized_size': len(serialized),
+        'parse_seconds': parsing,
+        'speedup': parsing / seconds,
+    }
+
+
+def measure_bitreader(size, repeat):
+    """Measure the bit reader consuming values of different widths."""
+    data = random.Random(0).randbytes(size)
+    widths = [1, 3, 5, 7, 11, 13, 16, 17]
+    bits = 8 * size - 32
+
+    def consume():
+        bc = BitConsumer(io.BytesIO(data))
+        read = 0
+        i = 0
+        while read < bits:
+            quant = widths[i % len(widths)]
+            bc.s_get(quant) if i & 1 else bc.u_get(quant)
+            read += quant
+            i += 1
+
+    seconds = _best_time(consume, repeat)
+    peak, blocks = _memory(consume)
+    return {
+        'seconds': seconds,
+        'mb_s': size / seconds / 1024 ** 2,
+        'peak_memory': peak,
+        'blocks': blocks,
+    }
+
+
+def measure_decompression(data, repeat):
+    """Measure getting the header, which decompresses the whole content."""
+    def decompress():
+        parser = SWFParser.__new__(SWFParser)
+        parser._init_state(io.BytesIO(data), True, False)
+        parser._get_header()
+        return parser._src
+
+    seconds = _best_time(decompress, repeat)
+    peak, blocks = _memory(decompress)
+    return {
+        'seconds': seconds,
+        'mb_s': len(data) / seconds / 1024 ** 2,
+        'peak_memory': peak,
+        'blocks': blocks,
+    }
+
+
+def run(scale=1.0, repeat=3, samples_dir=SAMPLES_DIR, log=None):
+    """Run all the benchmarks, return the results.
+
+    The synthetic files are built with their quantities multiplied by
+    `scale`, and each time is the best of `repeat` runs.
+    """
+    def _log(name):
+        if log is not None:
+            log(name)
+
+    benchmarks = {}
+
+    for fname in sorted(os.listdir(samples_dir)):
+        _log(fname)
+        with open(os.path.join(samples_dir, fname), 'rb') as fh:
+            data = fh.read()
+        benchmarks['sample:' + fname] = measure_parse(data, repeat)
+
+    for name, mix in sorted(SUBSYSTEMS.items()):
+        _log(name)
+        data = synth.generate(compression='FWS', **_scaled(mix, scale))
+        benchmarks['subsystem:' + name] = measure_parse(data, repeat)
+
+    name = 'parallel-{}-jobs'.format(PARALLEL_JOBS)
+    _log(name)
+    data = synth.generate(compression='FWS',
+                          **_scaled(PARALLEL_MIX, scale))
+    benchmarks['subsystem:' + name] = measure_parallel(
+        data, repeat, PARALLEL_JOBS)
+
+    _log('serialized-load')
+    data = synth.generate(compression='FWS',
+                          **_scaled(SUBSYSTEMS['shape-records'], scale))
+    benchmarks['subsystem:serialized-load'] = measure_load(data, repeat)
+
+    _log('bit-reader')
+    benchmarks['subsystem:bit-reader'] = measure_bitreader(
+        max(int(200000 * scale), 64), repeat)
+
+    for compression in ('CWS', 'ZWS'):
+        name = 'decompression-' + compression
+        _log(name)
+        data = synth.generate(compression=compression,
+                              size=int(20 * 1024 ** 2 * scale))
+        benchmarks['subsystem:' + name] = measure_decompression(data, repeat)
+
+    return {
+        'version': VERSION,
+        'python': platform.python_version(),
+        'scale': scale,
+        'benchmarks': benchmarks,
+    }
+
+
+def compare(baseline, current, time_threshold=10.0, memory_threshold=10.0):
+    """Compare two runs, return the list of regressions found.
+
+    A benchmark regressed if it takes more than `time_threshold` percent
+    of time, or uses more than `memory_threshold` percent of memory, than
+    in the baseline. Each regression is a tuple with the benchmark name,
+    the measure, the baseline and current values, and the change percent.
+    """
+    if baseline.get('scale') != current.get('scale'):
+        raise ValueError("Can not compare runs with different scales")
+
+    regressions = []
+    for name, old in sorted(baseline['benchmarks'].items()):
+        new = current['benchmarks'].get(name)
+        if new is None:
+            continue
+        for measure, threshold in (('seconds', time_threshold),
+                                   ('peak_memory', memory_threshold)):
+            if not old[measure]:
+                continue
+            change = (new[measure] - old[measure]) * 100 / old[measure]
+            if change > threshold:
+                regressions.append(
+                    (name, measure, old[measure], new[measure], change))
+    return regressions
+
+
+def _show(results, baseline=None):
+    """Print the results, with the changes if a baseline is given."""
+    header = "{:32} {:>9} {:>9} {:>11} {:>10} {:>9}".format(
+        "benchmark", "seconds", "MB/s", "tags/s", "peak KB", "blocks")
+    print(header)
+    for name, values in sorted(results['benchmarks'].items()):
+        line = "{:32} {:9.4f} {:9.2f} {:>11} {:10.0f} {:9d}".format(
+            name, values['seconds'], values['mb_s'],
+            "{:.0f}".format(values['tags_s']) if 'tags_s' in values else "-",
+            values['peak_memory'] / 1024, values['blocks'])
+        if 'speedup' in values:
+            line += " {:.2f}x".format(values['speedup'])
+        if baseline is not None:
+            old = baseline['benchmarks'].get(name)
+            if old is not None and old['seconds']:
+                line += " {:+6.1f}%".format(
+                    (values['seconds'] - old['seconds']) * 100 /
+                    old['seconds'])
+        print(line)
+
+
+def main(argv=None):
+    """Run the benchmarks from the command line; return the exit code."""
+    parser = argparse.ArgumentParser(
+        description='Measure the parser speed and memory')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply the synthetic files size by this')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='take the best time of these runs (default 3)')
+    parser.add_argument('--save', metavar='FILE',
+                        help='save the results in this JSON file')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare against the results in this JSON file')
+    parser.add_argument('--time-threshold', type=float, default=10.0,
+                        help='percent of allowed slowdown (default 10)')
+    parser.add_argument('--memory-threshold', type=float, default=10.0,
+                        help='percent of allowed memory growth (default 10)')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        # run at the same scale, to be able to compare
+        args.scale = baseline.get('scale', args.scale)
+
+    results = run(scale=args.scale, repeat=args.repeat,
+                  log=lambda name: print("Running", name, file=sys.stderr))
+    _show(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.time_threshold,
+                              args.memory_threshold)
+        for name, measure, old, new, change in regressions:
+            print("REGRESSION {}: {} went from {:.4g} to {:.4g} "
+                  "({:+.1f}%)".format(name, measure, old, new, change))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
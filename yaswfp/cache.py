@@ -0,0 +1,252 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Caches for the parsing results."""
+
+import collections
+import copy
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import types
+
+from . import serialize, swfparser
+
+
+class DiskCache:
+    """Keep the parsing results in a directory, indexed by content.
+
+    The key is a hash of the file content, the parser version and the
+    parsing options, so it's safe to share the cache among different
+    files, options and versions of the parser (entries from other parser
+    versions are removed when the cache is created).
+
+    When the entries use more than `max_size` bytes, the least recently
+    used ones are removed.
+    """
+
+    suffix = ".swfcache"
+
+    def __init__(self, directory, max_size=1024 ** 3):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+        prefix = self._prefix()
+        for fname in os.listdir(directory):
+            if fname.endswith(self.suffix) and not fname.startswith(prefix):
+                self._remove(os.path.join(directory, fname))
+
+    def _prefix(self):
+        """Return the prefix of the entries for this parser and format."""
+        return "v{}-f{}-".format(swfparser.VERSION, serialize.FORMAT_VERSION)
+
+    def _remove(self, path):
+        """Remove an entry, that may be already gone."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def get_key(self, data, options):
+        """Return the key for the given content and parsing options."""
+        hasher = hashlib.sha256(data)
+        hasher.update(repr(sorted(options.items())).encode("utf8"))
+        return self._prefix() + hasher.hexdigest()
+
+    def get(self, key):
+        """Return the parsed SWF for the key, None if not in the cache."""
+        path = os.path.join(self.directory, key + self.suffix)
+        try:
+            with open(path, 'rb') as fh:
+                serialized = fh.read()
+        except FileNotFoundError:
+            return
+
+        try:
+            swf = serialize.loads(serialized)
+        except Exception:
+            # corrupted entry
+            self._remove(path)
+            return
+
+        # mark it as recently used
+        os.utime(path)
+        return swf
+
+    def put(self, key, swf):
+        """Store the parsed SWF under the key."""
+        path = os.path.join(self.directory, key + self.suffix)
+        serialized = serialize.dumps(swf)
+
+        # write it in a temp file and then rename, so it's atomic
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(serialized)
+            os.replace(temp_path, path)
+        except Exception:
+            self._remove(temp_path)
+            raise
+        self._evict()
+
+    def _evict(self):
+        """Remove the least recently used entries until fitting the size."""
+        entries = []
+        total = 0
+        for fname in os.listdir(self.directory):
+            if not fname.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, fname)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def fetch(self, src, options, parse):
+        """Return the parsed SWF from the cache, parsing it if not there.
+
+        The source can be a file path or a file object; `parse` receives a
+        file object and returns the parsed SWF.
+        """
+        if isinstance(src, (str, bytes, os.PathLike)):
+            with open(src, 'rb') as fh:
+                data = fh.read()
+        else:
+            data = src.read()
+
+        key = self.get_key(data, options)
+        swf = self.get(key)
+        if swf is None:
+            swf = parse(io.BytesIO(data))
+            self.put(key, swf)
+        return swf
+
+
+def _estimate_size(swf):
+    """Estimate the quantity of bytes used by the parsed structures."""
+    total = 0
+    pending = [swf.header, swf.tags]
+    while pending:
+        value = pending.pop()
+        total += sys.getsizeof(value)
+        if isinstance(value, swfparser.SWFObject):
+            # each object has its own class, that also uses memory
+            total += sys.getsizeof(value.__dict__) + sys.getsizeof(type(value))
+            pending.extend(getattr(value, name) for name in value._attribs)
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+        elif isinstance(value, (dict, types.MappingProxyType)):
+            pending.extend(value.values())
+    return total
+
+
+class MemoryCache:
+    """Keep the recently parsed files in memory.
+
+    The key is the file path, size and modification time, plus the parsing
+    options, so a changed file is parsed again. The least recently used
+    entries are dropped when there are more than `max_entries` or they
+    use more than (an estimation of) `max_size` bytes.
+
+    The cached structures are shared among all the callers, so they are
+    read only: the objects can not be modified, and lists and dicts are
+    returned as tuples and read only mappings. Each caller gets its own
+    copy of the diagnostics.
+
+    It's safe to use the same cache from several threads.
+    """
+
+    def __init__(self, max_entries=128, max_size=512 * 1024 ** 2):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.hits = self.misses = self.evictions = 0
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _freeze(self, swf):
+        """Return a read only version of the parsed SWF."""
+        swf.header = swfparser._freeze(swf.header)
+        swf.tags = swfparser._freeze(swf.tags)
+        swf.symbols = types.MappingProxyType(swf.symbols)
+        swf.characters = types.MappingProxyType(swf.characters)
+        return swf
+
+    def fetch(self, src, options, parse):
+        """Return the parsed SWF from the cache, parsing it if not there.
+
+        The source can be a file path or a file object (the latter are
+        not cached); `parse` receives a file object and returns the
+        parsed SWF.
+        """
+        if not isinstance(src, (str, bytes, os.PathLike)):
+            return parse(src)
+
+        stat = os.stat(src)
+        key = (os.path.realpath(src), stat.st_size, stat.st_mtime_ns,
+               tuple(sorted(options.items())))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            with open(src, 'rb') as fh:
+                swf = self._freeze(parse(fh))
+            size = _estimate_size(swf)
+            with self._lock:
+                if key not in self._entries:
+                    self._entries[key] = (swf, size)
+                    self.size += size
+                    self._evict()
+        else:
+            swf, _ = entry
+
+        # each caller gets its own parser object, sharing the structures
+        # (but not the diagnostics, that may be extended or merged)
+        swf = copy.copy(swf)
+        swf.diagnostics = swf.diagnostics.copy()
+        return swf
+
+    def _evict(self):
+        """Drop the least recently used entries until fitting the limits."""
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 self.size > self.max_size):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.size -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all the entries."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
@@ -0,0 +1,272 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Index the tags of many SWF files in a SQLite database."""
+
+import hashlib
+import io
+import os
+import sqlite3
+import struct
+
+from .swfparser import CHARACTER_TAGS, TAG_NAMES, VERSION, SWFParser
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    parser_version TEXT NOT NULL,
+    signature TEXT,
+    version INTEGER,
+    file_length INTEGER,
+    frame_xmin INTEGER,
+    frame_xmax INTEGER,
+    frame_ymin INTEGER,
+    frame_ymax INTEGER,
+    frame_rate INTEGER,
+    frame_count INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS tags (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    type INTEGER NOT NULL,
+    name TEXT,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    parent INTEGER,
+    character_id INTEGER,
+    sha1 TEXT NOT NULL,
+    error TEXT,
+    PRIMARY KEY (file_id, position)
+);
+CREATE INDEX IF NOT EXISTS tags_type ON tags (type);
+CREATE INDEX IF NOT EXISTS tags_name ON tags (name);
+"""
+
+
+def _iter_tags(data, base):
+    """Yield the tags found in the data, also those inside sprites.
+
+    For each tag yield its position (in the order found), type, offset of
+    the payload (`base` plus its position in the data), payload length,
+    sprite nesting depth, the position of its sprite (None for first
+    level tags), and the problem found with it (None if it's fine). The
+    End tags are not included.
+
+    A tag that goes beyond the data (or its sprite) is yielded with the
+    length that is available and the problem, and it's the last one of
+    its level, as the next tags can not be located.
+    """
+    position = 0
+    # (start, end, depth, parent) of the pieces of data still to scan
+    pending = [(0, len(data), 0, None)]
+    while pending:
+        pos, end, depth, parent = pending.pop()
+        sprites = []
+        while pos + 2 <= end:
+            tag_bf = struct.unpack_from("<H", data, pos)[0]
+            pos += 2
+            tag_type = tag_bf >> 6
+            if tag_type == 0:
+                break
+            tag_len = tag_bf & 0x3f
+            if tag_len == 0x3f:
+                if pos + 4 > end:
+                    yield (position, tag_type, base + pos, end - pos, depth,
+                           parent, "Tag header exceeds the data")
+                    break
+                tag_len = struct.unpack_from("<I", data, pos)[0]
+                pos += 4
+            if pos + tag_len > end:
+                yield (position, tag_type, base + pos, end - pos, depth,
+                       parent, "Tag {} exceeds the data".format(
+                           TAG_NAMES.get(tag_type, tag_type)))
+                break
+            yield position, tag_type, base + pos, tag_len, depth, parent, None
+            if tag_type == 39 and tag_len > 4:
+                # DefineSprite: the sprite id and frame count, then tags
+                sprites.append((pos + 4, pos + tag_len, depth + 1, position))
+            position += 1
+            pos += tag_len
+
+        # the sprites' content go after the tags of this level
+        pending.extend(reversed(sprites))
+
+
+class Catalog:
+    """A SQLite database with the tags of many SWF files.
+
+    There is a row for each file, with its header fields, in the `files`
+    table, and a row for each tag (also those inside sprites) in the
+    `tags` table, with its type, name, offset and length of the payload
+    (in the uncompressed file), depth of sprite nesting, position of the
+    sprite that holds it, character id for the tags that define one, a
+    hash of the payload, and the problem found with the tag, if any.
+
+    The tags are located but not decoded, so indexing is fast. The files
+    whose header can not be read have only their row, with the error;
+    the ones with broken tags have also the tags found until the broken
+    one (and the first problem as the file's error).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+        # databases created before the tags had errors
+        columns = [row[1] for row in self.query("PRAGMA table_info(tags)")]
+        if 'error' not in columns:
+            self.connection.execute("ALTER TABLE tags ADD COLUMN error TEXT")
+
+    def close(self):
+        """Close the database."""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def query(self, sql, params=()):
+        """Run a query in the database, returning all the rows."""
+        return self.connection.execute(sql, params).fetchall()
+
+    def index(self, paths, batch_size=100):
+        """Index the given files, return how many were (re)indexed.
+
+        The files already indexed are skipped if their size and
+        modification time did not change (or if changed but the content
+        is the same); they are also indexed again if the parser version
+        changed. Changes are committed every `batch_size` files.
+        """
+        cursor = self.connection.cursor()
+        indexed = 0
+        pending = 0
+        try:
+            for path in paths:
+                if self._index_file(cursor, path):
+                    indexed += 1
+                    pending += 1
+                    if pending >= batch_size:
+                        self.connection.commit()
+                        pending = 0
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self.connection.commit()
+        return indexed
+
+    def _index_file(self, cursor, path):
+        """Index a file if needed, return if it was indexed."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        row = cursor.execute(
+            "SELECT id, size, mtime_ns, sha256, parser_version "
+            "FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None:
+            file_id, size, mtime_ns, sha256, parser_version = row
+            if parser_version == VERSION and (size, mtime_ns) == (
+                    stat.st_size, stat.st_mtime_ns):
+                return False
+
+        with open(path, 'rb') as fh:
+            content = fh.read()
+        digest = hashlib.sha256(content).hexdigest()
+
+        if row is not None:
+            if parser_version == VERSION and sha256 == digest:
+                # touched but not changed
+                cursor.execute(
+                    "UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?",
+                    (stat.st_size, stat.st_mtime_ns, file_id))
+                return False
+            cursor.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+        header = None
+        tags = []
+        error = None
+        try:
+            header, parser = self._get_header(content)
+        except Exception as err:
+            error = repr(err)
+        else:
+            tags = self._get_tags(header, parser)
+            for tag in tags:
+                if tag[-1] is not None:
+                    error = tag[-1]
+                    break
+
+        fields = (path, stat.st_size, stat.st_mtime_ns, digest, VERSION)
+        if header is None:
+            fields += (None,) * 9
+        else:
+            fields += (header.Signature, header.Version, header.FileLength)
+            fields += tuple(header.FrameSize)
+            fields += (header.FrameRate, header.FrameCount)
+        cursor.execute(
+            "INSERT INTO files (path, size, mtime_ns, sha256, "
+            "parser_version, signature, version, file_length, frame_xmin, "
+            "frame_xmax, frame_ymin, frame_ymax, frame_rate, frame_count, "
+            "error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            fields + (error,))
+        file_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO tags (file_id, position, type, name, offset, length, "
+            "depth, parent, character_id, sha1, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((file_id,) + tag for tag in tags))
+        return True
+
+    def _get_header(self, content):
+        """Return the header of the SWF content, and its parser.
+
+        The parser is left with the (uncompressed) tags to be read; a file
+        that ends before it should is fine, its tags are indexed until
+        the data ends.
+        """
+        parser = SWFParser.__new__(SWFParser)
+        parser._init_state(io.BytesIO(content), True, False)
+        parser._allow_truncated = True
+        return parser._get_header(), parser
+
+    def _get_tags(self, header, parser):
+        """Return the rows for the tags after the header read by parser."""
+        base = parser._src.tell()
+        if header.Signature[0] in 'CZ':
+            # offsets in the uncompressed file, which has the first 8 bytes
+            base += 8
+        data = parser._src.read()
+
+        tags = []
+        for (position, tag_type, offset, length, depth, parent,
+             error) in _iter_tags(data, base):
+            name = TAG_NAMES.get(tag_type)
+            payload = data[offset - base:offset - base + length]
+            character_id = None
+            if name in CHARACTER_TAGS and length >= 2:
+                character_id = struct.unpack_from("<H", payload)[0]
+            tags.append((position, tag_type, name, offset, length, depth,
+                         parent, character_id,
+                         hashlib.sha1(payload).hexdigest(), error))
+        return tags
@@ -0,0 +1,110 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""The problems found while parsing, to be examined or aggregated."""
+
+import collections
+import warnings
+
+# the kind of problems
+UNKNOWN_TAG = 'unknown-tag'
+UNSUPPORTED_TAG = 'unsupported-tag'
+FAILING_TAG = 'failing-tag'
+ABC_INDEX = 'abc-index'
+INTERRUPTED = 'interrupted'
+TRUNCATED = 'truncated'
+
+# a problem: its code, the type of the tag, the offset of its payload in
+# the uncompressed file (None if not known), its length, and the details
+Diagnostic = collections.namedtuple(
+    "Diagnostic", "code tag_type offset length message")
+
+
+class Diagnostics:
+    """Collect the problems found while parsing a file.
+
+    Up to `limit` problems are kept in `events` (None means no limit), the
+    rest are only counted (in `counts`, by code, as all the problems, and
+    in `dropped`). If `warn` is True the kept problems are also issued as
+    warnings.
+    """
+
+    def __init__(self, limit=100, warn=True):
+        self.limit = limit
+        self.warn = warn
+        self.events = []
+        self.counts = collections.Counter()
+        self.dropped = 0
+
+    def add(self, code, tag_type, offset, length, message):
+        """Record a problem."""
+        self.counts[code] += 1
+        if self.limit is not None and len(self.events) >= self.limit:
+            self.dropped += 1
+            return
+        self.events.append(
+            Diagnostic(code, tag_type, offset, length, message))
+        if self.warn:
+            warnings.warn(message)
+
+    def extend(self, other):
+        """Add the problems recorded by other, as if they were found here.
+
+        This is used to bring the problems found by other processes.
+        """
+        kept = collections.Counter(event.code for event in other.events)
+        self.counts.update(other.counts - kept)
+        self.dropped += other.dropped
+        for event in other.events:
+            self.add(*event)
+
+    def merge(self, other):
+        """Add the problems of other diagnostics (e.g. of other file)."""
+        self.counts.update(other.counts)
+        self.dropped += other.dropped
+        for event in other.events:
+            if self.limit is not None and len(self.events) >= self.limit:
+                self.dropped += 1
+            else:
+                self.events.append(event)
+
+    def copy(self):
+        """Return a copy of these diagnostics, to be changed separately."""
+        result = Diagnostics(self.limit, self.warn)
+        result.events = list(self.events)
+        result.counts = self.counts.copy()
+        result.dropped = self.dropped
+        return result
+
+    def __add__(self, other):
+        result = Diagnostics(None, warn=False)
+        result.merge(self)
+        result.merge(other)
+        return result
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def summary(self):
+        """Return the quantity of problems by code as text lines."""
+        lines = ["{}: {}".format(code, quantity)
+                 for code, quantity in self.counts.most_common()]
+        if self.dropped:
+            lines.append("({} not kept)".format(self.dropped))
+        return lines
@@ -0,0 +1,222 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Export the parsed structures in machine readable formats."""
+
+import base64
+import hashlib
+import json
+import math
+import types
+
+from .swfparser import IncrementalSWFParser, SWFObject
+
+# strictly JSON (the converter turns the non finite floats into null)
+_encoder = json.JSONEncoder(separators=(',', ':'), allow_nan=False)
+
+
+class _Converter:
+    """Convert the parsed structures to something that JSON can hold."""
+
+    def __init__(self, base64_limit):
+        self.base64_limit = base64_limit
+
+    def payload(self, data):
+        """Describe a bytes payload, or include it if small enough."""
+        result = {'len': len(data)}
+        if self.base64_limit is not None and len(data) <= self.base64_limit:
+            result['base64'] = base64.b64encode(data).decode("ascii")
+        else:
+            result['sha1'] = hashlib.sha1(data).hexdigest()
+        return result
+
+    def value(self, value):
+        """Convert any value.
+
+        The containers are converted without recursion, as they can be
+        nested very deep (sprites inside sprites).
+        """
+        # the containers being converted: the container, its items, and
+        # the items already converted
+        stack = []
+        while True:
+            if isinstance(value, SWFObject):
+                items = [getattr(value, name) for name in value._attribs]
+            elif isinstance(value, (list, tuple)):
+                items = value
+            elif isinstance(value, (dict, types.MappingProxyType)):
+                items = list(value.values())
+            else:
+                items = None
+            if items:
+                stack.append((value, items, []))
+                value = items[0]
+                continue
+            if items is not None:
+                value = self.container(value, [])
+            elif isinstance(value, (bytes, bytearray)):
+                value = self.payload(value)
+            elif isinstance(value, float) and not math.isfinite(value):
+                value = None
+
+            # give the value to its container, closing the complete ones
+            while stack:
+                container, items, converted = stack[-1]
+                converted.append(value)
+                if len(converted) < len(items):
+                    value = items[len(converted)]
+                    break
+                stack.pop()
+                value = self.container(container, converted)
+            else:
+                return value
+
+    def container(self, container, converted):
+        """Build the converted container, with its converted items."""
+        if isinstance(container, SWFObject):
+            result = {'_name': container.name}
+            kind = type(container).__name__
+            if kind != container.name:
+                result['_kind'] = kind
+            result.update(zip(container._attribs, converted))
+            return result
+        if isinstance(container, (list, tuple)):
+            return converted
+        return {str(key): item for key, item in zip(container, converted)}
+
+
+def _encode(record):
+    """Encode the converted record as JSON."""
+    try:
+        return _encoder.encode(record)
+    except RecursionError:
+        # the encoder recurses, so very deep records are done here
+        return _encode_deep(record)
+
+
+def _encode_deep(record):
+    """Encode the converted record as JSON, without recursion."""
+    parts = []
+    # the pending (prefix, value) of the containers being encoded, and
+    # their closing text
+    stack = [(iter([('', record)]), '')]
+    while stack:
+        for prefix, value in stack[-1][0]:
+            parts.append(prefix)
+            if isinstance(value, dict):
+                parts.append('{')
+                stack.append((_dict_pairs(value), '}'))
+                break
+            if isinstance(value, list):
+                parts.append('[')
+                stack.append((_list_pairs(value), ']'))
+                break
+            parts.append(_encoder.encode(value))
+        else:
+            parts.append(stack.pop()[1])
+    return ''.join(parts)
+
+
+def _dict_pairs(value):
+    """Yield the prefix (separator and key) and value of each item."""
+    separator = ''
+    for key, item in value.items():
+        yield separator + _encoder.encode(key) + ':', item
+        separator = ','
+
+
+def _list_pairs(value):
+    """Yield the prefix (separator) and value of each item."""
+    separator = ''
+    for item in value:
+        yield separator, item
+        separator = ','
+
+
+def iter_json_lines(src, base64_limit=None, flatten=False, source=None,
+                    chunk_size=65536, **options):
+    """Yield one JSON document (a line, without the newline) per tag.
+
+    The file object is read in chunks and each tag is converted as soon as
+    it is decoded, so the memory used does not depend on the file size.
+    The first line describes the header.
+
+    Bytes payloads are replaced by their length and SHA1 hash, unless
+    they are not bigger than `base64_limit`, in which case they are
+    included in base64. The tags inside sprites are nested in the sprite's
+    ControlTags, or emitted as records after the sprite (with their depth
+    and parent's index) if `flatten` is True. If `source` is given, it's
+    included in every record.
+
+    The options are the same than for IncrementalSWFParser.
+    """
+    converter = _Converter(base64_limit)
+    parser = IncrementalSWFParser(**options)
+    extra = {} if source is None else {'_file': source}
+    index = 0
+
+    header_done = False
+    while not parser.finished:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        tags = parser.feed(chunk)
+
+        if not header_done and parser.header is not None:
+            header_done = True
+            record = converter.value(parser.header)
+            record.update(extra)
+            yield _encode(record)
+
+        for tag in tags:
+            # the tags to emit, with their depth and parent index
+            pending = [(tag, 0, None)]
+            while pending:
+                tag, depth, parent = pending.pop()
+                record = {'_index': index}
+                if flatten and tag.name == 'DefineSprite' and (
+                        type(tag).__name__ == tag.name):
+                    record.update(converter.value(_without_children(tag)))
+                    pending.extend((child, depth + 1, index)
+                                   for child in reversed(tag.ControlTags))
+                else:
+                    record.update(converter.value(tag))
+                if depth:
+                    record['_depth'] = depth
+                    record['_parent'] = parent
+                record.update(extra)
+                index += 1
+                yield _encode(record)
+    parser.close()
+
+
+def _without_children(sprite):
+    """Return a copy of the sprite without the control tags."""
+    obj = type(sprite)()
+    for name in sprite._attribs:
+        if name != 'ControlTags':
+            setattr(obj, name, getattr(sprite, name))
+    return obj
+
+
+def write_json_lines(src, fh, **kwargs):
+    """Write into the text file one JSON document per tag, one per line.
+
+    The parameters are the same than for `iter_json_lines`.
+    """
+    for line in iter_json_lines(src, **kwargs):
+        fh.write(line)
+        fh.write("\n")
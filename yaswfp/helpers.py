@@ -171,3 +171,34 @@ class ReadQuantityController:
             t = "Bad reading quantity: started={} should={} ended={}".format(
                 self._started, self._should, cur_pos)
             raise ValueError(t)
+
+
+class BoundedReader:
+    """A view of a file that can not read past the given position.
+
+    Reading at the end gives less bytes (or none), as with a file that
+    just ends there; seek and tell are those of the real file. Bounding
+    an already bounded reader wraps the real file directly.
+    """
+
+    def __init__(self, src, end):
+        if isinstance(src, BoundedReader):
+            end = min(end, src.end)
+            src = src.src
+        self.src = src
+        self.end = end
+
+    def read(self, size=-1):
+        """Read up to size bytes, never past the end."""
+        available = self.end - self.src.tell()
+        if size is None or size < 0 or size > available:
+            size = max(available, 0)
+        return self.src.read(size)
+
+    def seek(self, offset, whence=0):
+        """Go to that position of the file."""
+        return self.src.seek(offset, whence)
+
+    def tell(self):
+        """Return the position in the file."""
+        return self.src.tell()
@@ -0,0 +1,64 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Limits to the resources and time used when parsing."""
+
+import collections
+
+# the limits, None meaning no limit:
+# - max_decompressed_size: bytes of the uncompressed file content, and of
+#   each compressed bitmap data once uncompressed
+# - max_tag_size: bytes of each tag (checked before reading it)
+# - max_tags: quantity of tags, in all the levels
+# - max_shape_records: quantity of records in each shape
+# - max_string_length: bytes of each string
+# - max_depth: levels of sprites nested (if None, the parser's
+#   max_sprite_depth is used)
+Limits = collections.namedtuple(
+    "Limits", "max_decompressed_size max_tag_size max_tags "
+    "max_shape_records max_string_length max_depth", defaults=(None,) * 6)
+
+
+class LimitExceeded(Exception):
+    """The parsed file needs more resources than the allowed.
+
+    This is not a ValueError, so it's not handled as a failing tag: it
+    stops the whole parsing. The name of the limit is in `limit`, and the
+    value found in the file (that is bigger than the limit) in `value`.
+    """
+
+    def __init__(self, limit, value):
+        super().__init__("Limit exceeded: {} is {}".format(limit, value))
+        self.limit = limit
+        self.value = value
+
+    def __reduce__(self):
+        return (LimitExceeded, (self.limit, self.value))
+
+
+def check(limits, name, value):
+    """Raise LimitExceeded if the value is bigger than the limit."""
+    limit = getattr(limits, name)
+    if limit is not None and value > limit:
+        raise LimitExceeded(name, value)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The parsing did not finish before its deadline."""
+
+
+class Cancelled(Exception):
+    """The parsing was cancelled."""
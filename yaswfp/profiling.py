@@ -0,0 +1,348 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Statistics of where the parsing spends its time, I/O and memory."""
+
+import functools
+import time
+import tracemalloc
+
+# how each tag or action ended
+OK = 'ok'
+FAILED = 'failed'
+UNKNOWN = 'unknown'
+
+
+class Stats:
+    """The accumulated measures for a tag or action type."""
+
+    __slots__ = ('count', 'bytes', 'wall', 'cpu', 'ok', 'failed', 'unknown')
+
+    def __init__(self):
+        self.count = self.bytes = self.ok = self.failed = self.unknown = 0
+        self.wall = self.cpu = 0.0
+
+    def add(self, size, wall, cpu, outcome):
+        """Account one more item."""
+        self.count += 1
+        self.bytes += size
+        self.wall += wall
+        self.cpu += cpu
+        if outcome == OK:
+            self.ok += 1
+        elif outcome == FAILED:
+            self.failed += 1
+        else:
+            self.unknown += 1
+
+    def merge(self, other):
+        """Add the measures of other stats to these."""
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def __repr__(self):
+        return "Stats({})".format(", ".join(
+            "{}={!r}".format(name, getattr(self, name))
+            for name in self.__slots__))
+
+
+class Profile:
+    """The stats of the tags and actions parsed, by their type name.
+
+    The time of tags that hold others (like DefineSprite) includes the
+    time of the nested tags, which are also accounted by themselves.
+    """
+
+    def __init__(self):
+        self.tags = {}
+        self.actions = {}
+
+    def add_tag(self, name, size, wall, cpu, outcome):
+        """Account a parsed tag."""
+        stats = self.tags.get(name)
+        if stats is None:
+            stats = self.tags[name] = Stats()
+        stats.add(size, wall, cpu, outcome)
+
+    def add_action(self, name, size, wall, cpu, outcome):
+        """Account a parsed action."""
+        stats = self.actions.get(name)
+        if stats is None:
+            stats = self.actions[name] = Stats()
+        stats.add(size, wall, cpu, outcome)
+
+    def merge(self, other):
+        """Add the stats of other profile to this one."""
+        for mine, theirs in ((self.tags, other.tags),
+                             (self.actions, other.actions)):
+            for name, stats in theirs.items():
+                if name not in mine:
+                    mine[name] = Stats()
+                mine[name].merge(stats)
+
+    def table(self):
+        """Return the stats as text lines, the slowest first."""
+        lines = []
+        for title, group in (("Tag", self.tags), ("Action", self.actions)):
+            if not group:
+                continue
+            lines.append("{:32} {:>7} {:>10} {:>9} {:>9} {:>5} {:>5} "
+                         "{:>5}".format(title, "count", "bytes", "wall ms",
+                                        "cpu ms", "ok", "fail", "unkn"))
+            for name, stats in sorted(group.items(),
+                                      key=lambda item: -item[1].wall):
+                lines.append(
+                    "{:32} {:7d} {:10d} {:9.2f} {:9.2f} {:5d} {:5d} "
+                    "{:5d}".format(name[:32], stats.count, stats.bytes,
+                                   stats.wall * 1000, stats.cpu * 1000,
+                                   stats.ok, stats.failed, stats.unknown))
+        return lines
+
+
+class IOStats:
+    """The accumulated I/O calls for a tag type.
+
+    The sizes of the reads are counted in `read_sizes` (the sizes bigger
+    than 8 bytes are rounded up to a power of two).
+    """
+
+    __slots__ = ('reads', 'read_bytes', 'read_sizes', 'seeks',
+                 'backward_seeks', 'tells', 'time')
+
+    def __init__(self):
+        self.reads = self.read_bytes = 0
+        self.seeks = self.backward_seeks = self.tells = 0
+        self.read_sizes = {}
+        self.time = 0.0
+
+    def __repr__(self):
+        return "IOStats({})".format(", ".join(
+            "{}={!r}".format(name, getattr(self, name))
+            for name in self.__slots__))
+
+
+class IOTrace:
+    """Wrap a file object, accounting the calls done to it.
+
+    The calls are accounted by the tag type being parsed in that moment
+    (set in `current` by the parser). The wrapped object can be replaced
+    at any time changing `fh`.
+    """
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.current = 'Header'
+        self.stats = {}
+
+    def __getstate__(self):
+        """Support pickling, leaving out the wrapped file."""
+        state = self.__dict__.copy()
+        state['fh'] = None
+        return state
+
+    def _get_stats(self):
+        """Return the stats for the current tag type."""
+        stats = self.stats.get(self.current)
+        if stats is None:
+            stats = self.stats[self.current] = IOStats()
+        return stats
+
+    def read(self, size=-1):
+        """Read from the wrapped file."""
+        start = time.perf_counter()
+        data = self.fh.read(size)
+        elapsed = time.perf_counter() - start
+
+        stats = self._get_stats()
+        stats.time += elapsed
+        stats.reads += 1
+        quant = len(data)
+        stats.read_bytes += quant
+        if quant > 8:
+            quant = 1 << (quant - 1).bit_length()
+        stats.read_sizes[quant] = stats.read_sizes.get(quant, 0) + 1
+        return data
+
+    def seek(self, offset, whence=0):
+        """Seek in the wrapped file."""
+        start = time.perf_counter()
+        previous = self.fh.tell()
+        position = self.fh.seek(offset, whence)
+        elapsed = time.perf_counter() - start
+
+        stats = self._get_stats()
+        stats.time += elapsed
+        stats.seeks += 1
+        if position < previous:
+            stats.backward_seeks += 1
+        return position
+
+    def tell(self):
+        """Tell the position of the wrapped file."""
+        start = time.perf_counter()
+        position = self.fh.tell()
+        elapsed = time.perf_counter() - start
+
+        stats = self._get_stats()
+        stats.time += elapsed
+        stats.tells += 1
+        return position
+
+    def table(self):
+        """Return the stats as text lines, the most called first."""
+        lines = ["{:32} {:>8} {:>10} {:>8} {:>6} {:>8} {:>9} {}".format(
+            "Tag", "reads", "bytes", "seeks", "back", "tells", "io ms",
+            "read sizes")]
+        for name, stats in sorted(
+                self.stats.items(),
+                key=lambda item: -(item[1].reads + item[1].seeks +
+                                   item[1].tells)):
+            sizes = " ".join("{}:{}".format(size, count) for size, count in
+                             sorted(stats.read_sizes.items()))
+            lines.append(
+                "{:32} {:8d} {:10d} {:8d} {:6d} {:8d} {:9.2f} {}".format(
+                    name[:32], stats.reads, stats.read_bytes, stats.seeks,
+                    stats.backward_seeks, stats.tells, stats.time * 1000,
+                    sizes))
+        return lines
+
+
+class MemoryStats:
+    """The accumulated memory kept by a tag or record type."""
+
+    __slots__ = ('count', 'bytes', 'blocks')
+
+    def __init__(self):
+        self.count = self.bytes = self.blocks = 0
+
+    def __repr__(self):
+        return "MemoryStats({})".format(", ".join(
+            "{}={!r}".format(name, getattr(self, name))
+            for name in self.__slots__))
+
+
+# the record of what is allocated in a tag before creating any object
+_NO_RECORD = '(other)'
+
+
+class MemoryProfile:
+    """The memory kept by the parsed structures, by tag and record type.
+
+    It uses tracemalloc: the traces are taken (and cleared) each time the
+    parser is about to create an object, and when entering and leaving a
+    tag or a function that builds objects, so the blocks still allocated
+    are accounted to the object being built when they were allocated, and
+    to its tag. The record type is the name of that object (with its kind
+    if it's not a regular one, like `DefineShape [FailingObject]`). The
+    memory of the tags inside a sprite is accounted to them, not to the
+    sprite.
+    """
+
+    def __init__(self):
+        self.tags = {}
+        self.records = {}
+        # the tag and the record being built, in each function entered
+        self._frames = []
+
+    def __getstate__(self):
+        """Support pickling, leaving out the tracing state."""
+        state = self.__dict__.copy()
+        state['_frames'] = []
+        return state
+
+    def start(self):
+        """Start tracing the memory allocations."""
+        if tracemalloc.is_tracing():
+            raise ValueError("tracemalloc is already tracing")
+        tracemalloc.start()
+
+    def stop(self):
+        """Stop tracing the memory allocations."""
+        self._frames.clear()
+        tracemalloc.stop()
+
+    def enter(self, tag=None):
+        """Enter a tag (if given) or a function that builds objects."""
+        self._account()
+        if tag is not None:
+            self._frames.append([tag, _NO_RECORD])
+        elif self._frames:
+            self._frames.append(list(self._frames[-1]))
+        else:
+            # not inside a tag (like the header), not accounted
+            self._frames.append([None, None])
+
+    def exit(self, tag=None):
+        """Leave the tag or function, back to what was being built."""
+        self._account()
+        self._frames.pop()
+        if tag is not None:
+            self.tags[tag].count += 1
+
+    def building(self, kind, name):
+        """Account an object about to be created, built from now on."""
+        self._account()
+        if not self._frames or self._frames[-1][0] is None:
+            return
+        if kind != name:
+            name = "{} [{}]".format(name, kind)
+        self._frames[-1][1] = name
+        self._get(self.records, name).count += 1
+
+    def wrap(self, func):
+        """Return the function, entering and leaving it when called."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self.enter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.exit()
+        return wrapper
+
+    def _get(self, group, name):
+        """Return the stats of the name in the group, created if needed."""
+        stats = group.get(name)
+        if stats is None:
+            stats = group[name] = MemoryStats()
+        return stats
+
+    def _account(self):
+        """Account the blocks allocated since the last time."""
+        traces = tracemalloc.take_snapshot().traces
+        tracemalloc.clear_traces()
+        if not self._frames or self._frames[-1][0] is None:
+            return
+        tag, record = self._frames[-1]
+        size = sum(trace.size for trace in traces)
+        for stats in (self._get(self.tags, tag),
+                      self._get(self.records, record)):
+            stats.bytes += size
+            stats.blocks += len(traces)
+
+    def table(self, top=20):
+        """Return the `top` consumers as text lines, the biggest first."""
+        lines = []
+        for title, group in (("Tag", self.tags), ("Record", self.records)):
+            if not group:
+                continue
+            lines.append("{:48} {:>7} {:>12} {:>9}".format(
+                title, "count", "bytes", "blocks"))
+            for name, stats in sorted(group.items(),
+                                      key=lambda item: -item[1].bytes)[:top]:
+                lines.append("{:48} {:7d} {:12d} {:9d}".format(
+                    name[:48], stats.count, stats.bytes, stats.blocks))
+        return lines
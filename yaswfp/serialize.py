@@ -0,0 +1,387 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Store and load the parsing results in a compact binary form.
+
+The format is a magic string and a format version, followed by the
+header, the tags list and the parsing outcome (the diagnostics, and if
+the result is partial) encoded as values, each one a type byte and then:
+
+- small ints: nothing, the value is in the type byte itself
+- other ints: zigzag encoded varints
+- floats: 8 bytes double
+- str and bytes: varint length and the raw content
+- lists, tuples, dicts: varint count and the items
+- objects: their layout and then the values of their attributes
+
+The layout of an object is its kind, name and attribute names; they are
+in a table built while writing: each layout is defined the first time
+it is used (with its names, in a string table built in the same way),
+and then referenced by its index. So for most of the objects only their
+values are written, and they are loaded without dispatching on each
+attribute name.
+"""
+
+import struct
+import types
+
+from .diagnostics import Diagnostic, Diagnostics
+from .swfparser import SWFObject, SWFParser, _rebuilt_class
+
+MAGIC = b"YSWP"
+FORMAT_VERSION = 3
+
+# the value types
+(T_NONE, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_BYTES, T_LIST, T_TUPLE,
+ T_DICT, T_OBJECT) = range(11)
+
+# the type bytes from here are the small ints, from _MIN_SMALL_INT
+_SMALL_INT = 16
+_MIN_SMALL_INT = -64
+_MAX_SMALL_INT = 255 - _SMALL_INT + _MIN_SMALL_INT
+_SMALL_INT_BIAS = _SMALL_INT - _MIN_SMALL_INT
+
+_double = struct.Struct("<d")
+
+
+class _Writer:
+    """Encode the values in a buffer."""
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.strings = {}
+        self.layouts = {}
+
+    def varint(self, number):
+        """Write an unsigned integer, 7 bits per byte."""
+        buf = self.buf
+        while number > 0x7F:
+            buf.append(number & 0x7F | 0x80)
+            number >>= 7
+        buf.append(number)
+
+    def string_ref(self, text):
+        """Write a reference to the string table, adding it if new."""
+        idx = self.strings.get(text)
+        if idx is None:
+            idx = self.strings[text] = len(self.strings)
+            self.varint(idx)
+            raw = text.encode("utf8")
+            self.varint(len(raw))
+            self.buf += raw
+        else:
+            self.varint(idx)
+
+    def layout_ref(self, obj):
+        """Write a reference to the object's layout, defining it if new."""
+        attribs = tuple(obj._attribs)
+        layout = (type(obj).__name__, obj.name, attribs)
+        idx = self.layouts.get(layout)
+        if idx is None:
+            idx = self.layouts[layout] = len(self.layouts)
+            self.varint(idx)
+            self.string_ref(layout[0])
+            self.string_ref(layout[1])
+            self.varint(len(attribs))
+            for name in attribs:
+                self.string_ref(name)
+        else:
+            self.varint(idx)
+        return attribs
+
+    def value(self, value):
+        """Write any value.
+
+        The containers are written without recursion, as they can be
+        nested very deep (sprites inside sprites).
+        """
+        buf = self.buf
+        varint = self.varint
+        # the iterators of the containers being written
+        stack = [iter((value,))]
+        while stack:
+            for value in stack[-1]:
+                if value is None:
+                    buf.append(T_NONE)
+                elif value is True:
+                    buf.append(T_TRUE)
+                elif value is False:
+                    buf.append(T_FALSE)
+                elif isinstance(value, int):
+                    if _MIN_SMALL_INT <= value <= _MAX_SMALL_INT:
+                        buf.append(value + _SMALL_INT_BIAS)
+                    else:
+                        buf.append(T_INT)
+                        varint(value << 1 if value >= 0
+                               else (-value << 1) - 1)
+                elif isinstance(value, float):
+                    buf.append(T_FLOAT)
+                    buf += _double.pack(value)
+                elif isinstance(value, str):
+                    buf.append(T_STR)
+                    raw = value.encode("utf8")
+                    varint(len(raw))
+                    buf += raw
+                elif isinstance(value, (bytes, bytearray)):
+                    buf.append(T_BYTES)
+                    varint(len(value))
+                    buf += value
+                elif isinstance(value, SWFObject):
+                    buf.append(T_OBJECT)
+                    attribs = self.layout_ref(value)
+                    if attribs:
+                        stack.append(
+                            iter([getattr(value, name) for name in attribs]))
+                        break
+                elif isinstance(value, (list, tuple)):
+                    buf.append(T_LIST if isinstance(value, list) else T_TUPLE)
+                    varint(len(value))
+                    stack.append(iter(value))
+                    break
+                elif isinstance(value, (dict, types.MappingProxyType)):
+                    buf.append(T_DICT)
+                    varint(len(value))
+                    stack.append(self._items(value))
+                    break
+                else:
+                    raise TypeError("Can not serialize {!r}".format(value))
+            else:
+                # the container is complete
+                stack.pop()
+
+    def _items(self, mapping):
+        """Yield the keys and values of the mapping, to be written."""
+        for key, item in mapping.items():
+            yield key
+            yield item
+
+
+def _varint_rest(data, pos, first):
+    """Finish reading a varint whose first byte was bigger than 0x7F.
+
+    Return the number and the position after it.
+    """
+    result = first & 0x7F
+    shift = 7
+    byte = first
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+    return result, pos
+
+
+class _Reader:
+    """Decode the values from a buffer."""
+
+    def __init__(self, data, pos):
+        self.data = data
+        self.pos = pos
+        self.strings = []
+        # each layout is the class of the objects and their attribute names
+        self.layouts = []
+
+    def varint(self):
+        """Read an unsigned integer."""
+        number = self.data[self.pos]
+        self.pos += 1
+        if number > 0x7F:
+            number, self.pos = _varint_rest(self.data, self.pos, number)
+        return number
+
+    def raw(self):
+        """Read a length and those bytes."""
+        size = self.varint()
+        start = self.pos
+        self.pos = end = start + size
+        if end > len(self.data):
+            raise ValueError("Serialized data is truncated")
+        return self.data[start:end]
+
+    def string_ref(self):
+        """Read a reference to the string table, that may define it."""
+        idx = self.varint()
+        strings = self.strings
+        if idx == len(strings):
+            strings.append(self.raw().decode("utf8"))
+        return strings[idx]
+
+    def layout(self):
+        """Read the definition of a new layout, adding it to the table."""
+        klass = _rebuilt_class(self.string_ref(), self.string_ref())
+        attribs = tuple(self.string_ref() for _ in range(self.varint()))
+        self.layouts.append((klass, attribs))
+
+    def value(self):
+        """Read any value.
+
+        The containers are read without recursion, as they can be nested
+        very deep (sprites inside sprites).
+        """
+        data = self.data
+        size = len(data)
+        pos = self.pos
+        layouts = self.layouts
+        # the containers being filled: their type, the values read, how
+        # many values they have, and (for objects) their layout
+        stack = []
+        while True:
+            value_type = data[pos]
+            pos += 1
+            if value_type >= _SMALL_INT:
+                value = value_type - _SMALL_INT_BIAS
+            elif value_type == T_OBJECT:
+                idx = data[pos]
+                pos += 1
+                if idx > 0x7F:
+                    idx, pos = _varint_rest(data, pos, idx)
+                if idx == len(layouts):
+                    self.pos = pos
+                    self.layout()
+                    pos = self.pos
+                layout = layouts[idx]
+                if layout[1]:
+                    stack.append((T_OBJECT, [], len(layout[1]), layout))
+                    continue
+                value = layout[0].__new__(layout[0])
+                value.__dict__['_attribs'] = []
+            elif value_type == T_STR or value_type == T_BYTES:
+                length = data[pos]
+                pos += 1
+                if length > 0x7F:
+                    length, pos = _varint_rest(data, pos, length)
+                end = pos + length
+                if end > size:
+                    raise ValueError("Serialized data is truncated")
+                value = data[pos:end]
+                pos = end
+                if value_type == T_STR:
+                    value = value.decode("utf8")
+                else:
+                    value = bytes(value)
+            elif value_type == T_INT:
+                number = data[pos]
+                pos += 1
+                if number > 0x7F:
+                    number, pos = _varint_rest(data, pos, number)
+                value = number >> 1 if not number & 1 else -((number + 1) >> 1)
+            elif (value_type == T_LIST or value_type == T_TUPLE or
+                    value_type == T_DICT):
+                count = data[pos]
+                pos += 1
+                if count > 0x7F:
+                    count, pos = _varint_rest(data, pos, count)
+                if count:
+                    if value_type == T_DICT:
+                        count *= 2
+                    stack.append((value_type, [], count, None))
+                    continue
+                value = ([] if value_type == T_LIST else
+                         () if value_type == T_TUPLE else {})
+            elif value_type == T_NONE:
+                value = None
+            elif value_type == T_TRUE:
+                value = True
+            elif value_type == T_FALSE:
+                value = False
+            elif value_type == T_FLOAT:
+                (value,) = _double.unpack_from(data, pos)
+                pos += 8
+            else:
+                raise ValueError("Unknown value type: {}".format(value_type))
+
+            # put the value in its container, closing the complete ones
+            while stack:
+                container_type, items, count, layout = stack[-1]
+                items.append(value)
+                if len(items) < count:
+                    break
+                stack.pop()
+                if container_type == T_OBJECT:
+                    klass, attribs = layout
+                    value = klass.__new__(klass)
+                    values = value.__dict__
+                    values['_attribs'] = list(attribs)
+                    values.update(zip(attribs, items))
+                elif container_type == T_TUPLE:
+                    value = tuple(items)
+                elif container_type == T_DICT:
+                    pairs = iter(items)
+                    value = dict(zip(pairs, pairs))
+                else:
+                    value = items
+            else:
+                self.pos = pos
+                return value
+
+
+def dumps(swf):
+    """Return the parsed SWF serialized."""
+    writer = _Writer()
+    writer.buf += MAGIC
+    writer.varint(FORMAT_VERSION)
+    writer.value(swf.header)
+    writer.value(swf.tags)
+    diagnostics = swf.diagnostics
+    writer.value({
+        'diagnostics_limit': diagnostics.limit,
+        'diagnostics_events': diagnostics.events,
+        'diagnostics_counts': diagnostics.counts,
+        'diagnostics_dropped': diagnostics.dropped,
+        'partial': swf.partial,
+        'truncated_at': swf.truncated_at,
+    })
+    return bytes(writer.buf)
+
+
+def loads(data):
+    """Return the parsed SWF from its serialized form."""
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not serialized SWF data")
+    reader = _Reader(data, len(MAGIC))
+    format_version = reader.varint()
+    if format_version != FORMAT_VERSION:
+        raise ValueError(
+            "Unsupported serialization format: {}".format(format_version))
+    try:
+        header = reader.value()
+        tags = reader.value()
+        outcome = reader.value()
+    except IndexError:
+        raise ValueError("Serialized data is truncated")
+    swf = SWFParser._from_parts(header, tags)
+
+    # the problems were already issued when parsing
+    diagnostics = swf.diagnostics = Diagnostics(
+        outcome['diagnostics_limit'], warn=False)
+    diagnostics.events = [
+        Diagnostic(*event) for event in outcome['diagnostics_events']]
+    diagnostics.counts.update(outcome['diagnostics_counts'])
+    diagnostics.dropped = outcome['diagnostics_dropped']
+    swf.partial = outcome['partial']
+    swf.truncated_at = outcome['truncated_at']
+    return swf
+
+
+def dump(swf, fh):
+    """Write the parsed SWF, serialized, into the file object."""
+    fh.write(dumps(swf))
+
+
+def load(fh):
+    """Read a parsed SWF from the file object."""
+    return loads(fh.read())
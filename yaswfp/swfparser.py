@@ -29,13 +29,18 @@ is found.
 """
 
 import collections
+import concurrent.futures
+import contextvars
 import io
-import warnings
+import lzma
+import struct
+import time
+import types
 import zlib
 
 from .helpers import (
     BitConsumer,
-    ReadQuantityController,
+    BoundedReader,
     unpack_si16,
     unpack_ui16,
     unpack_ui32,
@@ -46,6 +51,12 @@ from .helpers import (
     unpack_float,
     unpack_double,
 )
+from .diagnostics import (
+    ABC_INDEX, FAILING_TAG, INTERRUPTED, TRUNCATED, UNKNOWN_TAG,
+    UNSUPPORTED_TAG, Diagnostics)
+from .limits import (
+    Cancelled, DeadlineExceeded, LimitExceeded, Limits, check as check_limit)
+from .profiling import IOTrace, MemoryProfile, Profile
 
 VERSION = "0.9.3"
 
@@ -256,23 +267,349 @@ def _repr(obj):
 class SWFObject:
     """A super class for all the objects created here."""
 
+    _frozen = False
+
     def __init__(self):
         self._attribs = []
 
     def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError("Read only object: {}".format(self.name))
         if name != "_attribs":
             if name not in self._attribs:
                 self._attribs.append(name)
         super(SWFObject, self).__setattr__(name, value)
 
+    def __reduce__(self):
+        """Support pickling, even if the classes are created on the fly."""
+        attribs = tuple(self._attribs)
+        values = tuple([getattr(self, name) for name in attribs])
+        return (_rebuild_object,
+                (type(self).__name__, self.name, attribs, values))
+
+
+# the name of the tag being decoded and the fields needed from it, when
+# the caller asked only for some fields (see SWFParser)
+_projection = contextvars.ContextVar('projection', default=None)
+
+# the profiling.MemoryProfile told about each object created, if any
+_memory_profile = contextvars.ContextVar('memory_profile', default=None)
+
+
+class _FieldsComplete(Exception):
+    """All the needed fields of the tag were decoded."""
+
+    def __init__(self, obj):
+        super().__init__(obj)
+        self.obj = obj
+
+
+class _ProjectedObject(SWFObject):
+    """A tag that interrupts its decoding when having the needed fields."""
+
+    _needed = frozenset()
+
+    def __setattr__(self, name, value):
+        super(_ProjectedObject, self).__setattr__(name, value)
+        if name in self._needed and self._needed.issubset(self._attribs):
+            # don't interrupt again if the fields are changed later
+            object.__setattr__(self, '_needed', frozenset())
+            raise _FieldsComplete(self)
+
 
 def _make_object(name):
     """Create a generic object for the tags."""
-    klass = type(name, (SWFObject,),
-                 {'__str__': _str, '__repr__': _repr, 'name': name})
+    memory = _memory_profile.get()
+    if memory is not None:
+        memory.building(name, name)
+    projection = _projection.get()
+    if projection is not None and projection[0] == name:
+        klass = type(name, (_ProjectedObject,),
+                     {'__str__': _str, '__repr__': _repr, 'name': name,
+                      '_needed': projection[1]})
+    else:
+        klass = type(name, (SWFObject,),
+                     {'__str__': _str, '__repr__': _repr, 'name': name})
     return klass()
 
 
+def _freeze(value):
+    """Make the value read only (for objects) or a read only copy of it.
+
+    Objects are frozen in place, lists and dicts are replaced by tuples
+    and read only mappings, all the way down (without recursion, as they
+    can be nested very deep).
+    """
+    # the containers being frozen: the container, its items, and the
+    # items already frozen
+    stack = []
+    while True:
+        if isinstance(value, SWFObject):
+            items = [getattr(value, name) for name in value._attribs]
+        elif isinstance(value, (list, tuple)):
+            items = value
+        elif isinstance(value, dict):
+            items = list(value.values())
+        else:
+            items = None
+        if items:
+            stack.append((value, items, []))
+            value = items[0]
+            continue
+        if items is not None:
+            value = _frozen_container(value, ())
+
+        # give the value to its container, closing the complete ones
+        while stack:
+            container, items, frozen = stack[-1]
+            frozen.append(value)
+            if len(frozen) < len(items):
+                value = items[len(frozen)]
+                break
+            stack.pop()
+            value = _frozen_container(container, frozen)
+        else:
+            return value
+
+
+def _frozen_container(container, frozen):
+    """Return the read only version of the container, with its items."""
+    if isinstance(container, SWFObject):
+        for name, item in zip(container._attribs, frozen):
+            object.__setattr__(container, name, item)
+        object.__setattr__(container, '_attribs', tuple(container._attribs))
+        object.__setattr__(container, '_frozen', True)
+        return container
+    if isinstance(container, dict):
+        return types.MappingProxyType(dict(zip(container, frozen)))
+    return tuple(frozen)
+
+
+def _make_raw_object(kind, name):
+    """Create an object to hold the raw payload of something not parsed.
+
+    The kind is the class name (UnknownObject, FailingObject,
+    UnknownAction) while the name is what couldn't be parsed.
+    """
+    memory = _memory_profile.get()
+    if memory is not None:
+        memory.building(kind, name)
+    _dict = {'__str__': _repr, '__repr__': _repr, 'name': name}
+    return type(kind, (SWFObject,), _dict)()
+
+
+def _outcome(obj):
+    """Tell if the object was parsed ok, failed, or is unknown."""
+    kind = type(obj).__name__
+    if kind == 'FailingObject':
+        return 'failed'
+    if kind in ('UnknownObject', 'UnknownAction'):
+        return 'unknown'
+    return 'ok'
+
+
+# the classes of the rebuilt objects, by kind and name
+_rebuilt_classes = {}
+
+
+def _rebuilt_class(kind, name):
+    """Return the class for the rebuilt objects of that kind and name.
+
+    The parser creates a class for each object, but the rebuilt ones
+    share it, as creating a class is much slower than an instance.
+    """
+    klass = _rebuilt_classes.get((kind, name))
+    if klass is None:
+        if kind == name:
+            obj = _make_object(name)
+        else:
+            obj = _make_raw_object(kind, name)
+        klass = _rebuilt_classes[kind, name] = type(obj)
+    return klass
+
+
+def _rebuild_object(kind, name, attribs, values):
+    """Create again an object from its kind, name and attributes."""
+    klass = _rebuilt_class(kind, name)
+    obj = klass.__new__(klass)
+    obj.__dict__['_attribs'] = list(attribs)
+    obj.__dict__.update(zip(attribs, values))
+    return obj
+
+
+# the attribute that holds the character id in each defining tag
+CHARACTER_ID_ATTRIBS = ('CharacterID', 'CharacterId', 'ShapeId', 'FontID',
+                        'ButtonId')
+
+# the tags that define a character (others, like DefineFontInfo or
+# DefineButtonCxform, have the id of a character defined before)
+CHARACTER_TAGS = frozenset(TAG_NAMES[tag_type] for tag_type in (
+    2, 6, 7, 10, 11, 14, 20, 21, 22, 32, 33, 34, 35, 36, 37, 39, 46, 48, 60,
+    75, 83, 84, 87, 90, 91))
+
+# the tags up to this size are decoded from a copy of exactly their bytes;
+# the bigger ones (where copying would cost) from the source itself, but
+# without reading past their end
+BUFFERED_TAG_SIZE = 64 * 1024
+
+
+def _get_abc_class_names(abc_data):
+    """Return the fully qualified names of the classes in an ABC block.
+
+    Only what is needed to reach the instances' names is decoded from the
+    ActionScript Byte Code (the constant pool, and the method, metadata
+    and instance info lists); everything else is skipped.
+    """
+    src = io.BytesIO(abc_data)
+
+    def u30():
+        """Read a variable length encoded integer."""
+        result = shift = 0
+        while True:
+            byte = src.read(1)
+            if not byte:
+                raise ValueError("ABC data ended unexpectedly")
+            byte = byte[0]
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80 or shift == 28:
+                return result
+            shift += 7
+
+    def skip_traits():
+        """Skip a traits_info list."""
+        for _ in range(u30()):
+            u30()  # name
+            kind = unpack_ui8(src)
+            trait_type = kind & 0x0F
+            if trait_type in (0, 6):
+                # slot or const
+                u30()  # slot_id
+                u30()  # type_name
+                if u30():  # vindex
+                    unpack_ui8(src)  # vkind
+            else:
+                # class, function, method, getter or setter
+                u30()
+                u30()
+            if kind >> 4 & 0x04:
+                # has metadata
+                for _ in range(u30()):
+                    u30()
+
+    unpack_ui16(src)  # minor_version
+    unpack_ui16(src)  # major_version
+
+    # constant pool; the counts include an implicit first entry
+    for _ in range(max(u30() - 1, 0)):  # integers
+        u30()
+    for _ in range(max(u30() - 1, 0)):  # unsigned integers
+        u30()
+    src.seek(8 * max(u30() - 1, 0), io.SEEK_CUR)  # doubles
+    strings = [""]
+    for _ in range(max(u30() - 1, 0)):
+        size = u30()
+        strings.append(src.read(size).decode("utf8"))
+    namespaces = [""]
+    for _ in range(max(u30() - 1, 0)):
+        unpack_ui8(src)  # kind
+        namespaces.append(strings[u30()])
+    for _ in range(max(u30() - 1, 0)):  # namespace sets
+        for _ in range(u30()):
+            u30()
+    multinames = [None]
+    for _ in range(max(u30() - 1, 0)):
+        kind = unpack_ui8(src)
+        if kind in (0x07, 0x0D):
+            # QName and QNameA
+            ns = namespaces[u30()]
+            name = strings[u30()]
+            multinames.append(ns + "." + name if ns else name)
+        else:
+            if kind in (0x0F, 0x10):
+                u30()
+            elif kind in (0x09, 0x0E):
+                u30()
+                u30()
+            elif kind in (0x1B, 0x1C):
+                u30()
+            elif kind == 0x1D:
+                u30()
+                for _ in range(u30()):
+                    u30()
+            elif kind not in (0x11, 0x12):
+                raise ValueError("Unknown multiname kind: {}".format(kind))
+            multinames.append(None)
+
+    # methods
+    for _ in range(u30()):
+        param_count = u30()
+        u30()  # return_type
+        for _ in range(param_count):
+            u30()
+        u30()  # name
+        flags = unpack_ui8(src)
+        if flags & 0x08:
+            # has optional
+            for _ in range(u30()):
+                u30()
+                unpack_ui8(src)
+        if flags & 0x80:
+            # has param names
+            for _ in range(param_count):
+                u30()
+
+    # metadata
+    for _ in range(u30()):
+        u30()  # name
+        for _ in range(2 * u30()):
+            u30()
+
+    # instances, that hold the class names
+    class_names = []
+    for _ in range(u30()):
+        class_names.append(multinames[u30()])
+        u30()  # super_name
+        flags = unpack_ui8(src)
+        if flags & 0x08:
+            u30()  # protected namespace
+        for _ in range(u30()):  # interfaces
+            u30()
+        u30()  # iinit
+        skip_traits()
+    return class_names
+
+
+def _run(steps):
+    """Run the steps of a parsing, without recursion.
+
+    The steps are a generator that may yield other steps to be run before
+    it continues, receiving their result (or getting their exception
+    raised), so nested structures are processed keeping an explicit stack
+    instead of using the Python one.
+    """
+    stack = [steps]
+    result = error = None
+    while True:
+        try:
+            if error is None:
+                nested = stack[-1].send(result)
+            else:
+                nested = stack[-1].throw(error)
+        except StopIteration as stop:
+            stack.pop()
+            result, error = stop.value, None
+            if not stack:
+                return result
+        except BaseException as exc:
+            stack.pop()
+            if not stack:
+                raise
+            result, error = None, exc
+        else:
+            stack.append(nested)
+            result = error = None
+
+
 class SWFParser:
     """Read (at a byte or bit level) the SWF structure from a fileobject.
 
@@ -281,18 +618,257 @@ class SWFParser:
     the unparsed bytes, or will raise an exception if you set
     the unknown_alert flag::
 
-        SWFParser.unknown_alert = True
+        SWFParser(src, unknown_alert=True)
+
+    If not given, the flag is taken from the class attribute (which then
+    works as a default for all the parsers in the process).
+
+    If jobs is bigger than one, the first level tags are decoded in
+    parallel by that quantity of processes (useful for really big files).
+
+    All the configuration and state of the parsing is kept in the parser
+    instance (nothing is attached to the source), so different instances
+    can work safely in different threads.
+
+    If profile is True, the count, bytes, time and outcome of each tag and
+    action type parsed are accounted in the `profile` attribute (a
+    profiling.Profile). If trace_io is True, the source is wrapped to
+    account the read, seek and tell calls done for each tag type, in the
+    `io_trace` attribute (a profiling.IOTrace). If trace_memory is True,
+    the memory kept by each tag and record type is accounted in the
+    `memory_profile` attribute (a profiling.MemoryProfile). These can not
+    be used when decoding in parallel.
+
+    If fields is given, it's a dict with the names of the fields needed
+    for some tag types, for example::
+
+        SWFParser(src, fields={'DefineShape': ['ShapeId', 'ShapeBounds']})
+
+    The decoding of those tags stops as soon as the fields are decoded,
+    skipping the rest of each tag (so the tags will have only the fields
+    decoded until then; if some of the fields are not present in a tag,
+    it's decoded completely). Note that fonts need their glyphs quantity
+    decoded for a later DefineFontAlignZones to be decoded.
+
+    The sprites can be nested up to max_sprite_depth levels (if not
+    given, it's taken from the class attribute), or the max_depth of the
+    limits if given there; a deeper one raises limits.LimitExceeded.
+    The nesting is processed without recursion, but note that pickling
+    very deep structures may fail.
+
+    The problems found (unknown, unsupported or failing tags) are recorded
+    in the `diagnostics` attribute (a diagnostics.Diagnostics), keeping up
+    to max_diagnostics of them, and issuing them as warnings if warn is
+    True; if not given, these are taken from the class attributes.
+
+    To parse untrusted files, give limits (a limits.Limits) to the sizes
+    and quantities the file can have; if not given, it's taken from the
+    class attribute (which does not limit anything by default). When a
+    limit is exceeded a limits.LimitExceeded is raised, as soon as it's
+    detected (the compressed content is never uncompressed beyond the
+    limit, so a decompression bomb is stopped before using the memory).
+
+    The parsing can be stopped giving a deadline (a time.monotonic()
+    value) or a cancel event (a threading.Event, set from other thread);
+    they are checked between tags and every some records in the long
+    loops (shape records, glyphs and actions). When the deadline passes
+    a limits.DeadlineExceeded is raised (a TimeoutError), and when
+    cancelled a limits.Cancelled; but if partial is True, the parsing
+    just stops, keeping the first level tags completely decoded until
+    then, and the `partial` attribute is set to True. These can not be
+    used when decoding in parallel.
+
+    If allow_truncated is True, a file that ends before it should (like
+    a partial download) is decoded as far as the data goes: all the
+    complete first level tags are returned, the `partial` attribute is
+    set to True, and `truncated_at` has the offset in the uncompressed
+    file where the data ended (there is also a diagnostic with the tag
+    that was cut). Only the header must be complete.
     """
 
     unknown_alert = False
+    max_sprite_depth = 100
+    max_diagnostics = 100
+    warn = True
+    limits = Limits()
+
+    def __init__(self, src, read_twips=True, jobs=None, unknown_alert=None,
+                 profile=False, trace_io=False, trace_memory=False,
+                 fields=None, max_sprite_depth=None, max_diagnostics=None,
+                 warn=None, limits=None, deadline=None, cancel=None,
+                 partial=False, allow_truncated=False):
+        if unknown_alert is None:
+            unknown_alert = self.unknown_alert
+        if (profile or trace_io or trace_memory) and (
+                jobs is not None and jobs > 1):
+            raise ValueError("Profiling is not supported with several jobs")
+        if (deadline is not None or cancel is not None) and (
+                jobs is not None and jobs > 1):
+            raise ValueError(
+                "Deadline and cancellation are not supported with several "
+                "jobs")
+        if trace_io:
+            src = IOTrace(src)
+        self._init_state(src, read_twips, unknown_alert, fields=fields,
+                         max_sprite_depth=max_sprite_depth,
+                         max_diagnostics=max_diagnostics, warn=warn,
+                         limits=limits)
+        self._deadline = deadline
+        self._cancel = cancel
+        self._interruptible = deadline is not None or cancel is not None
+        self._allow_truncated = allow_truncated
+        if profile:
+            self.profile = Profile()
+        if trace_io:
+            self.io_trace = src
+        self.header = self._get_header()
+        if trace_io:
+            src.current = '(tag headers)'
+        try:
+            if trace_memory:
+                self.tags = self._process_tags_tracing_memory()
+            elif jobs is None or jobs == 1:
+                self.tags = self._process_tags()
+            else:
+                self.tags = self._process_tags_parallel(jobs)
+        except (DeadlineExceeded, Cancelled) as exc:
+            if not partial:
+                raise
+            self.tags = self._decoded
+            self.partial = True
+            self.diagnostics.add(INTERRUPTED, None, None, None, str(exc))
+        self._index_tags()
+
+    @classmethod
+    def _from_parts(cls, header, tags):
+        """Build a parser with the header and tags parsed by other means."""
+        parser = cls.__new__(cls)
+        parser._init_state(None, None, None)
+        parser.header = header
+        parser.tags = tags
+        parser._index_tags()
+        return parser
+
+    def _index_tags(self):
+        """Index the symbols and characters defined in the first level."""
+        self._abc_classes = None
+        self.symbols = {}
+        self.characters = {}
+        for tag in self.tags:
+            self._index_tag(tag)
 
-    def __init__(self, src, read_twips=True):
+    def _init_state(self, src, read_twips, unknown_alert, version=None,
+                    glyphs_quantity=None, fields=None, max_sprite_depth=None,
+                    max_diagnostics=None, warn=None, limits=None):
+        """Set up the configuration and state for a parsing."""
         self._src = src
+        if limits is None:
+            limits = self.limits
+        self._limits = limits
+        self._tags_count = 0
+        self._deadline = self._cancel = self._decoded = None
+        self._interruptible = False
+        self.partial = False
+
+        # where the available data ends in the source, if it's known
+        # that it may be truncated
+        self._allow_truncated = False
+        self._data_end = None
+        self.truncated_at = None
+        # the offset in the uncompressed file of the source's start
+        self._src_base = 0
+        if max_diagnostics is None:
+            max_diagnostics = self.max_diagnostics
+        if warn is None:
+            warn = self.warn
+        self.diagnostics = Diagnostics(max_diagnostics, warn)
+        if limits.max_depth is not None:
+            max_sprite_depth = limits.max_depth
+        elif max_sprite_depth is None:
+            max_sprite_depth = self.max_sprite_depth
+        self._max_sprite_depth = max_sprite_depth
+        self._sprite_depth = 0
+        if fields is None:
+            self._fields = {}
+        else:
+            self._fields = {name: frozenset(needed)
+                            for name, needed in dict(fields).items()}
         self._read_twips = read_twips
-        self._version = None
-        self._last_defined_glyphs_quantity = None
-        self.header = self._get_header()
-        self.tags = self._process_tags()
+        self._unknown_alert = unknown_alert
+        self._version = version
+        self._tag_end = None
+        self.profile = None
+        self.io_trace = None
+        self.memory_profile = None
+
+        # if set, the records are given to it instead of being built
+        self._visitor = None
+
+        # the quantity of glyphs of each font, for DefineFontAlignZones
+        if glyphs_quantity is None:
+            glyphs_quantity = {}
+        self._glyphs_quantity = glyphs_quantity
+
+    def __getstate__(self):
+        """Support pickling, leaving out the source and the cancel event."""
+        state = self.__dict__.copy()
+        state['_src'] = None
+        state['_cancel'] = None
+        state['_decoded'] = None
+        return state
+
+    def _index_tag(self, tag):
+        """Register the symbols and characters defined by the tag."""
+        if type(tag).__name__ != tag.name:
+            # unknown or failing object, nothing to index
+            return
+
+        if tag.name in ('SymbolClass', 'ExportAssets'):
+            quantity = getattr(
+                tag, 'NumSymbols' if tag.name == 'SymbolClass' else 'Count')
+            for i in range(1, quantity + 1):
+                name = getattr(tag, 'Name{}'.format(i), None)
+                if name is None:
+                    # only some fields were decoded
+                    break
+                self.symbols[name] = getattr(tag, 'Tag{}'.format(i))
+        elif tag.name in CHARACTER_TAGS:
+            for attrib in CHARACTER_ID_ATTRIBS:
+                if attrib in tag._attribs:
+                    self.characters[getattr(tag, attrib)] = tag
+                    break
+
+    def resolve_symbol(self, name):
+        """Return the information of a symbol exported in the file.
+
+        The returned object has the symbol Name, its CharacterId, the Tag
+        that defines that character (None for the main timeline or if it
+        was not defined), and the DoABC tag that holds the symbol class
+        (None if there is not any). Raise KeyError if the symbol is unknown.
+        """
+        character_id = self.symbols[name]
+
+        if self._abc_classes is None:
+            # index the ABC classes only once, and only when needed
+            self._abc_classes = {}
+            for tag in self.tags:
+                if tag.name == 'DoABC' and type(tag).__name__ == 'DoABC':
+                    try:
+                        class_names = _get_abc_class_names(tag.ABCData)
+                    except (ValueError, IndexError, struct.error) as e:
+                        self.diagnostics.add(
+                            ABC_INDEX, 82, None, len(tag.ABCData),
+                            'indexing ABC classes: {}'.format(e))
+                        continue
+                    for class_name in class_names:
+                        self._abc_classes.setdefault(class_name, tag)
+
+        obj = _make_object("Symbol")
+        obj.Name = name
+        obj.CharacterId = character_id
+        obj.Tag = self.characters.get(character_id)
+        obj.ABCTag = self._abc_classes.get(name)
+        return obj
 
     def _get_header(self):
         """Parse the SWF header."""
@@ -304,12 +880,39 @@ class SWFParser:
         obj.Version = self._version = unpack_ui8(fh)
         obj.FileLength = file_length = unpack_ui32(fh)
 
-        # deal with compressed content
-        if sign[0] == 'C':
-            uncompressed = zlib.decompress(fh.read())
-            if len(uncompressed) + 8 != file_length:
+        # deal with compressed content, never uncompressing more than
+        # what the header says (plus one, to detect the excess)
+        if sign[0] in 'CZ':
+            check_limit(self._limits, 'max_decompressed_size',
+                        file_length - 8)
+            max_length = max(file_length - 8, 0) + 1
+            truncated_ok = self._allow_truncated
+            if sign[0] == 'C':
+                decompressor = zlib.decompressobj()
+                uncompressed = decompressor.decompress(fh.read(), max_length)
+                if (not decompressor.eof and not truncated_ok and
+                        len(uncompressed) < max_length):
+                    raise ValueError("Problems dealing with compressed "
+                                     "content: incomplete stream")
+            else:
+                unpack_ui32(fh)  # length of the compressed data
+                decompressor = _lzma_decompressor(fh.read(5))
+                uncompressed = decompressor.decompress(fh.read(), max_length)
+            if len(uncompressed) + 8 != file_length and not (
+                    truncated_ok and len(uncompressed) + 8 < file_length):
                 raise ValueError("Problems dealing with compressed content")
-            fh = self._src = io.BytesIO(uncompressed)
+            self._src_base = 8
+            if truncated_ok:
+                self._data_end = len(uncompressed)
+            if self.io_trace is None:
+                fh = self._src = io.BytesIO(uncompressed)
+            else:
+                # keep tracing, now the uncompressed content
+                self.io_trace.fh = io.BytesIO(uncompressed)
+        elif self._allow_truncated:
+            position = fh.tell()
+            self._data_end = fh.seek(0, io.SEEK_END)
+            fh.seek(position)
 
         # second part of the header
         obj.FrameSize = self._get_struct_rect()
@@ -319,9 +922,36 @@ class SWFParser:
 
     def _process_tags(self):
         """Get a sequence of tags."""
+        return _run(self._process_tags_steps())
+
+    def _process_tags_steps(self, end=None):
+        """Get a sequence of tags (as steps, see _run).
+
+        If end is given, the tags (of a sprite) must be before it.
+        """
         tags = []
+        data_end = None
+        if end is None:
+            # to have them if the parsing is interrupted
+            self._decoded = tags
+            data_end = self._data_end
+        if self._visitor is not None:
+            handle_tag = self._visit_tag_steps
+        elif (self.profile is None and self.io_trace is None and
+                self.memory_profile is None):
+            handle_tag = self._handle_tag_steps
+        else:
+            handle_tag = self._handle_tag_instrumented_steps
 
         while True:
+            if data_end is not None:
+                # the data may be truncated, check before reading
+                start = self._src.tell()
+                header = self._src.read(6)
+                self._src.seek(start)
+                if self._truncated_tag(header, self._src_base + start,
+                                       data_end - start):
+                    break
             tag_bf = unpack_ui16(self._src)
             tag_type = tag_bf >> 6   # upper 10 bits
             if tag_type == 0:
@@ -331,60 +961,323 @@ class SWFParser:
             if tag_len == 0x3f:
                 # the length is the next four bytes!
                 tag_len = unpack_ui32(self._src)
+            if end is not None and self._src.tell() + tag_len > end:
+                raise ValueError("Tag {} exceeds the sprite".format(
+                    TAG_NAMES.get(tag_type, tag_type)))
+            tags.append((yield handle_tag(tag_type, tag_len)))
+        return tags
 
+    def _truncated_tag(self, header, offset, available):
+        """Tell if a tag is cut by the end of the data, registering it.
+
+        The header is what is there of the first 6 bytes of the tag, which
+        is at that offset in the uncompressed file, with that quantity of
+        bytes available from there.
+        """
+        tag_type = tag_len = None
+        if len(header) >= 2:
+            tag_bf = struct.unpack_from("<H", header)[0]
+            tag_type = tag_bf >> 6
+            tag_len = tag_bf & 0x3f
+            if tag_type == 0:
+                return False
+            header_len = 2
+            if tag_len == 0x3f:
+                header_len = 6
+                tag_len = None
+                if len(header) == 6:
+                    tag_len = struct.unpack_from("<I", header, 2)[0]
+            if tag_len is not None and header_len + tag_len <= available:
+                return False
+
+        self.partial = True
+        self.truncated_at = offset + available
+        self.diagnostics.add(
+            TRUNCATED, tag_type, offset, tag_len,
+            'data truncated at {} in the tag at {}'.format(
+                self.truncated_at, offset))
+        return True
+
+    def _visit_tag_steps(self, tag_type, tag_len):
+        """Give the tag to the visitor, in the way it wants it (steps)."""
+        visitor = self._visitor
+        name = TAG_NAMES.get(
+            tag_type, 'UnspecifiedObject(tag={!r})'.format(tag_type))
+        mode = visitor.tag_start(name, tag_len)
+
+        tag = None
+        if mode == 'skip':
+            self._src.seek(tag_len, io.SEEK_CUR)
+        elif mode == 'payload':
+            visitor.payload(name, self._src.read(tag_len))
+        elif mode == 'records':
+            # the tag object is discarded, the visitor got the records
+            yield self._handle_tag_steps(tag_type, tag_len)
+        elif mode == 'build':
+            self._visitor = None
             try:
-                tag_name = TAG_NAMES[tag_type]
-            except KeyError:
-                warnings.warn('unkonwn tag type: {}'.format(tag_type))
-                # malformed SWF, create and unknown object with malformed tag
-                tag_payload = self._src.read(tag_len)
-                _dict = {
-                    '__str__': _repr,
-                    '__repr__': _repr,
-                    'name': 'UnspecifiedObject(tag={!r})'.format(tag_type),
-                }
-                tag = type("UnknownObject", (SWFObject,), _dict)()
-                tag.raw_payload = tag_payload
-                tags.append(tag)
-                continue
+                tag = yield self._handle_tag_steps(tag_type, tag_len)
+            finally:
+                self._visitor = visitor
+        else:
+            raise ValueError("Unknown visiting mode: {!r}".format(mode))
+
+        visitor.tag_end(name, tag)
+        return tag
+
+    def _handle_tag_instrumented_steps(self, tag_type, tag_len):
+        """Build the tag, accounting it in the profile, I/O and memory.
+
+        These are steps, see _run.
+        """
+        name = TAG_NAMES.get(
+            tag_type, 'UnspecifiedObject(tag={!r})'.format(tag_type))
+        trace = self.io_trace
+        if trace is not None:
+            previous = trace.current
+            trace.current = name
+        memory = self.memory_profile
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if memory is not None:
+            memory.enter(name)
+        try:
+            tag = yield self._handle_tag_steps(tag_type, tag_len)
+        finally:
+            if memory is not None:
+                memory.exit(name)
+            if trace is not None:
+                trace.current = previous
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+
+        if self.profile is not None:
+            self.profile.add_tag(tag.name, tag_len, wall, cpu, _outcome(tag))
+        return tag
+
+    def _handle_tag(self, tag_type, tag_len):
+        """Build the tag of the given type from the next tag_len bytes."""
+        return _run(self._handle_tag_steps(tag_type, tag_len))
+
+    def _check_interruption(self):
+        """Stop the parsing if the deadline passed or it was cancelled."""
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            raise DeadlineExceeded("Parsing deadline exceeded")
+        if self._cancel is not None and self._cancel.is_set():
+            raise Cancelled("Parsing cancelled")
+
+    def _handle_tag_steps(self, tag_type, tag_len):
+        """Build the tag of the given type (as steps, see _run)."""
+        if self._interruptible:
+            self._check_interruption()
+        limits = self._limits
+        self._tags_count += 1
+        if limits.max_tags is not None:
+            check_limit(limits, 'max_tags', self._tags_count)
+        if limits.max_tag_size is not None:
+            # checked before reading it
+            check_limit(limits, 'max_tag_size', tag_len)
 
+        try:
+            tag_name = TAG_NAMES[tag_type]
+        except KeyError:
+            self.diagnostics.add(
+                UNKNOWN_TAG, tag_type, self._src_base + self._src.tell(),
+                tag_len, 'unkonwn tag type: {}'.format(tag_type))
+            # malformed SWF, create and unknown object with malformed tag
+            tag_payload = self._src.read(tag_len)
+            tag = _make_raw_object(
+                "UnknownObject",
+                'UnspecifiedObject(tag={!r})'.format(tag_type))
+            tag.raw_payload = tag_payload
+            return tag
+
+        try:
+            tag_meth = getattr(self, "_handle_tag_" + tag_name.lower())
+        except AttributeError:
+            if self._unknown_alert:
+                raise ValueError("Unknown tag: " + repr(tag_name))
+
+            self.diagnostics.add(
+                UNSUPPORTED_TAG, tag_type, self._src_base + self._src.tell(),
+                tag_len, 'tag not supported: {}'.format(tag_name))
+            tag_payload = self._src.read(tag_len)
+            tag = _make_raw_object("UnknownObject", tag_name)
+            tag.raw_payload = tag_payload
+            return tag
+
+        # we know the tag type, and have the handler, let's process it
+        # from exactly its bytes, so reading too much fails right away;
+        # the big tags, and the sprites nested in other sprite (they are
+        # already inside that sprite's bytes), are not copied but read
+        # from the same source, bounded to their end
+        src = self._src
+        base = self._src_base
+        payload_offset = src.tell()
+        trace = self.io_trace
+        buffered = tag_len <= BUFFERED_TAG_SIZE and (
+            tag_type != 39 or not self._sprite_depth)
+        if buffered:
+            tag_payload = src.read(tag_len)
+            buffer = io.BytesIO(tag_payload)
+            if trace is None:
+                self._src = buffer
+            else:
+                # keep tracing, now the tag's bytes
+                outer_fh = trace.fh
+                trace.fh = buffer
+            self._src_base = base + payload_offset
+            prev_pos = 0
+        else:
+            tag_payload = None
+            prev_pos = payload_offset
+            self._src = BoundedReader(src, payload_offset + tag_len)
+        end = self._tag_end = prev_pos + tag_len
+        needed = self._fields.get(tag_name)
+        if needed is not None:
+            token = _projection.set((tag_name, needed))
+        try:
             try:
-                tag_meth = getattr(self, "_handle_tag_" + tag_name.lower())
-            except AttributeError:
-                if self.unknown_alert:
-                    raise ValueError("Unknown tag: " + repr(tag_name))
-
-                warnings.warn('tag not supported: {}'.format(tag_name))
-                tag_payload = self._src.read(tag_len)
-                _dict = {'__str__': _repr, '__repr__': _repr, 'name': tag_name}
-                tag = type("UnknownObject", (SWFObject,), _dict)()
-                tag.raw_payload = tag_payload
-                tags.append(tag)
-                continue
-
-            # we know the tag type, and have the handler, let's process it
-            prev_pos = self._src.tell()
-            self._src.guard = tag_len
-            try:
-                with ReadQuantityController(self._src, tag_len):
-                    tag = tag_meth()
-                assert tag is not None, tag_name
-            except ValueError as e:
-                warnings.warn('processing {} tag: {}'.format(tag_name, e))
-                # an attempt to read too much happened; create a failing
-                # object with the raw payload
-                self._src.guard = None
-                self._src.seek(prev_pos)
-                tag_payload = self._src.read(tag_len)
-                _dict = {'__str__': _repr, '__repr__': _repr, 'name': tag_name}
-                tag = type("FailingObject", (SWFObject,), _dict)()
-                tag.raw_payload = tag_payload
-            tags.append(tag)
+                tag = tag_meth()
+                if type(tag) is types.GeneratorType:
+                    # the steps to finish it (a sprite with nested tags)
+                    tag = yield tag
+            except _FieldsComplete as done:
+                # the needed fields are there, skip the rest
+                self._src.seek(end)
+                tag = done.obj
+            if self._src.tell() != end:
+                raise ValueError("Bad reading quantity: should={} "
+                                 "read={}".format(tag_len,
+                                                  self._src.tell() - prev_pos))
+            assert tag is not None, tag_name
+        except (ValueError, struct.error) as e:
+            self.diagnostics.add(
+                FAILING_TAG, tag_type, base + payload_offset, tag_len,
+                'processing {} tag: {}'.format(tag_name, e))
+            # create a failing object with the raw payload
+            if tag_payload is None:
+                src.seek(prev_pos)
+                tag_payload = src.read(tag_len)
+            tag = _make_raw_object("FailingObject", tag_name)
+            tag.raw_payload = tag_payload
+        finally:
+            self._src = src
+            self._src_base = base
+            if buffered and trace is not None:
+                trace.fh = outer_fh
+            if needed is not None:
+                _projection.reset(token)
+        return tag
+
+    def _scan_tags(self):
+        """Find where the tags are, without decoding them.
+
+        Return the data that holds all the tags (from the current source
+        position), and the type, start and length of each first level
+        tag found there.
+        """
+        base = self._src_base + self._src.tell()
+        data = self._src.read()
+        boundaries = []
+        pos = 0
+        while True:
+            if self._allow_truncated and self._truncated_tag(
+                    data[pos:pos + 6], base + pos, len(data) - pos):
+                # the data may be truncated, checked before reading
+                break
+            if pos + 2 > len(data):
+                break
+            tag_bf = struct.unpack_from("<H", data, pos)[0]
+            pos += 2
+            tag_type = tag_bf >> 6
+            if tag_type == 0:
+                break
+            tag_len = tag_bf & 0x3f
+            if tag_len == 0x3f:
+                tag_len = struct.unpack_from("<I", data, pos)[0]
+                pos += 4
+            if pos + tag_len > len(data):
+                raise ValueError("Tag {} exceeds the file size".format(
+                    TAG_NAMES.get(tag_type, tag_type)))
+            boundaries.append((tag_type, pos, tag_len))
+
+            if tag_type in (48, 75) and tag_len > 5:
+                # DefineFont2/3; get the quantity of glyphs, that is needed
+                # later by the DefineFontAlignZones for the same font
+                font_id = struct.unpack_from("<H", data, pos)[0]
+                name_len = data[pos + 4]
+                if tag_len >= 7 + name_len:
+                    self._glyphs_quantity[font_id] = struct.unpack_from(
+                        "<H", data, pos + 5 + name_len)[0]
+            pos += tag_len
+        return data, boundaries
+
+    def _process_tags_tracing_memory(self):
+        """Get the sequence of tags, accounting the memory they keep.
+
+        Besides each tag, the functions that build the records are
+        wrapped, so what is allocated in them after the objects they
+        create goes back to the object of the caller.
+        """
+        memory = self.memory_profile = MemoryProfile()
+        memory.start()
+        for name in _BUILDERS:
+            setattr(self, name, memory.wrap(getattr(self, name)))
+        token = _memory_profile.set(memory)
+        try:
+            return self._process_tags()
+        finally:
+            memory.stop()
+            _memory_profile.reset(token)
+            for name in _BUILDERS:
+                delattr(self, name)
+
+    def _process_tags_parallel(self, jobs):
+        """Get the sequence of tags, decoding them in several processes.
+
+        The tags are first located (which is cheap) and then distributed
+        in chunks among the workers, each chunk carrying the state that
+        may be needed from previous tags.
+        """
+        base = self._src_base + self._src.tell()
+        data, boundaries = self._scan_tags()
+        check_limit(self._limits, 'max_tags', len(boundaries))
+
+        # chunks of similar size in bytes, several per worker to balance load
+        chunk_size = max(len(data) // (jobs * 4), 1)
+        chunks = []
+        current = []
+        current_size = 0
+        for tag_type, start, tag_len in boundaries:
+            current.append(
+                (tag_type, base + start, data[start:start + tag_len]))
+            current_size += tag_len
+            if current_size >= chunk_size:
+                chunks.append(current)
+                current = []
+                current_size = 0
+        if current:
+            chunks.append(current)
+
+        # the workers' problems are collected silently, and then added
+        # here (in order) to be kept or issued as configured
+        options = (self._read_twips, self._unknown_alert, self._version,
+                   self._glyphs_quantity, self._fields,
+                   self._max_sprite_depth, self.diagnostics.limit, False,
+                   self._limits)
+        tags = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(_decode_tags, [options] * len(chunks), chunks)
+            for chunk_tags, diagnostics in results:
+                tags.extend(chunk_tags)
+                self.diagnostics.extend(diagnostics)
         return tags
 
     def _handle_tag_definebits(self):
         """Handle the DefineBits tag."""
-        tag_end = self._src.tell() + self._src.guard
+        tag_end = self._tag_end
         obj = _make_object("DefineBits")
         obj.CharacterID = unpack_ui16(self._src)
         obj.JPEGData = self._get_raw_bytes(-tag_end)
@@ -392,7 +1285,7 @@ class SWFParser:
 
     def _handle_tag_definebitsjpeg2(self):
         """Handle the DefineBitsJPEG2 tag."""
-        tag_end = self._src.tell() + self._src.guard
+        tag_end = self._tag_end
         obj = _make_object("DefineBitsJPEG2")
         obj.CharacterID = unpack_ui16(self._src)
         obj.ImageData = self._get_raw_bytes(-tag_end)
@@ -400,7 +1293,7 @@ class SWFParser:
 
     def _generic_definebitsjpeg_parser(self, obj, version):
         """Handle the DefineBitsJPEGN tag."""
-        tag_end = self._src.tell() + self._src.guard
+        tag_end = self._tag_end
         obj.CharacterID = unpack_ui16(self._src)
         obj.AlphaDataOffset = unpack_ui32(self._src)
         if 4 == version:
@@ -423,7 +1316,7 @@ class SWFParser:
 
     def _generic_definebitslossless_parser(self, obj, version):
         """Generic parser for the DefineBitsLosslessN tags."""
-        tag_end = self._src.tell() + self._src.guard
+        tag_end = self._tag_end
         obj.CharacterID = unpack_ui16(self._src)
         obj.BitmapFormat = unpack_ui8(self._src)
         obj.BitmapWidth = unpack_ui16(self._src)
@@ -645,14 +1538,36 @@ class SWFParser:
         obj = _make_object("DefineSprite")
         obj.CharacterID = unpack_ui16(self._src)
         obj.FrameCount = unpack_ui16(self._src)
-        tags = self._process_tags()
-        obj.ControlTags = tags
+        # the control tags are got in the next steps, to not recurse
+        return self._sprite_steps(obj, self._tag_end)
+
+    def _sprite_steps(self, obj, end):
+        """Get the control tags of the sprite (as steps, see _run)."""
+        if self._sprite_depth >= self._max_sprite_depth:
+            raise LimitExceeded('max_depth', self._sprite_depth + 1)
+        self._sprite_depth += 1
+        try:
+            obj.ControlTags = yield self._process_tags_steps(end)
+        finally:
+            self._sprite_depth -= 1
         return obj
 
     def _generic_action_parser(self):
         """Generic parser for Actions."""
+        if self._visitor is not None:
+            return self._visit_actions()
+
         actions = []
+        profile = self.profile
+        interruptible = self._interruptible
         while True:
+            if interruptible and not len(actions) & 1023:
+                self._check_interruption()
+            if profile is not None:
+                start_pos = self._src.tell()
+                start_count = len(actions)
+                wall = time.perf_counter()
+                cpu = time.process_time()
             action_code = unpack_ui8(self._src)
             if action_code == 0:
                 break
@@ -665,14 +1580,12 @@ class SWFParser:
                     action_meth = getattr(
                         self, "_handle_" + action_name.lower())
                 except AttributeError:
-                    if self.unknown_alert:
+                    if self._unknown_alert:
                         raise ValueError(
                             "Unknown action: " + repr(action_name))
 
                     action_payload = self._src.read(action_len)
-                    _dict = {'__str__': _repr, '__repr__': _repr,
-                             'name': action_name}
-                    action = type("UnknownAction", (SWFObject,), _dict)()
+                    action = _make_raw_object("UnknownAction", action_name)
                     action.raw_payload = action_payload
                     actions.append(action)
                 else:
@@ -690,14 +1603,71 @@ class SWFParser:
             else:
                 action = _make_object(action_name)
                 actions.append(action)
+
+            if profile is not None:
+                # the handler may not give any action (like an empty push)
+                if len(actions) > start_count:
+                    outcome = _outcome(actions[-1])
+                else:
+                    outcome = 'ok'
+                profile.add_action(
+                    action_name, self._src.tell() - start_pos,
+                    time.perf_counter() - wall, time.process_time() - cpu,
+                    outcome)
         return actions
 
+    def _visit_actions(self):
+        """Give the name and length of the actions to the visitor."""
+        visitor = self._visitor
+        interruptible = self._interruptible
+        count = 0
+        while True:
+            count += 1
+            if interruptible and not count & 1023:
+                self._check_interruption()
+            action_code = unpack_ui8(self._src)
+            if action_code == 0:
+                break
+            action_len = 0
+            if action_code > 128:
+                action_len = unpack_ui16(self._src)
+                self._src.seek(action_len, io.SEEK_CUR)
+            visitor.action(ACTION_NAMES[action_code], action_len)
+        return []
+
     def _handle_tag_doaction(self):
         """Handle the DoAction tag."""
         obj = _make_object("DoAction")
         obj.Actions = self._generic_action_parser()
         return obj
 
+    def _handle_tag_doabc(self):
+        """Handle the DoABC tag."""
+        tag_end = self._tag_end
+        obj = _make_object("DoABC")
+        obj.Flags = unpack_ui32(self._src)
+        obj.Name = self._get_struct_string()
+        obj.ABCData = self._get_raw_bytes(-tag_end)
+        return obj
+
+    def _handle_tag_symbolclass(self):
+        """Handle the SymbolClass tag."""
+        obj = _make_object("SymbolClass")
+        obj.NumSymbols = unpack_ui16(self._src)
+        for i in range(1, obj.NumSymbols + 1):
+            setattr(obj, 'Tag{}'.format(i), unpack_ui16(self._src))
+            setattr(obj, 'Name{}'.format(i), self._get_struct_string())
+        return obj
+
+    def _handle_tag_exportassets(self):
+        """Handle the ExportAssets tag."""
+        obj = _make_object("ExportAssets")
+        obj.Count = unpack_ui16(self._src)
+        for i in range(1, obj.Count + 1):
+            setattr(obj, 'Tag{}'.format(i), unpack_ui16(self._src))
+            setattr(obj, 'Name{}'.format(i), self._get_struct_string())
+        return obj
+
     def _handle_tag_fileattributes(self):
         """Handle the FileAttributes tag."""
         obj = _make_object("FileAttributes")
@@ -838,13 +1808,19 @@ class SWFParser:
             obj.FontName = obj.FontName[:-1]
 
         obj.NumGlyphs = num_glyphs = unpack_ui16(self._src)
-        self._last_defined_glyphs_quantity = num_glyphs
+        self._glyphs_quantity[obj.FontID] = num_glyphs
         getter_wide = unpack_ui32 if obj.FontFlagsWideOffsets else unpack_ui16
         obj.OffsetTable = [getter_wide(self._src) for _ in range(num_glyphs)]
         obj.CodeTableOffset = getter_wide(self._src)
-        obj.GlyphShapeTable = [self._get_struct_shape()
-                               for _ in range(num_glyphs)]
+        obj.GlyphShapeTable = shapes = []
+        for index in range(num_glyphs):
+            if self._interruptible and not index & 255:
+                self._check_interruption()
+            shapes.append(self._get_struct_shape())
         obj.CodeTable = [unpack_ui16(self._src) for _ in range(num_glyphs)]
+        if self._visitor is not None:
+            for index, code in enumerate(obj.CodeTable):
+                self._visitor.glyph(index, code)
 
         if obj.FontFlagsHasLayout:
             obj.FontAscent = unpack_ui16(self._src)
@@ -966,16 +1942,14 @@ class SWFParser:
         """Handle the JPEGTables tag."""
         obj = _make_object("JPEGTables")
         assert self._src.read(2) == b'\xFF\xD8'  # SOI marker
-        eoimark1 = eoimark2 = None
-        allbytes = [b'\xFF\xD8']
-        while not (eoimark1 == b'\xFF' and eoimark2 == b'\xD9'):
-            newbyte = self._src.read(1)
-            allbytes.append(newbyte)
-            eoimark1 = eoimark2
-            eoimark2 = newbyte
-
-        # concatenate everything, removing the end mark
-        obj.JPEGData = b"".join(allbytes[:-2])
+        start = self._src.tell()
+        data = self._src.read(self._tag_end - start)
+        # the data goes until the end mark, which should be at the end
+        mark = data.find(b'\xFF\xD9')
+        if mark == -1:
+            raise ValueError("JPEG data without end mark")
+        self._src.seek(start + mark + 2)
+        obj.JPEGData = b'\xFF\xD8' + data[:mark]
         return obj
 
     def _handle_tag_definefontalignzones(self):
@@ -987,8 +1961,10 @@ class SWFParser:
         obj.Reserved = bc.u_get(6)
 
         obj.ZoneTable = zone_records = []
-        glyph_count = self._last_defined_glyphs_quantity
-        self._last_defined_glyphs_quantity = None
+        try:
+            glyph_count = self._glyphs_quantity[obj.FontId]
+        except KeyError:
+            raise ValueError("Font not defined: {}".format(obj.FontId))
         for _ in range(glyph_count):
             zone_record = _make_object("ZoneRecord")
             zone_records.append(zone_record)
@@ -1035,8 +2011,11 @@ class SWFParser:
                 assert abs(size) > pos
                 size = abs(size) - pos
             data = self._src.read(size)
+            if len(data) < size:
+                raise ValueError("Not enough data: should={} read={}".format(
+                    size, len(data)))
             if unzip:
-                return zlib.decompress(data)
+                return _inflate(data, self._limits.max_decompressed_size)
             else:
                 return data
         except Exception:
@@ -1109,11 +2088,16 @@ class SWFParser:
     def _get_struct_string(self):
         """Get the STRING structure."""
         data = []
+        max_length = self._limits.max_string_length
         while True:
             t = self._src.read(1)
             if t == b'\x00':
                 break
+            if not t:
+                raise ValueError("String without end")
             data.append(t)
+            if max_length is not None and len(data) > max_length:
+                raise LimitExceeded('max_string_length', len(data))
         val = b''.join(data)
         return val.decode("utf8")
 
@@ -1173,13 +2157,38 @@ class SWFParser:
         """Return an array of SHAPERECORDS."""
         shape_records = []
         bc = BitConsumer(self._src)
+        visitor = self._visitor
+        max_records = self._limits.max_shape_records
+        interruptible = self._interruptible
+        records_count = 0
 
         while True:
+            records_count += 1
+            if max_records is not None:
+                check_limit(self._limits, 'max_shape_records', records_count)
+            if interruptible and not records_count & 1023:
+                self._check_interruption()
             type_flag = bc.u_get(1)
             if type_flag:
                 # edge record
                 straight_flag = bc.u_get(1)
                 num_bits = bc.u_get(4)
+                if visitor is not None:
+                    # just the deltas, without building the record
+                    delta_bits = num_bits + 2
+                    if not straight_flag:
+                        visitor.curved_edge(
+                            bc.s_get(delta_bits), bc.s_get(delta_bits),
+                            bc.s_get(delta_bits), bc.s_get(delta_bits))
+                    elif bc.u_get(1):
+                        visitor.straight_edge(bc.s_get(delta_bits),
+                                              bc.s_get(delta_bits))
+                    elif bc.s_get(1):
+                        visitor.straight_edge(0, bc.s_get(delta_bits))
+                    else:
+                        visitor.straight_edge(bc.s_get(delta_bits), 0)
+                    continue
+
                 if straight_flag:
                     record = _make_object('StraightEdgeRecord')
                     record.TypeFlag = 1
@@ -1251,7 +2260,13 @@ class SWFParser:
                     # byte level
                     bc = BitConsumer(self._src)
 
-            shape_records.append(record)
+            if visitor is None:
+                shape_records.append(record)
+            else:
+                visitor.style_change(record)
+
+        if visitor is not None:
+            visitor.shape_end()
         return shape_records
 
     def _get_struct_shape(self):
@@ -1345,7 +2360,7 @@ class SWFParser:
         """Get a EncodedU32 number."""
         useful = []
         while True:
-            byte = ord(self._src.read(1))
+            byte = unpack_ui8(self._src)
             useful.append(byte)
             if byte < 127:
                 # got all the useful bytes
@@ -1639,50 +2654,392 @@ class SWFParser:
         yield obj
 
     def coverage(self):
-        """Calculate the coverage of a file."""
-        items_unk = collections.Counter()
-        items_ok = collections.Counter()
-
-        def _go_deep(obj):
-            """Recursive function to find internal attributes."""
-            if type(obj).__name__ in ('UnknownObject', 'UnknownAction'):
-                # blatantly unknown
-                items_unk[obj.name] += 1
-            elif obj.name in ('DefineMorphShape2', 'ClipActions'):
-                # these are incomplete, see FIXMEs in the code above
-                items_unk[obj.name] += 1
+        """Return the coverage of the file (a Coverage)."""
+        coverage = Coverage()
+        coverage.add(self.tags)
+        coverage.files = 1
+        return coverage
+
+
+class Coverage:
+    """How many objects (tags, actions, structures, etc) were parsed.
+
+    The objects are counted by name in `parsed`, `unknown` (the unknown
+    ones, or those not completely parsed yet) and `failing` (the ones that
+    failed when being parsed). The coverage of several files can be
+    merged, to have only one result for a whole corpus.
+    """
+
+    # these are incomplete, see FIXMEs in the parser
+    incomplete = ('DefineMorphShape2', 'ClipActions')
+
+    def __init__(self):
+        self.files = 0
+        self.parsed = collections.Counter()
+        self.unknown = collections.Counter()
+        self.failing = collections.Counter()
+
+    def add(self, value):
+        """Count the objects in the value, all the way down."""
+        pending = [value]
+        while pending:
+            value = pending.pop()
+            if isinstance(value, SWFObject):
+                kind = type(value).__name__
+                if kind in ('UnknownObject', 'UnknownAction'):
+                    # blatantly unknown
+                    self.unknown[value.name] += 1
+                elif kind == 'FailingObject':
+                    self.failing[value.name] += 1
+                elif value.name in self.incomplete:
+                    self.unknown[value.name] += 1
+                else:
+                    # fully parsed
+                    self.parsed[value.name] += 1
+                pending.extend(getattr(value, name)
+                               for name in value._attribs)
+            elif isinstance(value, (list, tuple)):
+                pending.extend(value)
+
+    def merge(self, other):
+        """Add the counts of other coverage to this one."""
+        self.files += other.files
+        self.parsed.update(other.parsed)
+        self.unknown.update(other.unknown)
+        self.failing.update(other.failing)
+
+    def __add__(self, other):
+        result = Coverage()
+        result.merge(self)
+        result.merge(other)
+        return result
+
+    @property
+    def total(self):
+        """The quantity of objects counted."""
+        return (sum(self.parsed.values()) + sum(self.unknown.values()) +
+                sum(self.failing.values()))
+
+    @property
+    def percentage(self):
+        """The percentage of the objects that were fully parsed."""
+        total = self.total
+        if not total:
+            return 100.0
+        return 100 * sum(self.parsed.values()) / total
+
+    def report(self, top=3):
+        """Return the coverage and the most common objects as text lines."""
+        lines = ["Coverage is {:.1f}% of {} total items".format(
+            self.percentage, self.total)]
+        for title, counter in (("Most common parsed objects:", self.parsed),
+                               ("Most common Unknown objects", self.unknown),
+                               ("Most common Failing objects", self.failing)):
+            if counter:
+                lines.append(title)
+                lines.extend("{:5d} {}".format(quantity, name)
+                             for name, quantity in counter.most_common(top))
+        return lines
+
+
+class IncrementalSWFParser:
+    """Parse a SWF from the bytes pushed to it, as they arrive.
+
+    Useful when the source can not seek (sockets, pipes, etc.) or to start
+    working before having the whole file. Use it like::
+
+        parser = IncrementalSWFParser()
+        for chunk in source:
+            for tag in parser.feed(chunk):
+                ...
+        parser.close()
+
+    Each call to `feed` returns the first level tags that got complete with
+    the given bytes (after decompressing them, for CWS and ZWS files); the
+    header is available in the `header` attribute as soon as it's read.
+    Only the bytes of the tag being received are kept around.
+
+    The options are the same than for SWFParser, and the problems found
+    are also recorded in the `diagnostics` attribute.
+    """
+
+    # how much is decompressed at once
+    inflate_size = 65536
+
+    def __init__(self, read_twips=True, unknown_alert=None,
+                 max_sprite_depth=None, max_diagnostics=None, warn=None,
+                 limits=None):
+        if unknown_alert is None:
+            unknown_alert = SWFParser.unknown_alert
+        self._decoder = SWFParser.__new__(SWFParser)
+        self._decoder._init_state(None, read_twips, unknown_alert,
+                                  max_sprite_depth=max_sprite_depth,
+                                  max_diagnostics=max_diagnostics, warn=warn,
+                                  limits=limits)
+        self._limits = self._decoder._limits
+        self.diagnostics = self._decoder.diagnostics
+
+        self.header = None
+        self.finished = False
+        self._raw = bytearray()  # until knowing how to decompress
+        self._decompressor = None
+        self._buffer = bytearray()  # uncompressed bytes not yet processed
+        self._consumed = 8  # the uncompressed bytes before the buffer
+        self._decompressed = 0
+        self._signature = None
+
+    def feed(self, data):
+        """Push more bytes of the file, return the tags completed."""
+        tags = []
+        if self.finished:
+            return tags
+
+        if self._signature is None or self._decompressor is None:
+            self._raw += data
+            data = self._start()
+            if data is None:
+                # still can't tell how the content comes
+                return tags
+
+        if self._decompressor is False:
+            self._buffer += data
+            self._process(tags)
+            return tags
+
+        # uncompress in small steps, so the buffer is never too big
+        while not self.finished:
+            if isinstance(self._decompressor, lzma.LZMADecompressor):
+                if self._decompressor.eof:
+                    break
+                more_pending = not self._decompressor.needs_input
+                if not data and not more_pending:
+                    break
+                try:
+                    out = self._decompressor.decompress(
+                        data, self.inflate_size)
+                except lzma.LZMAError as err:
+                    raise ValueError(
+                        "Problems dealing with compressed content: {}".format(
+                            err))
+                data = b""
             else:
-                # fully parsed
-                items_ok[obj.name] += 1
+                try:
+                    out = self._decompressor.decompress(
+                        data, self.inflate_size)
+                except zlib.error as err:
+                    raise ValueError(
+                        "Problems dealing with compressed content: {}".format(
+                            err))
+                data = self._decompressor.unconsumed_tail
+                if not out and not data:
+                    break
+            self._decompressed += len(out)
+            check_limit(self._limits, 'max_decompressed_size',
+                        self._decompressed)
+            self._buffer += out
+            self._process(tags)
+        return tags
 
-            for name in obj._attribs:
-                attr = getattr(obj, name)
-                if isinstance(attr, SWFObject):
-                    _go_deep(attr)
+    def _start(self):
+        """Parse the first part of the header, and set up decompression.
+
+        Return the bytes to process after that, or None if there are not
+        enough bytes yet.
+        """
+        raw = self._raw
+        if len(raw) < 8:
+            return
+
+        if self._signature is None:
+            self._signature = raw[:3].decode("ascii", "replace")
+            if self._signature not in ('FWS', 'CWS', 'ZWS'):
+                raise ValueError(
+                    "Not a SWF file: {!r}".format(self._signature))
+            obj = self._header = _make_object("Header")
+            obj.Signature = self._signature
+            obj.Version = self._decoder._version = raw[3]
+            obj.FileLength = struct.unpack_from("<I", raw, 4)[0]
+            if self._signature[0] != 'F':
+                check_limit(self._limits, 'max_decompressed_size',
+                            obj.FileLength - 8)
+
+        if self._signature[0] == 'F':
+            self._decompressor = False
+            pending = raw[8:]
+        elif self._signature[0] == 'C':
+            self._decompressor = zlib.decompressobj()
+            pending = raw[8:]
+        else:
+            # compressed length (4 bytes) and LZMA properties (5 bytes)
+            if len(raw) < 17:
+                return
+            self._decompressor = _lzma_decompressor(raw[12:17])
+            pending = raw[17:]
+        self._raw = None
+        return bytes(pending)
+
+    def _process(self, tags):
+        """Process everything that is complete in the buffer."""
+        buf = self._buffer
+        pos = 0
+        decoder = self._decoder
+
+        if self.header is None:
+            # the rest of the header: a RECT, frame rate and count
+            if not buf:
+                return
+            nbits = buf[0] >> 3
+            rect_size = (5 + 4 * nbits + 7) // 8
+            if len(buf) < rect_size + 4:
+                return
+            obj = self._header
+            decoder._src = io.BytesIO(bytes(buf[:rect_size + 4]))
+            obj.FrameSize = decoder._get_struct_rect()
+            obj.FrameRate = unpack_ui16(decoder._src)
+            obj.FrameCount = unpack_ui16(decoder._src)
+            self.header = obj
+            pos = rect_size + 4
+
+        while len(buf) - pos >= 2:
+            tag_bf = struct.unpack_from("<H", buf, pos)[0]
+            tag_type = tag_bf >> 6
+            if tag_type == 0:
+                # the end
+                pos += 2
+                self.finished = True
+                break
+            tag_len = tag_bf & 0x3f
+            header_len = 2
+            if tag_len == 0x3f:
+                if len(buf) - pos < 6:
+                    break
+                tag_len = struct.unpack_from("<I", buf, pos + 2)[0]
+                header_len = 6
+            # don't wait for a tag that is too big
+            check_limit(self._limits, 'max_tag_size', tag_len)
+            tag_end = pos + header_len + tag_len
+            if len(buf) < tag_end:
+                # still incomplete
+                break
 
-        for tag in self.tags:
-            _go_deep(tag)
-
-        full_count = sum(items_ok.values()) + sum(items_unk.values())
-        coverage = 100 * sum(items_ok.values()) / full_count
-        print("Coverage is {:.1f}% of {} total items".format(coverage,
-                                                             full_count))
-        print("Most common parsed objects:")
-        for k, v in items_ok.most_common(3):
-            print("{:5d} {}".format(v, k))
-        if items_unk:
-            print("Most common Unknown objects")
-            for k, v in items_unk.most_common(3):
-                print("{:5d} {}".format(v, k))
-
-
-def parsefile(filename, read_twips=True):
+            decoder._src = io.BytesIO(bytes(buf[pos + header_len:tag_end]))
+            decoder._src_base = self._consumed + pos + header_len
+            tags.append(decoder._handle_tag(tag_type, tag_len))
+            pos = tag_end
+
+        del buf[:pos]
+        self._consumed += pos
+        decoder._src = None
+
+    def close(self):
+        """Signal the end of data; complain if the SWF was not complete."""
+        if not self.finished:
+            raise ValueError("SWF data ended before the End tag")
+
+
+def _inflate(data, max_size):
+    """Uncompress the zlib data, never more than max_size bytes."""
+    if max_size is None:
+        return zlib.decompress(data)
+    decompressor = zlib.decompressobj()
+    result = decompressor.decompress(data, max_size + 1)
+    if len(result) > max_size:
+        # only up to one byte over the limit was uncompressed
+        raise LimitExceeded('max_decompressed_size', len(result))
+    if not decompressor.eof:
+        # as zlib.decompress would do
+        raise zlib.error("Error -5 while decompressing data: incomplete "
+                         "or truncated stream")
+    return result
+
+
+def _lzma_decompressor(properties):
+    """Create the decompressor for LZMA content with the given properties.
+
+    The properties are the 5 bytes found in the ZWS header: the lc, lp
+    and pb parameters combined in the first one, then the dictionary size.
+    """
+    if len(properties) != 5:
+        raise ValueError("Problems dealing with compressed content")
+    params, dict_size = struct.unpack("<BI", properties)
+    lc = params % 9
+    params //= 9
+    lp = params % 5
+    pb = params // 5
+    filters = [{'id': lzma.FILTER_LZMA1, 'dict_size': dict_size,
+                'lc': lc, 'lp': lp, 'pb': pb}]
+    return lzma.LZMADecompressor(format=lzma.FORMAT_RAW, filters=filters)
+
+
+# the functions of the parser that build records, wrapped when tracing
+# the memory
+_BUILDERS = sorted(
+    name for name in vars(SWFParser) if name.startswith('_get_struct_')) + [
+    '_get_shaperecords', '_generic_action_parser']
+
+
+def _decode_tags(options, chunk):
+    """Decode the given tags, all independent (this runs in a worker)."""
+    parser = SWFParser.__new__(SWFParser)
+    parser._init_state(None, *options)
+
+    tags = []
+    for tag_type, offset, payload in chunk:
+        parser._src = io.BytesIO(payload)
+        parser._src_base = offset
+        tags.append(parser._handle_tag(tag_type, len(payload)))
+    return tags, parser.diagnostics
+
+
+class _Uncacheable(Exception):
+    """Carry a parsed SWF that must not be cached."""
+
+    def __init__(self, swf):
+        super().__init__()
+        self.swf = swf
+
+
+def parsefile(filename, read_twips=True, cache=None, **kwargs):
     """Parse a SWF.
 
     If you have a file object already, just use SWFParser directly.
 
     read_twips: True  - return values as read from the SWF
                 False - return values in pixels (at 100% zoom)
+    cache: where to keep the results to not parse the same again (for
+           example, a cache.DiskCache)
+
+    The rest of the options are passed to SWFParser. The cache is not used
+    when profiling or tracing, as those measure the parsing itself.
     """
-    with open(filename, 'rb') as fh:
-        return SWFParser(fh, read_twips)
+    measuring = any(kwargs.get(name)
+                    for name in ('profile', 'trace_io', 'trace_memory'))
+    if cache is None or measuring:
+        with open(filename, 'rb') as fh:
+            return SWFParser(fh, read_twips, **kwargs)
+
+    # the cache key is affected only by the options that change the result
+    # (with the class defaults for those not given)
+    options = {'read_twips': read_twips}
+    for name in ('unknown_alert', 'max_sprite_depth', 'max_diagnostics',
+                 'limits'):
+        value = kwargs.pop(name, None)
+        options[name] = getattr(SWFParser, name) if value is None else value
+    options['allow_truncated'] = kwargs.pop('allow_truncated', False)
+    fields = kwargs.pop('fields', None)
+    if fields is not None:
+        options['fields'] = tuple(sorted(
+            (name, tuple(sorted(needed))) for name, needed in fields.items()))
+
+    def parse(fh):
+        """Really parse the file."""
+        swf = SWFParser(fh, **options, **kwargs)
+        if swf.partial:
+            # an interrupted parsing is not to be kept
+            raise _Uncacheable(swf)
+        return swf
+
+    try:
+        return cache.fetch(filename, options, parse)
+    except _Uncacheable as exc:
+        return exc.swf
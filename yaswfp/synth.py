@@ -0,0 +1,337 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Generate synthetic SWF files, to have big inputs for benchmarks.
+
+The generated files are valid and always the same for the same seed and
+options, so they don't need to be stored anywhere.
+"""
+
+import io
+import itertools
+import lzma
+import random
+import struct
+import zlib
+
+COMPRESSIONS = ('FWS', 'CWS', 'ZWS')
+
+# the frame size of all the generated files, and the shapes' bounds
+_BOUNDS = (0, 11000, 0, 8000)
+
+
+class BitWriter:
+    """Write bunch of bits, return bytes."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._value = 0
+        self._count = 0
+
+    def u_put(self, value, quant):
+        """Write the number using the given quantity of unsigned bits."""
+        self._value = (self._value << quant) | (value & ((1 << quant) - 1))
+        self._count += quant
+        while self._count >= 8:
+            self._count -= 8
+            self._buffer.append((self._value >> self._count) & 0xFF)
+        self._value &= (1 << self._count) - 1
+
+    def s_put(self, value, quant):
+        """Write the number using the given quantity of signed bits."""
+        self.u_put(value, quant)
+
+    def getvalue(self):
+        """Return the bytes written, padding the last one with zeros."""
+        if self._count:
+            self.u_put(0, 8 - self._count)
+        return bytes(self._buffer)
+
+
+def _signed_bits(*values):
+    """Return the quantity of bits needed to hold all the signed values."""
+    return max((value if value >= 0 else ~value).bit_length() + 1
+               for value in values)
+
+
+def _tag(tag_type, payload):
+    """Return the tag with its header."""
+    if len(payload) < 0x3f:
+        return struct.pack("<H", tag_type << 6 | len(payload)) + payload
+    return struct.pack("<HI", tag_type << 6 | 0x3f, len(payload)) + payload
+
+
+def _rect(bounds):
+    """Return the RECT structure."""
+    nbits = _signed_bits(*bounds)
+    bw = BitWriter()
+    bw.u_put(nbits, 5)
+    for value in bounds:
+        bw.s_put(value, nbits)
+    return bw.getvalue()
+
+
+class _Generator:
+    """Build the tags for a mix of the different structures."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.next_id = 1
+
+    def _new_id(self):
+        """Return a new character id (they just wrap for huge files)."""
+        character_id = self.next_id
+        self.next_id = self.next_id % 0xFFFF + 1
+        return character_id
+
+    def _shape_records(self, bw, edges, fill_bits, line_bits):
+        """Write a move, the edges and the end of a shape."""
+        rng = self.rng
+
+        # style change record, to move and set the styles
+        bw.u_put(0, 1)
+        bw.u_put(0, 1)  # new styles
+        bw.u_put(1 if line_bits else 0, 1)
+        bw.u_put(0, 1)  # fill style 1
+        bw.u_put(1, 1)  # fill style 0
+        bw.u_put(1, 1)  # move to
+        move_x = rng.randint(0, _BOUNDS[1])
+        move_y = rng.randint(0, _BOUNDS[3])
+        move_bits = _signed_bits(move_x, move_y)
+        bw.u_put(move_bits, 5)
+        bw.s_put(move_x, move_bits)
+        bw.s_put(move_y, move_bits)
+        bw.u_put(1, fill_bits)
+        if line_bits:
+            bw.u_put(1, line_bits)
+
+        for _ in range(edges):
+            bw.u_put(1, 1)
+            if rng.random() < 0.5:
+                # straight, a general line
+                delta_x = rng.randint(-2000, 2000)
+                delta_y = rng.randint(-2000, 2000)
+                nbits = max(_signed_bits(delta_x, delta_y), 2)
+                bw.u_put(1, 1)
+                bw.u_put(nbits - 2, 4)
+                bw.u_put(1, 1)
+                bw.s_put(delta_x, nbits)
+                bw.s_put(delta_y, nbits)
+            else:
+                deltas = [rng.randint(-2000, 2000) for _ in range(4)]
+                nbits = max(_signed_bits(*deltas), 2)
+                bw.u_put(0, 1)
+                bw.u_put(nbits - 2, 4)
+                for delta in deltas:
+                    bw.s_put(delta, nbits)
+
+        # end shape record
+        bw.u_put(0, 6)
+
+    def _color(self):
+        """Return a RGB color."""
+        return bytes(self.rng.randrange(256) for _ in range(3))
+
+    def shape(self, edges):
+        """Return a DefineShape with that quantity of edges."""
+        payload = bytearray(struct.pack("<H", self._new_id()))
+        payload += _rect(_BOUNDS)
+        payload += b'\x01\x00' + self._color()  # one solid fill style
+        payload += b'\x01' + struct.pack("<H", 20) + self._color()  # one line
+        bw = BitWriter()
+        bw.u_put(1, 4)  # fill bits
+        bw.u_put(1, 4)  # line bits
+        self._shape_records(bw, edges, 1, 1)
+        payload += bw.getvalue()
+        return _tag(2, payload)
+
+    def font(self, glyphs, edges):
+        """Return a DefineFont3 with that quantity of glyphs."""
+        shapes = []
+        for _ in range(glyphs):
+            bw = BitWriter()
+            bw.u_put(1, 4)  # fill bits
+            bw.u_put(0, 4)  # line bits
+            self._shape_records(bw, edges, 1, 0)
+            shapes.append(bw.getvalue())
+
+        name = "Font{}".format(self.rng.randrange(10000)).encode("ascii")
+        payload = bytearray(struct.pack("<H", self._new_id()))
+        payload += b'\x0c\x01'  # wide offsets and codes; latin
+        payload += struct.pack("<B", len(name) + 1) + name + b'\x00'
+        payload += struct.pack("<H", glyphs)
+        offset = 4 * (glyphs + 1)
+        for shape in shapes:
+            payload += struct.pack("<I", offset)
+            offset += len(shape)
+        payload += struct.pack("<I", offset)  # the code table offset
+        payload += b''.join(shapes)
+        payload += b''.join(struct.pack("<H", 32 + i) for i in range(glyphs))
+        return _tag(75, payload)
+
+    def bitmap(self, width, height):
+        """Return a DefineBitsLossless2 of those dimensions."""
+        # gradients and some noise, to compress like a real image would
+        ramp = bytes(i & 0xFF for i in range(width + 256))
+        row = bytearray(b'\xff' * (4 * width))
+        row[3::4] = ramp[:width]
+        pixels = bytearray()
+        for y in range(height):
+            row[1::4] = self.rng.randbytes(width)
+            row[2::4] = ramp[y & 0xFF:(y & 0xFF) + width]
+            pixels += row
+        payload = struct.pack("<HBHH", self._new_id(), 5, width, height)
+        return _tag(36, payload + zlib.compress(bytes(pixels)))
+
+    def sprite(self, depth, place_id=None):
+        """Return a DefineSprite with that depth of nested sprites."""
+        inner = b''
+        for _ in range(depth):
+            control = bytearray()
+            if place_id is not None:
+                # PlaceObject2 with only the character
+                control += _tag(26, struct.pack("<BHH", 0x02, 1, place_id))
+            control += inner
+            control += _tag(1, b'') + _tag(0, b'')
+            inner = _tag(39, struct.pack("<HH", self._new_id(), 1) + control)
+        return inner
+
+    def actions(self, quantity):
+        """Return a DoAction with that quantity of assignments."""
+        rng = self.rng
+        payload = bytearray()
+        for i in range(quantity):
+            # push a name and two numbers, add them, and set the variable
+            name = "var{}".format(i).encode("ascii")
+            items = b'\x00' + name + b'\x00'
+            items += b'\x07' + struct.pack("<I", rng.randrange(2 ** 31))
+            items += b'\x07' + struct.pack("<I", rng.randrange(2 ** 31))
+            payload += b'\x96' + struct.pack("<H", len(items)) + items
+            payload += b'\x47\x1d'
+        payload += b'\x00'
+        return _tag(12, payload)
+
+
+def iter_tags(seed=0, size=None, shapes=10, edges=100, fonts=1, glyphs=100,
+              bitmaps=1, bitmap_size=64, sprite_depth=4, actions=100):
+    """Yield the encoded tags (without the End one) of a synthetic SWF.
+
+    The file has `shapes` DefineShape with `edges` edges each, `fonts`
+    DefineFont3 with `glyphs` glyphs of `edges // 10` edges each, `bitmaps`
+    DefineBitsLossless2 of `bitmap_size` pixels of side, a sprite with
+    `sprite_depth` levels of nested DefineSprites, and a DoAction with
+    `actions` variable assignments (and a ShowFrame).
+
+    If `size` is given, that mix is repeated until having at least that
+    quantity of bytes.
+    """
+    generator = _Generator(seed)
+    total = 0
+    while True:
+        tags = []
+        last_shape = None
+        for _ in range(shapes):
+            tags.append(generator.shape(edges))
+            last_shape = generator.next_id - 1
+        for _ in range(fonts):
+            tags.append(generator.font(glyphs, max(edges // 10, 1)))
+        for _ in range(bitmaps):
+            tags.append(generator.bitmap(bitmap_size, bitmap_size))
+        if sprite_depth:
+            tags.append(generator.sprite(sprite_depth, last_shape))
+        if actions:
+            tags.append(generator.actions(actions))
+        tags.append(_tag(1, b''))
+
+        for tag in tags:
+            total += len(tag)
+            yield tag
+        if size is None or total >= size:
+            break
+
+
+def write(fh, compression='CWS', version=10, **kwargs):
+    """Write a synthetic SWF into the file object.
+
+    The compression is one of 'FWS' (none), 'CWS' (zlib) or 'ZWS' (LZMA);
+    the rest of the parameters are the same than for `iter_tags`.
+
+    The tags are generated twice (they are always the same for the same
+    parameters): first to know the file length and frame count that go
+    in the header, and then to write them, so they are never all in
+    memory.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError("Unknown compression: {!r}".format(compression))
+
+    tags_length = frames = 0
+    for tag in iter_tags(**kwargs):
+        tags_length += len(tag)
+        if tag == b'\x40\x00':
+            frames += 1
+    header_end = _rect(_BOUNDS) + struct.pack("<HH", 24 << 8, frames)
+    end = _tag(0, b'')
+    file_length = 8 + len(header_end) + tags_length + len(end)
+
+    fh.write(compression.encode("ascii") + struct.pack("<BI", version,
+                                                       file_length))
+    body = itertools.chain([header_end], iter_tags(**kwargs), [end])
+    if compression == 'FWS':
+        for part in body:
+            fh.write(part)
+        return
+
+    if compression == 'CWS':
+        compressor = zlib.compressobj()
+        for part in body:
+            fh.write(compressor.compress(part))
+        fh.write(compressor.flush())
+        return
+
+    # ZWS: the compressed length goes before the data, so it's written
+    # at the end if possible (else the compressed data is kept until then)
+    filters = [{'id': lzma.FILTER_LZMA1, 'dict_size': 1 << 20,
+                'lc': 3, 'lp': 0, 'pb': 2}]
+    compressor = lzma.LZMACompressor(format=lzma.FORMAT_RAW, filters=filters)
+    properties = struct.pack("<BI", (2 * 5 + 0) * 9 + 3, 1 << 20)
+    if fh.seekable():
+        length_position = fh.tell()
+        fh.write(struct.pack("<I", 0) + properties)
+        compressed_length = 0
+        for part in body:
+            compressed = compressor.compress(part)
+            compressed_length += len(compressed)
+            fh.write(compressed)
+        compressed = compressor.flush()
+        compressed_length += len(compressed)
+        fh.write(compressed)
+        end_position = fh.tell()
+        fh.seek(length_position)
+        fh.write(struct.pack("<I", compressed_length))
+        fh.seek(end_position)
+    else:
+        compressed = [compressor.compress(part) for part in body]
+        compressed.append(compressor.flush())
+        fh.write(struct.pack("<I", sum(map(len, compressed))) + properties)
+        for part in compressed:
+            fh.write(part)
+
+
+def generate(**kwargs):
+    """Return a synthetic SWF as bytes; parameters are as for `write`."""
+    fh = io.BytesIO()
+    write(fh, **kwargs)
+    return fh.getvalue()
@@ -0,0 +1,116 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Tests for the asyncio front-end."""
+
+import asyncio
+import concurrent.futures
+import os
+import unittest
+
+from yaswfp.aio import aparse, aparse_many
+from yaswfp.swfparser import parsefile
+
+BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
+SAMPLES = sorted(os.path.join(BASEDIR, fname)
+                 for fname in os.listdir(BASEDIR))
+
+
+class AParseTestCase(unittest.TestCase):
+    """Parse from a stream reader."""
+
+    def test_simple(self):
+        fpath = os.path.join(BASEDIR, '1252533834.swf')
+        with open(fpath, 'rb') as fh:
+            data = fh.read()
+
+        async def go():
+            reader = asyncio.StreamReader()
+            for pos in range(0, len(data), 100):
+                reader.feed_data(data[pos:pos + 100])
+            reader.feed_eof()
+            return await aparse(reader, chunk_size=50)
+
+        swf = asyncio.run(go())
+        should = parsefile(fpath)
+        self.assertEqual(repr(swf.header), repr(should.header))
+        self.assertEqual([repr(t) for t in swf.tags],
+                         [repr(t) for t in should.tags])
+
+    def test_truncated(self):
+        with open(os.path.join(BASEDIR, 'wivet1.swf'), 'rb') as fh:
+            data = fh.read()
+
+        async def go():
+            reader = asyncio.StreamReader()
+            reader.feed_data(data[:-20])
+            reader.feed_eof()
+            return await aparse(reader)
+
+        self.assertRaises(ValueError, asyncio.run, go())
+
+
+class AParseManyTestCase(unittest.TestCase):
+    """Parse several files."""
+
+    def _run(self, **kwargs):
+        async def go():
+            return [r async for r in aparse_many(SAMPLES, **kwargs)]
+        return asyncio.run(go())
+
+    def _check(self, results):
+        results = sorted(results)
+        self.assertEqual([r.path for r in results], SAMPLES)
+        for result in results:
+            self.assertIsNone(result.error)
+            should = parsefile(result.path)
+            self.assertEqual([repr(t) for t in result.swf.tags],
+                             [repr(t) for t in should.tags])
+
+    def test_processes(self):
+        self._check(self._run(jobs=2, max_pending=1))
+
+    def test_given_executor(self):
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            self._check(self._run(executor=executor))
+
+    def test_given_executor_timeout(self):
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            self._check(self._run(executor=executor, timeout=60))
+
+    def test_given_executor_timeout_exceeded(self):
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            results = self._run(executor=executor, timeout=0)
+        self.assertEqual(sorted(r.path for r in results), SAMPLES)
+        for result in results:
+            self.assertIsInstance(result.error, TimeoutError)
+
+    def test_error(self):
+        async def go():
+            missing = os.path.join(BASEDIR, 'missing.swf')
+            return [r async for r in aparse_many([missing], jobs=1)]
+        (result,) = asyncio.run(go())
+        self.assertIsInstance(result.error, FileNotFoundError)
+
+    def test_stop_early(self):
+        async def go():
+            results = aparse_many(SAMPLES, jobs=1, max_pending=1)
+            async for result in results:
+                break
+            await results.aclose()
+            return result
+        result = asyncio.run(go())
+        self.assertIn(result.path, SAMPLES)
@@ -0,0 +1,130 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Tests for the batch parsing."""
+
+import io
+import os
+import pickle
+import signal
+import threading
+import types
+import unittest
+
+from unittest.mock import patch
+
+from yaswfp import batch, synth
+from yaswfp.batch import parse_many
+from yaswfp.limits import DeadlineExceeded
+from yaswfp.swfparser import SWFParser, parsefile
+
+BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
+SAMPLES = sorted(os.path.join(BASEDIR, fname)
+                 for fname in os.listdir(BASEDIR))
+
+
+class PicklingTestCase(unittest.TestCase):
+    """The parsed structures can go to other processes."""
+
+    def test_roundtrip(self):
+        swf = parsefile(os.path.join(BASEDIR, 'wivet1.swf'))
+        new = pickle.loads(pickle.dumps(swf))
+        self.assertEqual(repr(new.header), repr(swf.header))
+        self.assertEqual([repr(t) for t in new.tags],
+                         [repr(t) for t in swf.tags])
+        self.assertEqual([type(t).__name__ for t in new.tags],
+                         [type(t).__name__ for t in swf.tags])
+        self.assertEqual(new.symbols, swf.symbols)
+
+    def test_rebuilt_share_classes(self):
+        data = synth.generate(shapes=3, fonts=0, bitmaps=0,
+                              sprite_depth=0, actions=0)
+        swf = SWFParser(io.BytesIO(data))
+        tags = [tag for tag in swf.tags if tag.name == 'DefineShape']
+        new = pickle.loads(pickle.dumps(tags))
+        self.assertGreater(len(new), 1)
+        self.assertEqual(len({type(tag) for tag in new}), 1)
+        self.assertEqual(len({type(tag) for tag in tags}), len(tags))
+
+        # the rebuilt objects can still be changed
+        new[0].foo = 3
+        self.assertEqual(new[0]._attribs[-1], 'foo')
+
+
+class ParseManyTestCase(unittest.TestCase):
+    """Parse several files."""
+
+    def _check(self, results):
+        results = sorted(results)
+        self.assertEqual([r.path for r in results], SAMPLES)
+        for result in results:
+            self.assertIsNone(result.error)
+            should = parsefile(result.path)
+            self.assertEqual([repr(t) for t in result.swf.tags],
+                             [repr(t) for t in should.tags])
+
+    def test_processes(self):
+        self._check(parse_many(SAMPLES, jobs=2))
+
+    def test_chunks(self):
+        self._check(parse_many(SAMPLES, jobs=2, chunksize=3))
+
+    def test_inline(self):
+        self._check(parse_many(SAMPLES, jobs=1))
+
+    def test_error(self):
+        missing = os.path.join(BASEDIR, 'missing.swf')
+        (result,) = parse_many([missing], jobs=2)
+        self.assertEqual(result.path, missing)
+        self.assertIsNone(result.swf)
+        self.assertIsInstance(result.error, FileNotFoundError)
+
+    def test_timeout_without_timers(self):
+        # the parser's deadline is used instead
+        with patch.object(batch, 'signal', types.SimpleNamespace()):
+            results = list(parse_many(SAMPLES, jobs=1, timeout=0))
+        self.assertEqual(len(results), len(SAMPLES))
+        for result in results:
+            self.assertIsInstance(result.error, DeadlineExceeded)
+
+    def test_timeout_restores_handler(self):
+        def handler(signum, frame):
+            pass
+
+        previous = signal.signal(signal.SIGALRM, handler)
+        try:
+            results = list(parse_many(SAMPLES, jobs=1, timeout=60))
+            self.assertEqual(signal.getsignal(signal.SIGALRM), handler)
+            self.assertEqual(signal.getitimer(signal.ITIMER_REAL), (0, 0))
+        finally:
+            signal.signal(signal.SIGALRM, previous)
+        self._check(results)
+
+    def test_timeout_in_thread(self):
+        results = []
+        thread = threading.Thread(target=lambda: results.extend(
+            parse_many(SAMPLES, jobs=1, timeout=60)))
+        thread.start()
+        thread.join()
+        self._check(results)
+
+        thread = threading.Thread(target=lambda: results.extend(
+            parse_many(SAMPLES, jobs=1, timeout=0)))
+        results.clear()
+        thread.start()
+        thread.join()
+        for result in results:
+            self.assertIsInstance(result.error, DeadlineExceeded)
@@ -0,0 +1,152 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Tests for the benchmarks."""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from yaswfp import benchmark
+
+BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
+
+
+def _results(scale=1.0, **values):
+    """Build some results with the given seconds and memory."""
+    return {'scale': scale, 'benchmarks': {
+        name: {'seconds': seconds, 'peak_memory': memory}
+        for name, (seconds, memory) in values.items()}}
+
+
+class CompareTestCase(unittest.TestCase):
+    """Compare two runs."""
+
+    def test_no_regressions(self):
+        old = _results(a=(1.0, 1000), b=(2.0, 500))
+        new = _results(a=(1.05, 1000), b=(1.0, 540))
+        self.assertEqual(benchmark.compare(old, new), [])
+
+    def test_slower(self):
+        old = _results(a=(1.0, 1000), b=(2.0, 500))
+        new = _results(a=(1.5, 1000), b=(2.0, 500))
+        self.assertEqual(benchmark.compare(old, new),
+                         [('a', 'seconds', 1.0, 1.5, 50.0)])
+
+    def test_more_memory(self):
+        old = _results(a=(1.0, 1000))
+        new = _results(a=(1.0, 1200))
+        self.assertEqual(benchmark.compare(old, new),
+                         [('a', 'peak_memory', 1000, 1200, 20.0)])
+        self.assertEqual(
+            benchmark.compare(old, new, memory_threshold=25), [])
+
+    def test_thresholds(self):
+        old = _results(a=(1.0, 1000))
+        new = _results(a=(1.2, 1000))
+        self.assertEqual(len(benchmark.compare(old, new)), 1)
+        self.assertEqual(benchmark.compare(old, new, time_threshold=30), [])
+
+    def test_missing_benchmarks(self):
+        old = _results(a=(1.0, 1000), b=(1.0, 1000))
+        new = _results(a=(1.0, 1000), c=(9.0, 9000))
+        self.assertEqual(benchmark.compare(old, new), [])
+
+    def test_different_scale(self):
+        with self.assertRaises(ValueError):
+            benchmark.compare(_results(scale=1), _results(scale=2))
+
+
+class RunTestCase(unittest.TestCase):
+    """Run the benchmarks, really small."""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+        self.samples = os.path.join(self.tempdir, 'samples')
+        os.mkdir(self.samples)
+        shutil.copy(os.path.join(BASEDIR, 'wivet1.swf'), self.samples)
+        patcher = mock.patch.object(benchmark, 'SAMPLES_DIR', self.samples)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_run(self):
+        results = benchmark.run(scale=0.01, repeat=1,
+                                samples_dir=self.samples)
+        self.assertEqual(results['scale'], 0.01)
+        names = set(results['benchmarks'])
+        self.assertEqual(names, {
+            'sample:wivet1.swf', 'subsystem:shape-records',
+            'subsystem:fonts', 'subsystem:actions', 'subsystem:bitmaps',
+            'subsystem:sprites', 'subsystem:bit-reader',
+            'subsystem:parallel-{}-jobs'.format(benchmark.PARALLEL_JOBS),
+            'subsystem:serialized-load',
+            'subsystem:decompression-CWS', 'subsystem:decompression-ZWS'})
+        values = results['benchmarks']['sample:wivet1.swf']
+        self.assertGreater(values['seconds'], 0)
+        self.assertGreater(values['mb_s'], 0)
+        self.assertGreater(values['tags_s'], 0)
+        self.assertGreater(values['peak_memory'], 0)
+        self.assertGreater(values['blocks'], 0)
+
+    def test_parallel(self):
+        data = benchmark.synth.generate(shapes=20, edges=10, fonts=0,
+                                        bitmaps=0, sprite_depth=0, actions=0)
+        values = benchmark.measure_parallel(data, 1, 2)
+        self.assertEqual(values['jobs'], 2)
+        self.assertGreater(values['seconds'], 0)
+        self.assertGreater(values['sequential_seconds'], 0)
+        expected = values['sequential_seconds'] / values['seconds']
+        self.assertAlmostEqual(values['speedup'], expected)
+
+    def test_load(self):
+        data = benchmark.synth.generate(shapes=20, edges=10, fonts=0,
+                                        bitmaps=0, sprite_depth=0, actions=0)
+        values = benchmark.measure_load(data, 1)
+        self.assertGreater(values['seconds'], 0)
+        self.assertGreater(values['parse_seconds'], 0)
+        self.assertGreater(values['serialized_size'], 0)
+        expected = values['parse_seconds'] / values['seconds']
+        self.assertAlmostEqual(values['speedup'], expected)
+
+    def test_main_save_and_compare(self):
+        saved = os.path.join(self.tempdir, 'results.json')
+        with contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            code = benchmark.main(
+                ['--scale', '0.01', '--repeat', '1', '--save', saved])
+        self.assertEqual(code, 0)
+        with open(saved) as fh:
+            results = json.load(fh)
+
+        # make the baseline impossibly fast, so it fails
+        for values in results['benchmarks'].values():
+            values['seconds'] /= 1000
+        with open(saved, 'w') as fh:
+            json.dump(results, fh)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), \
+                contextlib.redirect_stderr(io.StringIO()):
+            code = benchmark.main(['--compare', saved, '--repeat', '1'])
+        self.assertEqual(code, 1)
+        self.assertIn("REGRESSION sample:wivet1.swf: seconds",
+                      output.getvalue())
@@ -0,0 +1,300 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Tests for the caches."""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import warnings
+
+from unittest import mock
+
+from yaswfp import serialize, swfparser, synth
+from yaswfp.cache import DiskCache, MemoryCache
+from yaswfp.limits import Limits
+from yaswfp.swfparser import SWFParser, parsefile
+
+BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
+
+
+def _deep_file(testcase, depth):
+    """Write a file with sprites nested to that depth, return its path."""
+    tempdir = tempfile.mkdtemp()
+    testcase.addCleanup(shutil.rmtree, tempdir)
+    fpath = os.path.join(tempdir, 'deep.swf')
+    with open(fpath, 'wb') as fh:
+        fh.write(synth.generate(compression='FWS', shapes=1, edges=1,
+                                fonts=0, bitmaps=0, actions=0,
+                                sprite_depth=depth))
+    return fpath
+
+
+def _depth(swf):
+    """Return the depth of the nested sprites."""
+    depth = 0
+    tags = swf.tags
+    while True:
+        sprites = [tag for tag in tags if tag.name == 'DefineSprite']
+        if not sprites:
+            return depth
+        depth += 1
+        tags = sprites[0].ControlTags
+
+
+class DiskCacheTestCase(unittest.TestCase):
+    """The cache in disk."""
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cachedir)
+
+    def _entries(self):
+        return [x for x in os.listdir(self.cachedir)
+                if x.endswith(DiskCache.suffix)]
+
+    def _parse(self, cache, fname='subscribe.swf', **kwargs):
+        with mock.patch.object(SWFParser, '_process_tags',
+                               autospec=True,
+                               side_effect=SWFParser._process_tags) as m:
+            swf = parsefile(os.path.join(BASEDIR, fname), cache=cache,
+                            **kwargs)
+        return swf, m.called
+
+    def test_hit(self):
+        cache = DiskCache(self.cachedir)
+        swf1, parsed1 = self._parse(cache)
+        swf2, parsed2 = self._parse(cache)
+        self.assertTrue(parsed1)
+        self.assertFalse(parsed2)
+        self.assertEqual([repr(t) for t in swf1.tags],
+                         [repr(t) for t in swf2.tags])
+        self.assertEqual(swf2.characters.keys(), swf1.characters.keys())
+        self.assertEqual(len(self._entries()), 1)
+
+    def test_hit_same_as_miss(self):
+        cache = DiskCache(self.cachedir)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            miss, _ = self._parse(cache, 'wivet1.swf')
+            hit, parsed = self._parse(cache, 'wivet1.swf')
+        self.assertFalse(parsed)
+        self.assertEqual(repr(hit.header), repr(miss.header))
+        self.assertEqual([repr(t) for t in hit.tags],
+                         [repr(t) for t in miss.tags])
+        self.assertEqual(list(hit.diagnostics), list(miss.diagnostics))
+        self.assertEqual(hit.diagnostics.summary(),
+                         miss.diagnostics.summary())
+        self.assertEqual((hit.partial, hit.truncated_at),
+                         (miss.partial, miss.truncated_at))
+
+    def test_options_in_key(self):
+        cache = DiskCache(self.cachedir)
+        self._parse(cache)
+        swf, parsed = self._parse(cache, read_twips=False)
+        self.assertTrue(parsed)
+        self.assertEqual(len(self._entries()), 2)
+
+    def test_result_options_in_key(self):
+        cache = DiskCache(self.cachedir)
+        self._parse(cache)
+        options = [
+            {'max_sprite_depth': 1},
+            {'max_diagnostics': 1},
+            {'limits': Limits(max_tags=1000)},
+            {'allow_truncated': True},
+        ]
+        for kwargs in options:
+            _, parsed = self._parse(cache, **kwargs)
+            self.assertTrue(parsed, kwargs)
+        self.assertEqual(len(self._entries()), 5)
+
+        # the class defaults are the same as not giving them
+        _, parsed = self._parse(cache, max_sprite_depth=100, limits=Limits())
+        self.assertFalse(parsed)
+
+    def test_not_when_measuring(self):
+        cache = DiskCache(self.cachedir)
+        self._parse(cache)
+        for name in ('profile', 'trace_io', 'trace_memory'):
+            swf, parsed = self._parse(cache, **{name: True})
+            self.assertTrue(parsed, name)
+        self.assertIsNotNone(swf.memory_profile)
+        self.assertEqual(len(self._entries()), 1)
+
+    def test_version_invalidates(self):
+        self._parse(DiskCache(self.cachedir))
+        with mock.patch.object(swfparser, 'VERSION', '99.0'):
+            cache = DiskCache(self.cachedir)
+            self.assertEqual(self._entries(), [])
+            _, parsed = self._parse(cache)
+        self.assertTrue(parsed)
+
+    def test_format_invalidates(self):
+        self._parse(DiskCache(self.cachedir))
+        with mock.patch.object(serialize, 'FORMAT_VERSION', 99):
+            cache = DiskCache(self.cachedir)
+            self.assertEqual(self._entries(), [])
+            _, parsed = self._parse(cache)
+        self.assertTrue(parsed)
+
+    def test_eviction(self):
+        cache = DiskCache(self.cachedir)
+        self._parse(cache, 'subscribe.swf')
+        self._parse(cache, 'dqsv1.swf')
+        sizes = [os.path.getsize(os.path.join(self.cachedir, fname))
+                 for fname in self._entries()]
+
+        # make both old, and use the first one again
+        for fname in self._entries():
+            os.utime(os.path.join(self.cachedir, fname), ns=(0, 0))
+        self._parse(cache, 'subscribe.swf')
+
+        # room just for one entry
+        cache.max_size = sum(sizes) - 1
+        cache._evict()
+        self.assertEqual(len(self._entries()), 1)
+        _, parsed = self._parse(cache, 'subscribe.swf')
+        self.assertFalse(parsed)
+        _, parsed = self._parse(cache, 'dqsv1.swf')
+        self.assertTrue(parsed)
+
+    def test_corrupted_entry(self):
+        cache = DiskCache(self.cachedir)
+        self._parse(cache)
+        (entry,) = self._entries()
+        with open(os.path.join(self.cachedir, entry), 'wb') as fh:
+            fh.write(b'garbage')
+        swf, parsed = self._parse(cache)
+        self.assertTrue(parsed)
+        self.assertEqual(len(swf.tags), 16)
+
+    def test_deep_sprites(self):
+        fpath = _deep_file(self, 3000)
+        cache = DiskCache(self.cachedir)
+        parsefile(fpath, cache=cache, max_sprite_depth=5000)
+        self.assertEqual(len(self._entries()), 1)
+        with mock.patch.object(SWFParser, '_process_tags') as m:
+            swf = parsefile(fpath, cache=cache, max_sprite_depth=5000)
+        self.assertFalse(m.called)
+        self.assertEqual(_depth(swf), 3000)
+
+
+class MemoryCacheTestCase(unittest.TestCase):
+    """The cache in memory."""
+
+    def _parse(self, cache, fname='subscribe.swf', **kwargs):
+        return parsefile(os.path.join(BASEDIR, fname), cache=cache, **kwargs)
+
+    def test_hit(self):
+        cache = MemoryCache()
+        swf1 = self._parse(cache)
+        swf2 = self._parse(cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsNot(swf1, swf2)
+        self.assertIs(swf1.tags, swf2.tags)
+        self.assertEqual(len(swf2.tags), 16)
+        self.assertIs(swf2.characters[1], swf2.tags[1])
+        self.assertGreater(cache.size, 0)
+
+    def test_options_in_key(self):
+        cache = MemoryCache()
+        self._parse(cache)
+        swf = self._parse(cache, read_twips=False)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+        self.assertEqual(swf.tags[1].ShapeBounds, (0, 125, 0, 50))
+
+    def test_changed_file(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        fpath = os.path.join(tempdir, 'test.swf')
+        shutil.copy(os.path.join(BASEDIR, 'subscribe.swf'), fpath)
+
+        cache = MemoryCache()
+        parsefile(fpath, cache=cache)
+        os.utime(fpath, ns=(0, 0))
+        parsefile(fpath, cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_read_only(self):
+        cache = MemoryCache()
+        swf = self._parse(cache)
+        tag = swf.tags[1]
+        self.assertRaises(AttributeError, setattr, tag, 'ShapeId', 5)
+        self.assertRaises(AttributeError, setattr, tag.Shapes, 'Foo', 5)
+        self.assertIsInstance(swf.tags, tuple)
+        self.assertIsInstance(tag.Shapes.ShapeRecords, tuple)
+        with self.assertRaises(TypeError):
+            swf.characters[1] = None
+
+    def test_own_diagnostics(self):
+        cache = MemoryCache()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            swf1 = self._parse(cache, 'dqsv1.swf')
+            swf2 = self._parse(cache, 'dqsv1.swf')
+        self.assertIsNot(swf1.diagnostics, swf2.diagnostics)
+        should = list(swf2.diagnostics)
+        self.assertTrue(should)
+
+        swf1.diagnostics.merge(swf2.diagnostics)
+        swf1.diagnostics.add('failing-tag', 2, 0, 1, "other problem")
+        self.assertEqual(list(swf2.diagnostics), should)
+        self.assertEqual(len(swf2.diagnostics), len(should))
+        swf3 = self._parse(cache, 'dqsv1.swf')
+        self.assertEqual(list(swf3.diagnostics), should)
+
+    def test_eviction_by_entries(self):
+        cache = MemoryCache(max_entries=1)
+        self._parse(cache, 'subscribe.swf')
+        self._parse(cache, 'dqsv1.swf')
+        self._parse(cache, 'subscribe.swf')
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+        self.assertEqual(cache.evictions, 2)
+
+    def test_eviction_by_size(self):
+        cache = MemoryCache(max_size=1)
+        self._parse(cache)
+        self._parse(cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+        self.assertEqual(cache.size, 0)
+
+    def test_threads(self):
+        cache = MemoryCache()
+        results = []
+
+        def parse():
+            for _ in range(10):
+                results.append(len(self._parse(cache).tags))
+
+        threads = [threading.Thread(target=parse) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [16] * 40)
+        self.assertEqual(cache.hits + cache.misses, 40)
+
+    def test_deep_sprites(self):
+        fpath = _deep_file(self, 3000)
+        cache = MemoryCache()
+        parsefile(fpath, cache=cache, max_sprite_depth=5000)
+        swf = parsefile(fpath, cache=cache, max_sprite_depth=5000)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(_depth(swf), 3000)
+        self.assertIsInstance(swf.tags[-2].ControlTags, tuple)
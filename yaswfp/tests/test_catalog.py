@@ -0,0 +1,225 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Tests for the catalog."""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import unittest
+import zlib
+
+from unittest import mock
+
+from yaswfp import catalog
+from yaswfp.catalog import Catalog
+from yaswfp.swfparser import parsefile
+
+BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
+
+
+class CatalogTestCase(unittest.TestCase):
+    """Index files in the catalog."""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tempdir)
+        self.catalog = Catalog(os.path.join(self.tempdir, "catalog.db"))
+        self.addCleanup(self.catalog.close)
+
+    def _copy(self, fname):
+        """Copy a sample to the temp dir, return its new path."""
+        path = os.path.join(self.tempdir, fname)
+        shutil.copy(os.path.join(BASEDIR, fname), path)
+        return path
+
+    def test_files(self):
+        paths = [os.path.join(BASEDIR, fname)
+                 for fname in sorted(os.listdir(BASEDIR))]
+        self.assertEqual(self.catalog.index(paths), len(paths))
+        rows = self.catalog.query(
+            "SELECT path, signature, version, frame_count, error "
+            "FROM files ORDER BY path")
+        self.assertEqual(len(rows), len(paths))
+        for path, row in zip(paths, rows):
+            swf = parsefile(path)
+            self.assertEqual(row, (path, swf.header.Signature,
+                                   swf.header.Version,
+                                   swf.header.FrameCount, None))
+
+    def test_tags(self):
+        path = os.path.join(BASEDIR, 'subscribe.swf')
+        self.catalog.index([path])
+        swf = parsefile(path)
+
+        rows = self.catalog.query(
+            "SELECT name, character_id FROM tags WHERE depth = 0 "
+            "ORDER BY position")
+        # the End tag is not indexed
+        self.assertEqual([name for name, _ in rows],
+                         [t.name for t in swf.tags if t.name != 'End'])
+        self.assertEqual(
+            sorted(cid for _, cid in rows if cid is not None),
+            sorted(swf.characters))
+
+    def test_sprites(self):
+        path = os.path.join(BASEDIR, 'subscribe.swf')
+        self.catalog.index([path])
+        swf = parsefile(path)
+        (sprite,) = [t for t in swf.tags if t.name == 'DefineSprite']
+
+        ((position,),) = self.catalog.query(
+            "SELECT position FROM tags WHERE name = 'DefineSprite'")
+        rows = self.catalog.query(
+            "SELECT name, depth FROM tags WHERE parent = ? "
+            "ORDER BY position", (position,))
+        self.assertEqual([name for name, _ in rows],
+                         [t.name for t in sprite.ControlTags
+                          if t.name != 'End'])
+        self.assertTrue(all(depth == 1 for _, depth in rows))
+
+    def test_offsets(self):
+        # offsets are in the uncompressed file, so check them on a FWS
+        with open(os.path.join(BASEDIR, 'subscribe.swf'), 'rb') as fh:
+            data = fh.read()
+        data = b'FWS' + data[3:8] + zlib.decompress(data[8:])
+        path = os.path.join(self.tempdir, 'uncompressed.swf')
+        with open(path, 'wb') as fh:
+            fh.write(data)
+        self.catalog.index([os.path.join(BASEDIR, 'subscribe.swf'), path])
+
+        query = ("SELECT offset, length, sha1 FROM tags WHERE file_id = "
+                 "(SELECT id FROM files WHERE path = ?) ORDER BY position")
+        rows = self.catalog.query(query, (path,))
+        self.assertEqual(
+            rows, self.catalog.query(
+                query, (os.path.join(BASEDIR, 'subscribe.swf'),)))
+        for offset, length, sha1 in rows:
+            self.assertEqual(
+                hashlib.sha1(data[offset:offset + length]).hexdigest(), sha1)
+
+    def test_reindex_unchanged(self):
+        path = self._copy('subscribe.swf')
+        self.assertEqual(self.catalog.index([path]), 1)
+        with mock.patch.object(Catalog, '_get_tags') as m:
+            self.assertEqual(self.catalog.index([path]), 0)
+
+            # touched, but the same content
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            self.assertEqual(self.catalog.index([path]), 0)
+        self.assertFalse(m.called)
+        ((mtime_ns,),) = self.catalog.query("SELECT mtime_ns FROM files")
+        self.assertEqual(mtime_ns, stat.st_mtime_ns + 10 ** 9)
+
+    def test_reindex_changed(self):
+        path = self._copy('subscribe.swf')
+        self.catalog.index([path])
+        shutil.copy(os.path.join(BASEDIR, 'wivet1.swf'), path)
+        self.assertEqual(self.catalog.index([path]), 1)
+
+        rows = self.catalog.query("SELECT id, version FROM files")
+        self.assertEqual(len(rows), 1)
+        ((file_id, version),) = rows
+        self.assertEqual(version, parsefile(path).header.Version)
+        ((quantity,),) = self.catalog.query("SELECT count(*) FROM tags")
+        ((quantity_file,),) = self.catalog.query(
+            "SELECT count(*) FROM tags WHERE file_id = ?", (file_id,))
+        self.assertEqual(quantity, quantity_file)
+
+    def test_reindex_new_version(self):
+        path = self._copy('subscribe.swf')
+        self.catalog.index([path])
+        with mock.patch.object(catalog, 'VERSION', 'other'):
+            self.assertEqual(self.catalog.index([path]), 1)
+
+    def test_broken_file(self):
+        path = os.path.join(self.tempdir, 'broken.swf')
+        with open(path, 'wb') as fh:
+            fh.write(b'CWS\x0a\x00\x00\x00\x00garbage')
+        self.assertEqual(self.catalog.index([path]), 1)
+        ((signature, error),) = self.catalog.query(
+            "SELECT signature, error FROM files")
+        self.assertIsNone(signature)
+        self.assertIn("error", error.lower())
+        self.assertEqual(self.catalog.query("SELECT * FROM tags"), [])
+
+    def test_truncated_file(self):
+        with open(os.path.join(BASEDIR, 'subscribe.swf'), 'rb') as fh:
+            data = fh.read()
+        data = b'FWS' + data[3:8] + zlib.decompress(data[8:])
+        path = os.path.join(self.tempdir, 'truncated.swf')
+        with open(path, 'wb') as fh:
+            fh.write(data[:len(data) // 2])
+        self.catalog.index([path])
+
+        ((signature, frame_count, error),) = self.catalog.query(
+            "SELECT signature, frame_count, error FROM files")
+        swf = parsefile(os.path.join(BASEDIR, 'subscribe.swf'))
+        self.assertEqual(signature, 'FWS')
+        self.assertEqual(frame_count, swf.header.FrameCount)
+
+        rows = self.catalog.query(
+            "SELECT name, error FROM tags WHERE depth = 0 ORDER BY position")
+        self.assertEqual([name for name, _ in rows],
+                         [t.name for t in swf.tags[:len(rows)]])
+        self.assertTrue(all(error is None for _, error in rows[:-1]))
+        self.assertEqual(rows[-1][1],
+                         "Tag {} exceeds the data".format(rows[-1][0]))
+        self.assertEqual(error, rows[-1][1])
+
+    def test_broken_tag_in_sprite(self):
+        # a sprite whose only tag says it's longer than the sprite
+        inner = struct.pack("<H", 1 << 6 | 10) + b'\0' * 4
+        sprite = struct.pack("<HH", 1, 1) + inner
+        body = b'\x00' + struct.pack("<HH", 0x1800, 1)
+        body += struct.pack("<H", 39 << 6 | len(sprite)) + sprite
+        body += struct.pack("<H", 1 << 6) + b'\0\0'
+        path = os.path.join(self.tempdir, 'broken.swf')
+        with open(path, 'wb') as fh:
+            fh.write(b'FWS\x0a' + struct.pack("<I", 8 + len(body)) + body)
+        self.catalog.index([path])
+
+        rows = self.catalog.query(
+            "SELECT name, depth, length, error FROM tags ORDER BY position")
+        self.assertEqual(rows, [
+            ('DefineSprite', 0, len(sprite), None),
+            ('ShowFrame', 0, 0, None),
+            ('ShowFrame', 1, 4, "Tag ShowFrame exceeds the data"),
+        ])
+
+    def test_old_database(self):
+        # without the errors of the tags
+        path = os.path.join(self.tempdir, "old.db")
+        connection = sqlite3.connect(path)
+        connection.executescript(
+            catalog.SCHEMA.replace("    error TEXT,\n", ""))
+        connection.close()
+        with Catalog(path) as cat:
+            cat.index([os.path.join(BASEDIR, 'subscribe.swf')])
+            errors = cat.query("SELECT error FROM tags")
+        self.assertTrue(errors)
+        self.assertEqual(set(errors), {(None,)})
+
+    def test_batches(self):
+        paths = [self._copy(fname) for fname in os.listdir(BASEDIR)]
+        with mock.patch.object(self.catalog, 'connection',
+                               wraps=self.catalog.connection) as m:
+            self.catalog.index(paths, batch_size=2)
+        self.assertEqual(m.commit.call_count, 3)
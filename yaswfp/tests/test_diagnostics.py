@@ -0,0 +1,199 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Test cases for the diagnostics of the parsing."""
+
+import io
+import os
+import pickle
+import struct
+import unittest
+import warnings
+
+from yaswfp import diagnostics
+from yaswfp.swfparser import IncrementalSWFParser, SWFParser, parsefile
+
+BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
+
+
+def _tag(tag_type, payload):
+    """Build a tag with a long header."""
+    return struct.pack("<HI", tag_type << 6 | 0x3f, len(payload)) + payload
+
+
+class DiagnosticsTestCase(unittest.TestCase):
+    """The collector itself."""
+
+    def test_add(self):
+        diags = diagnostics.Diagnostics(warn=False)
+        diags.add(diagnostics.FAILING_TAG, 2, 100, 10, "bad shape")
+        self.assertEqual(len(diags), 1)
+        (event,) = diags
+        self.assertEqual(event.code, diagnostics.FAILING_TAG)
+        self.assertEqual(event.tag_type, 2)
+        self.assertEqual(event.offset, 100)
+        self.assertEqual(event.length, 10)
+        self.assertEqual(event.message, "bad shape")
+
+    def test_warn(self):
+        diags = diagnostics.Diagnostics()
+        with warnings.catch_warnings(record=True) as warned:
+            warnings.simplefilter("always")
+            diags.add(diagnostics.UNKNOWN_TAG, 63, 0, 1, "unknown")
+        self.assertEqual([str(w.message) for w in warned], ["unknown"])
+
+        diags = diagnostics.Diagnostics(warn=False)
+        with warnings.catch_warnings(record=True) as warned:
+            warnings.simplefilter("always")
+            diags.add(diagnostics.UNKNOWN_TAG, 63, 0, 1, "unknown")
+        self.assertEqual(warned, [])
+
+    def test_limit(self):
+        diags = diagnostics.Diagnostics(limit=2, warn=False)
+        for i in range(5):
+            diags.add(diagnostics.UNKNOWN_TAG, 63, i, 1, "unknown")
+        self.assertEqual([event.offset for event in diags], [0, 1])
+        self.assertEqual(diags.dropped, 3)
+        self.assertEqual(len(diags), 5)
+        self.assertEqual(diags.summary(),
+                         ["unknown-tag: 5", "(3 not kept)"])
+
+    def test_copy(self):
+        original = diagnostics.Diagnostics(limit=1, warn=False)
+        original.add(diagnostics.UNKNOWN_TAG, 63, 0, 1, "unknown")
+        original.add(diagnostics.UNKNOWN_TAG, 41, 5, 1, "unknown")
+        new = original.copy()
+        self.assertEqual((new.limit, new.warn), (1, False))
+        self.assertEqual(new.events, original.events)
+        self.assertEqual(new.counts, original.counts)
+        self.assertEqual(new.dropped, 1)
+
+        new.add(diagnostics.FAILING_TAG, 2, 0, 1, "failing")
+        self.assertEqual(len(original), 2)
+        self.assertEqual(original.dropped, 1)
+
+    def test_merge(self):
+        first = diagnostics.Diagnostics(limit=1, warn=False)
+        first.add(diagnostics.UNKNOWN_TAG, 63, 0, 1, "unknown")
+        first.add(diagnostics.UNKNOWN_TAG, 41, 5, 1, "unknown")
+        second = diagnostics.Diagnostics(warn=False)
+        second.add(diagnostics.FAILING_TAG, 2, 0, 1, "failing")
+
+        total = first + second
+        self.assertEqual(total.counts, {'unknown-tag': 2, 'failing-tag': 1})
+        self.assertEqual(len(total.events), 2)
+        self.assertEqual(total.dropped, 1)
+
+        merged = diagnostics.Diagnostics(limit=1, warn=False)
+        merged.merge(first)
+        merged.merge(second)
+        self.assertEqual(merged.counts, total.counts)
+        self.assertEqual(merged.dropped, 2)
+
+    def test_extend(self):
+        other = diagnostics.Diagnostics(limit=1, warn=False)
+        other.add(diagnostics.UNKNOWN_TAG, 63, 0, 1, "unknown")
+        other.add(diagnostics.UNKNOWN_TAG, 41, 5, 1, "unknown")
+        diags = diagnostics.Diagnostics(limit=1)
+        with warnings.catch_warnings(record=True) as warned:
+            warnings.simplefilter("always")
+            diags.extend(other)
+        self.assertEqual(len(warned), 1)
+        self.assertEqual(diags.counts, {'unknown-tag': 2})
+        self.assertEqual(diags.dropped, 1)
+
+
+class ParserDiagnosticsTestCase(unittest.TestCase):
+    """The problems found by the parser."""
+
+    def _parse(self, fname, **kwargs):
+        with warnings.catch_warnings(record=True) as warned:
+            warnings.simplefilter("always")
+            swf = parsefile(os.path.join(BASEDIR, fname), **kwargs)
+        return swf, [str(warning.message) for warning in warned]
+
+    def test_unknown(self):
+        swf, warned = self._parse('wivet1.swf')
+        self.assertEqual(warned, ['unkonwn tag type: 63',
+                                  'unkonwn tag type: 41'])
+        self.assertEqual([(event.code, event.tag_type, event.offset,
+                           event.length) for event in swf.diagnostics],
+                         [('unknown-tag', 63, 526, 16),
+                          ('unknown-tag', 41, 555, 26)])
+
+    def test_failing(self):
+        swf, warned = self._parse('dqsv1.swf')
+        (event,) = swf.diagnostics
+        self.assertEqual(event.code, 'failing-tag')
+        self.assertEqual(event.tag_type, 22)
+        self.assertEqual(event.length, 175)
+        self.assertEqual(warned, [event.message])
+
+        # the offset is where the payload is, in the uncompressed file
+        failing = [tag for tag in swf.tags
+                   if type(tag).__name__ == 'FailingObject']
+        with open(os.path.join(BASEDIR, 'dqsv1.swf'), 'rb') as fh:
+            parser = SWFParser.__new__(SWFParser)
+            parser._init_state(fh, True, False)
+            parser._get_header()
+            content = b'\0' * 8 + parser._src.getvalue()
+        self.assertEqual(content[event.offset:event.offset + event.length],
+                         failing[0].raw_payload)
+
+    def test_silent(self):
+        swf, warned = self._parse('wivet1.swf', warn=False)
+        self.assertEqual(warned, [])
+        self.assertEqual(len(swf.diagnostics), 2)
+
+    def test_limit(self):
+        swf, warned = self._parse('wivet1.swf', max_diagnostics=1)
+        self.assertEqual(len(warned), 1)
+        self.assertEqual(len(swf.diagnostics.events), 1)
+        self.assertEqual(swf.diagnostics.counts, {'unknown-tag': 2})
+
+    def test_parallel(self):
+        serial, _ = self._parse('wivet1.swf', warn=False)
+        parallel, warned = self._parse('wivet1.swf', jobs=2)
+        self.assertEqual(parallel.diagnostics.events,
+                         serial.diagnostics.events)
+        self.assertEqual(len(warned), 2)
+
+    def test_incremental(self):
+        serial, _ = self._parse('wivet1.swf', warn=False)
+        with open(os.path.join(BASEDIR, 'wivet1.swf'), 'rb') as fh:
+            data = fh.read()
+        parser = IncrementalSWFParser(warn=False)
+        for pos in range(0, len(data), 100):
+            parser.feed(data[pos:pos + 100])
+        parser.close()
+        self.assertEqual(parser.diagnostics.events,
+                         serial.diagnostics.events)
+
+    def test_sprite_nested(self):
+        # an unknown tag inside a sprite, in a FWS file
+        sprite = struct.pack("<HH", 5, 1) + _tag(1023, b'ab') + b'\0\0'
+        body = b'\x00' + struct.pack("<HH", 0x1800, 1) + _tag(39, sprite)
+        data = b'FWS\x0a' + struct.pack("<I", 10 + len(body)) + body + b'\0\0'
+        swf = SWFParser(io.BytesIO(data), warn=False)
+        (event,) = swf.diagnostics
+        self.assertEqual(event.tag_type, 1023)
+        self.assertEqual(data[event.offset:event.offset + 2], b'ab')
+
+    def test_pickle(self):
+        swf, _ = self._parse('wivet1.swf', warn=False)
+        new = pickle.loads(pickle.dumps(swf.diagnostics))
+        self.assertEqual(new.events, swf.diagnostics.events)
+        self.assertEqual(new.counts, swf.diagnostics.counts)
@@ -0,0 +1,170 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Tests for the exporters."""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import unittest
+import warnings
+
+from yaswfp import export, synth
+from yaswfp.swfparser import _make_object, parsefile
+
+BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
+
+
+def _load_lines(fname, **kwargs):
+    """Export the sample and return the decoded records."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with open(os.path.join(BASEDIR, fname), 'rb') as fh:
+            return [json.loads(line)
+                    for line in export.iter_json_lines(fh, **kwargs)]
+
+
+class JSONLinesTestCase(unittest.TestCase):
+    """Export as JSON lines."""
+
+    def test_header_and_tags(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            swf = parsefile(os.path.join(BASEDIR, 'dqsv1.swf'))
+        records = _load_lines('dqsv1.swf', chunk_size=1000)
+        header = records[0]
+        self.assertEqual(header['_name'], 'Header')
+        self.assertEqual(header['Version'], swf.header.Version)
+        self.assertEqual(header['FrameSize'], list(swf.header.FrameSize))
+        self.assertEqual([r['_name'] for r in records[1:]],
+                         [t.name for t in swf.tags])
+        self.assertEqual([r['_index'] for r in records[1:]],
+                         list(range(len(swf.tags))))
+
+        # failing and unknown stuff is marked
+        kinds = set(r.get('_kind') for r in records[1:])
+        self.assertIn('FailingObject', kinds)
+
+    def test_payload_hashed(self):
+        records = _load_lines('wivet1.swf')
+        (abc,) = [r for r in records if r['_name'] == 'DoABC']
+        swf = parsefile(os.path.join(BASEDIR, 'wivet1.swf'))
+        (tag,) = [t for t in swf.tags if t.name == 'DoABC']
+        self.assertEqual(abc['ABCData'], {
+            'len': len(tag.ABCData),
+            'sha1': hashlib.sha1(tag.ABCData).hexdigest()})
+
+    def test_payload_base64(self):
+        swf = parsefile(os.path.join(BASEDIR, 'wivet1.swf'))
+        (tag,) = [t for t in swf.tags if t.name == 'DoABC']
+        size = len(tag.ABCData)
+
+        records = _load_lines('wivet1.swf', base64_limit=size)
+        (abc,) = [r for r in records if r['_name'] == 'DoABC']
+        self.assertEqual(abc['ABCData']['len'], size)
+        self.assertEqual(base64.b64decode(abc['ABCData']['base64']),
+                         tag.ABCData)
+
+        # over the limit
+        records = _load_lines('wivet1.swf', base64_limit=size - 1)
+        (abc,) = [r for r in records if r['_name'] == 'DoABC']
+        self.assertNotIn('base64', abc['ABCData'])
+
+    def test_sprites_nested(self):
+        records = _load_lines('subscribe.swf')
+        (sprite,) = [r for r in records if r['_name'] == 'DefineSprite']
+        self.assertTrue(all('_depth' not in r for r in records))
+        names = [c['_name'] for c in sprite['ControlTags']]
+        self.assertIn('PlaceObject2', names)
+        self.assertIn('ShowFrame', names)
+
+    def test_sprites_flattened(self):
+        nested = _load_lines('subscribe.swf')
+        (sprite,) = [r for r in nested if r['_name'] == 'DefineSprite']
+        children = sprite.pop('ControlTags')
+
+        records = _load_lines('subscribe.swf', flatten=True)
+        self.assertEqual(len(records), len(nested) + len(children))
+        (flat,) = [r for r in records if r['_name'] == 'DefineSprite']
+        flat_index = flat['_index']
+        self.assertEqual(flat, sprite)
+
+        inside = [r for r in records if r.get('_parent') == flat_index]
+        self.assertEqual([r['_name'] for r in inside],
+                         [c['_name'] for c in children])
+        self.assertTrue(all(r['_depth'] == 1 for r in inside))
+        self.assertEqual([r['_index'] for r in records[1:]],
+                         list(range(len(records) - 1)))
+
+    def test_source(self):
+        records = _load_lines('subscribe.swf', source='foo.swf')
+        self.assertTrue(all(r['_file'] == 'foo.swf' for r in records))
+
+    def test_write(self):
+        fh = io.StringIO()
+        with open(os.path.join(BASEDIR, 'subscribe.swf'), 'rb') as src:
+            export.write_json_lines(src, fh)
+        lines = fh.getvalue().split("\n")
+        self.assertEqual(lines[-1], "")
+        self.assertEqual(len(lines) - 1, len(_load_lines('subscribe.swf')))
+
+    def test_non_finite(self):
+        obj = _make_object("Test")
+        obj.Values = [1.5, float('nan'), float('inf'), -float('inf')]
+        record = export._Converter(None).value(obj)
+        self.assertEqual(record['Values'], [1.5, None, None, None])
+        self.assertEqual(export._encode(record),
+                         '{"_name":"Test","Values":[1.5,null,null,null]}')
+        self.assertRaises(ValueError, export._encode, {'a': float('nan')})
+
+    def test_truncated(self):
+        with open(os.path.join(BASEDIR, 'subscribe.swf'), 'rb') as fh:
+            data = fh.read()
+        src = io.BytesIO(data[:len(data) // 2])
+        with self.assertRaises(ValueError):
+            list(export.iter_json_lines(src))
+
+
+class DeepNestingTestCase(unittest.TestCase):
+    """Export sprites nested deeper than the recursion limit."""
+
+    def _export(self, **kwargs):
+        data = synth.generate(compression='FWS', shapes=1, edges=1, fonts=0,
+                              bitmaps=0, actions=0, sprite_depth=3000)
+        return list(export.iter_json_lines(
+            io.BytesIO(data), max_sprite_depth=5000, **kwargs))
+
+    def test_nested(self):
+        lines = self._export()
+        (line,) = [line for line in lines if 'DefineSprite' in line]
+        self.assertEqual(line.count('"_name":"DefineSprite"'), 3000)
+        self.assertTrue(line.startswith('{"_index":1,'))
+        self.assertTrue(line.endswith(',{"_name":"ShowFrame"}]}' * 3000))
+
+    def test_flattened(self):
+        lines = self._export(flatten=True)
+        records = [json.loads(line) for line in lines]
+        sprites = [r for r in records if r['_name'] == 'DefineSprite']
+        self.assertEqual(len(sprites), 3000)
+        self.assertEqual(sprites[-1]['_depth'], 2999)
+
+    def test_deep_encoding_same_as_json(self):
+        records = _load_lines('subscribe.swf')
+        for record in records:
+            self.assertEqual(export._encode_deep(record),
+                             export._encoder.encode(record))
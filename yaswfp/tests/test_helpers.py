@@ -21,6 +21,7 @@ import unittest
 
 from yaswfp.helpers import (
     BitConsumer,
+    BoundedReader,
     ReadQuantityController,
     unpack_ui8,
     unpack_ui32,
@@ -134,3 +135,36 @@ class GuardedTestCase(unittest.TestCase):
             pass
         else:
             self._fail("Should have failed")
+
+
+class BoundedReaderTestCase(unittest.TestCase):
+    """Check the BoundedReader class."""
+
+    def test_read_until_end(self):
+        src = io.BytesIO(b'abcdefgh')
+        src.seek(2)
+        bounded = BoundedReader(src, 5)
+        self.assertEqual(bounded.read(2), b'cd')
+        self.assertEqual(bounded.read(5), b'e')
+        self.assertEqual(bounded.read(1), b'')
+        self.assertEqual(bounded.tell(), 5)
+
+    def test_read_all(self):
+        src = io.BytesIO(b'abcdefgh')
+        bounded = BoundedReader(src, 3)
+        self.assertEqual(bounded.read(), b'abc')
+
+    def test_seek(self):
+        src = io.BytesIO(b'abcdefgh')
+        bounded = BoundedReader(src, 3)
+        bounded.seek(6)
+        self.assertEqual(bounded.read(1), b'')
+        bounded.seek(1)
+        self.assertEqual(bounded.read(1), b'b')
+
+    def test_nested(self):
+        src = io.BytesIO(b'abcdefgh')
+        outer = BoundedReader(src, 4)
+        inner = BoundedReader(outer, 6)
+        self.assertIs(inner.src, src)
+        self.assertEqual(inner.read(), b'abcd')
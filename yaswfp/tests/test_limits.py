@@ -0,0 +1,287 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Test cases for the limits to the parsing."""
+
+import io
+import os
+import pickle
+import struct
+import threading
+import time
+import tracemalloc
+import unittest
+import zlib
+
+from unittest.mock import patch
+
+from yaswfp import synth
+from yaswfp.cache import MemoryCache
+from yaswfp.limits import Cancelled, DeadlineExceeded, LimitExceeded, Limits
+from yaswfp.swfparser import IncrementalSWFParser, SWFParser, parsefile
+
+BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
+
+
+def _parse(data, **limits):
+    """Parse the SWF content with the given limits."""
+    return SWFParser(io.BytesIO(data), limits=Limits(**limits), warn=False)
+
+
+def _bomb(declared, real):
+    """Build a CWS file declaring a length but with much more content."""
+    body = b'\x00' + struct.pack("<HH", 0x1800, 1) + b'\0' * real
+    return b'CWS\x0a' + struct.pack("<I", declared) + zlib.compress(body, 9)
+
+
+class LimitsTestCase(unittest.TestCase):
+    """The limits to sizes and quantities."""
+
+    def test_no_limits(self):
+        data = synth.generate(compression='CWS')
+        swf = _parse(data)
+        self.assertEqual(swf.tags[-1].name, 'ShowFrame')
+
+    def test_declared_size(self):
+        data = _bomb(0xFFFFFFF0, 100)
+        with self.assertRaises(LimitExceeded) as cm:
+            _parse(data, max_decompressed_size=1024 ** 2)
+        self.assertEqual(cm.exception.limit, 'max_decompressed_size')
+        self.assertEqual(cm.exception.value, 0xFFFFFFF0 - 8)
+
+    def test_bomb_lying_about_size(self):
+        # a small declared size, but lots of content; it's never inflated
+        # completely, even without limits
+        data = _bomb(100, 50 * 1024 ** 2)
+        tracemalloc.start()
+        try:
+            with self.assertRaises(ValueError):
+                _parse(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 1024 ** 2)
+
+    def test_bitmap_data(self):
+        data = synth.generate(compression='FWS', shapes=0, fonts=0,
+                              bitmaps=1, bitmap_size=128, sprite_depth=0,
+                              actions=0)
+        with self.assertRaises(LimitExceeded) as cm:
+            _parse(data, max_decompressed_size=60000)
+        self.assertEqual(cm.exception.limit, 'max_decompressed_size')
+        self.assertEqual(cm.exception.value, 60001)
+
+        swf = _parse(data, max_decompressed_size=70000)
+        self.assertEqual(len(swf.tags[0].BitmapPixelData), 128 * 128 * 4)
+
+    def test_tag_size(self):
+        data = synth.generate(compression='FWS', shapes=0, fonts=0,
+                              bitmaps=1, bitmap_size=128, sprite_depth=0,
+                              actions=0)
+        # the bitmap is the first tag, after the header
+        rect_size = (5 + 4 * (data[8] >> 3) + 7) // 8
+        (tag_len,) = struct.unpack_from("<I", data, 8 + rect_size + 4 + 2)
+
+        # the uncompressed size is not related to the tag size
+        _parse(data, max_decompressed_size=70000, max_tag_size=tag_len)
+        with self.assertRaises(LimitExceeded) as cm:
+            _parse(data, max_tag_size=tag_len - 1)
+        self.assertEqual(cm.exception.limit, 'max_tag_size')
+        self.assertEqual(cm.exception.value, tag_len)
+
+        # the incremental parser does not wait for the whole tag
+        parser = IncrementalSWFParser(
+            limits=Limits(max_tag_size=tag_len - 1))
+        with self.assertRaises(LimitExceeded):
+            parser.feed(data[:100])
+
+    def test_tags(self):
+        data = synth.generate(compression='FWS', shapes=2, fonts=0,
+                              bitmaps=0, sprite_depth=3, actions=0)
+        # two shapes, three sprites with their PlaceObject2 and ShowFrame,
+        # and a ShowFrame
+        swf = _parse(data, max_tags=12)
+        self.assertEqual(len(swf.tags), 4)
+        with self.assertRaises(LimitExceeded) as cm:
+            _parse(data, max_tags=11)
+        self.assertEqual(cm.exception.limit, 'max_tags')
+        self.assertEqual(cm.exception.value, 12)
+
+    def test_tags_parallel(self):
+        data = synth.generate(compression='FWS', shapes=10, fonts=0,
+                              bitmaps=0, sprite_depth=0, actions=0)
+        with self.assertRaises(LimitExceeded):
+            SWFParser(io.BytesIO(data), jobs=2, limits=Limits(max_tags=5))
+
+    def test_shape_records(self):
+        data = synth.generate(compression='FWS', shapes=1, edges=50,
+                              fonts=0, bitmaps=0, sprite_depth=0, actions=0)
+        # a style change, the edges, and the end
+        _parse(data, max_shape_records=52)
+        with self.assertRaises(LimitExceeded) as cm:
+            _parse(data, max_shape_records=51)
+        self.assertEqual(cm.exception.limit, 'max_shape_records')
+
+    def test_string_length(self):
+        # a FrameLabel
+        payload = b'label\x00'
+        body = b'\x00' + struct.pack("<HH", 0x1800, 1)
+        body += struct.pack("<H", 43 << 6 | len(payload)) + payload + b'\0\0'
+        data = b'FWS\x0a' + struct.pack("<I", 8 + len(body)) + body
+        swf = _parse(data, max_string_length=5)
+        self.assertEqual(swf.tags[0].Name, 'label')
+        with self.assertRaises(LimitExceeded) as cm:
+            _parse(data, max_string_length=4)
+        self.assertEqual(cm.exception.limit, 'max_string_length')
+        self.assertEqual(cm.exception.value, 5)
+
+    def test_depth(self):
+        data = synth.generate(compression='FWS', shapes=1, edges=1, fonts=0,
+                              bitmaps=0, sprite_depth=3, actions=0)
+        _parse(data, max_depth=3)
+        with self.assertRaises(LimitExceeded) as cm:
+            _parse(data, max_depth=2)
+        self.assertEqual(cm.exception.limit, 'max_depth')
+        self.assertEqual(cm.exception.value, 3)
+
+    def test_class_default(self):
+        data = synth.generate(compression='FWS', shapes=2, fonts=0,
+                              bitmaps=0, sprite_depth=0, actions=0)
+        with patch.object(SWFParser, 'limits', Limits(max_tags=1)):
+            with self.assertRaises(LimitExceeded):
+                SWFParser(io.BytesIO(data))
+
+    def test_incremental(self):
+        data = synth.generate(compression='CWS', size=200000)
+        parser = IncrementalSWFParser(
+            limits=Limits(max_decompressed_size=100000))
+        with self.assertRaises(LimitExceeded):
+            parser.feed(data)
+
+        # the declared size is checked at the start
+        parser = IncrementalSWFParser(
+            limits=Limits(max_decompressed_size=100))
+        with self.assertRaises(LimitExceeded):
+            parser.feed(data[:8])
+
+    def test_pickle(self):
+        exc = pickle.loads(pickle.dumps(LimitExceeded('max_tags', 5)))
+        self.assertEqual(exc.limit, 'max_tags')
+        self.assertEqual(exc.value, 5)
+        self.assertEqual(str(exc), "Limit exceeded: max_tags is 5")
+
+
+class _CancelAfter:
+    """A cancel event that gets set after being checked some times."""
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    def is_set(self):
+        self.checks -= 1
+        return self.checks < 0
+
+
+class InterruptionTestCase(unittest.TestCase):
+    """The deadline and cancellation of the parsing."""
+
+    def _data(self, **kwargs):
+        mix = dict(shapes=0, fonts=0, bitmaps=0, sprite_depth=0, actions=0)
+        mix.update(kwargs)
+        return synth.generate(compression='FWS', **mix)
+
+    def test_deadline(self):
+        data = self._data(shapes=3)
+        with self.assertRaises(DeadlineExceeded) as cm:
+            SWFParser(io.BytesIO(data), deadline=time.monotonic() - 1)
+        self.assertIsInstance(cm.exception, TimeoutError)
+
+        swf = SWFParser(io.BytesIO(data), deadline=time.monotonic() + 60)
+        self.assertFalse(swf.partial)
+        self.assertEqual(len(swf.tags), 4)
+
+    def test_deadline_partial(self):
+        data = self._data(shapes=3)
+        swf = SWFParser(io.BytesIO(data), deadline=time.monotonic() - 1,
+                        partial=True, warn=False)
+        self.assertTrue(swf.partial)
+        self.assertEqual(swf.tags, [])
+        (event,) = swf.diagnostics
+        self.assertEqual(event.code, 'interrupted')
+
+    def test_cancel(self):
+        data = self._data(shapes=3)
+        cancel = threading.Event()
+        cancel.set()
+        with self.assertRaises(Cancelled):
+            SWFParser(io.BytesIO(data), cancel=cancel)
+
+    def test_cancel_between_tags(self):
+        data = self._data(shapes=3)
+        swf = SWFParser(io.BytesIO(data), cancel=_CancelAfter(2),
+                        partial=True, warn=False)
+        self.assertTrue(swf.partial)
+        self.assertEqual([tag.name for tag in swf.tags],
+                         ['DefineShape', 'DefineShape'])
+
+    def test_inside_sprite(self):
+        # the sprite being decoded is not returned
+        data = self._data(shapes=1, sprite_depth=3)
+        swf = SWFParser(io.BytesIO(data), cancel=_CancelAfter(3),
+                        partial=True, warn=False)
+        self.assertEqual([tag.name for tag in swf.tags], ['DefineShape'])
+
+    def test_inside_shape(self):
+        data = self._data(shapes=1, edges=5000)
+        # the first check is before the tag
+        swf = SWFParser(io.BytesIO(data), cancel=_CancelAfter(1),
+                        partial=True, warn=False)
+        self.assertEqual(swf.tags, [])
+
+    def test_inside_glyphs(self):
+        data = self._data(fonts=1, glyphs=600, edges=10)
+        # the first checks are before the tag, and on the first glyph
+        swf = SWFParser(io.BytesIO(data), cancel=_CancelAfter(2),
+                        partial=True, warn=False)
+        self.assertEqual(swf.tags, [])
+
+    def test_inside_actions(self):
+        data = self._data(actions=2000)
+        # the first checks are before the tag, and on the first action
+        swf = SWFParser(io.BytesIO(data), cancel=_CancelAfter(2),
+                        partial=True, warn=False)
+        self.assertEqual(swf.tags, [])
+
+    def test_parallel(self):
+        data = self._data(shapes=3)
+        with self.assertRaises(ValueError):
+            SWFParser(io.BytesIO(data), jobs=2, deadline=time.monotonic())
+
+    def test_partial_not_cached(self):
+        cache = MemoryCache()
+        path = os.path.join(BASEDIR, 'subscribe.swf')
+        swf = parsefile(path, cache=cache, deadline=time.monotonic() - 1,
+                        partial=True, warn=False)
+        self.assertTrue(swf.partial)
+        swf = parsefile(path, cache=cache)
+        self.assertFalse(swf.partial)
+        self.assertEqual(cache.misses, 2)
+
+    def test_pickle(self):
+        data = self._data(shapes=3)
+        swf = SWFParser(io.BytesIO(data), cancel=threading.Event())
+        new = pickle.loads(pickle.dumps(swf))
+        self.assertEqual(len(new.tags), 4)
@@ -17,11 +17,26 @@
 """Test cases for the parser."""
 
 import io
+import lzma
+import os
+import pickle
+import struct
+import threading
+import tracemalloc
 import unittest
+import warnings
+import zlib
 
 from unittest.mock import patch
 
-from yaswfp.swfparser import SWFParser
+from yaswfp import swfparser, synth, visitor
+from yaswfp.cache import MemoryCache
+from yaswfp.limits import LimitExceeded, Limits
+
+from yaswfp.swfparser import (
+    Coverage, IncrementalSWFParser, SWFParser, parsefile)
+
+BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
 
 
 class StructsTestCase(unittest.TestCase):
@@ -51,3 +66,817 @@ class StructsTestCase(unittest.TestCase):
         parser = SWFParser(io.BytesIO(b'\x8c\xac\x29'))
         # compose: 0101001 0101100 0001100
         self.assertEqual(parser._get_struct_encodedu32(), 677388)
+
+
+class StateTestCase(unittest.TestCase):
+    """The parsing configuration and state is per instance."""
+
+    def _get_src(self, fname):
+        with open(os.path.join(BASEDIR, fname), 'rb') as fh:
+            return io.BytesIO(fh.read())
+
+    def _get_unsupported(self):
+        # just a header and a DefineSound tag (not supported) of 2 bytes
+        return io.BytesIO(b'FWS\x0a\x13\x00\x00\x00\x00\x00\x0c\x01\x00'
+                          b'\x82\x03\xab\xcd\x00\x00')
+
+    def test_unknown_alert_per_instance(self):
+        self.assertRaises(ValueError, SWFParser, self._get_unsupported(),
+                          unknown_alert=True)
+        self.assertFalse(SWFParser.unknown_alert)
+        swf = SWFParser(self._get_unsupported())
+        self.assertEqual(swf.tags[0].name, 'DefineSound')
+
+    @patch.object(SWFParser, 'unknown_alert', True)
+    def test_unknown_alert_default_from_class(self):
+        self.assertRaises(ValueError, SWFParser, self._get_unsupported())
+
+    def test_nothing_attached_to_source(self):
+        src = self._get_src('dqsv1.swf')
+        src_attribs = set(dir(src))
+        SWFParser(src)
+        self.assertEqual(set(dir(src)), src_attribs)
+
+    def test_threads(self):
+        should = repr(SWFParser(self._get_src('subscribe.swf')).tags)
+        results = []
+
+        def parse():
+            for _ in range(5):
+                swf = SWFParser(self._get_src('subscribe.swf'))
+                results.append(repr(swf.tags))
+
+        threads = [threading.Thread(target=parse) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [should] * 20)
+
+
+def _to_zws(data):
+    """Convert a CWS content to ZWS."""
+    body = zlib.decompress(data[8:])
+    filters = [{'id': lzma.FILTER_LZMA1, 'dict_size': 65536,
+                'lc': 3, 'lp': 0, 'pb': 2}]
+    compressed = lzma.compress(body, format=lzma.FORMAT_RAW, filters=filters)
+    properties = struct.pack("<BI", (2 * 5 + 0) * 9 + 3, 65536)
+    return (b'ZWS' + data[3:8] + struct.pack("<I", len(compressed)) +
+            properties + compressed)
+
+
+def _to_fws(data):
+    """Convert a CWS content to FWS."""
+    return b'FWS' + data[3:8] + zlib.decompress(data[8:])
+
+
+class IncrementalTestCase(unittest.TestCase):
+    """Parse pushing bytes."""
+
+    def _check(self, fname, convert=None, chunk_size=1):
+        fpath = os.path.join(BASEDIR, fname)
+        should = parsefile(fpath)
+        with open(fpath, 'rb') as fh:
+            data = fh.read()
+        if convert is not None:
+            data = convert(data)
+
+        parser = IncrementalSWFParser()
+        parser.inflate_size = 100
+        tags = []
+        for pos in range(0, len(data), chunk_size):
+            tags.extend(parser.feed(data[pos:pos + chunk_size]))
+        parser.close()
+
+        self.assertTrue(parser.finished)
+        self.assertEqual(parser.header.Signature, data[:3].decode("ascii"))
+        self.assertEqual(parser.header.FrameSize, should.header.FrameSize)
+        self.assertEqual(parser.header.FrameCount, should.header.FrameCount)
+        self.assertEqual([repr(t) for t in tags],
+                         [repr(t) for t in should.tags])
+
+    def test_cws_byte_by_byte(self):
+        self._check('subscribe.swf')
+
+    def test_cws_big_chunks(self):
+        self._check('1252533834.swf', chunk_size=1000)
+
+    def test_fws(self):
+        self._check('dqsv1.swf', _to_fws, chunk_size=7)
+
+    def test_zws(self):
+        self._check('wivet1.swf', _to_zws, chunk_size=3)
+
+    def test_not_finished(self):
+        with open(os.path.join(BASEDIR, 'wivet1.swf'), 'rb') as fh:
+            data = _to_fws(fh.read())
+        parser = IncrementalSWFParser()
+        parser.feed(data[:-10])
+        self.assertFalse(parser.finished)
+        self.assertRaises(ValueError, parser.close)
+
+    def test_zws_whole(self):
+        with open(os.path.join(BASEDIR, 'wivet1.swf'), 'rb') as fh:
+            data = fh.read()
+        swf = SWFParser(io.BytesIO(_to_zws(data)))
+        should = SWFParser(io.BytesIO(data))
+        self.assertEqual([repr(t) for t in swf.tags],
+                         [repr(t) for t in should.tags])
+
+
+class ProfileTestCase(unittest.TestCase):
+    """Profile the parsing."""
+
+    def _parse(self, fname, **kwargs):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return parsefile(os.path.join(BASEDIR, fname), **kwargs)
+
+    def test_off(self):
+        swf = self._parse('subscribe.swf')
+        self.assertIsNone(swf.profile)
+
+    def test_tags(self):
+        swf = self._parse('subscribe.swf', profile=True)
+        tags = swf.profile.tags
+
+        # all the tags, also the ones in the sprite
+        (sprite,) = [t for t in swf.tags if t.name == 'DefineSprite']
+        self.assertEqual(
+            sum(stats.count for stats in tags.values()),
+            len(swf.tags) + len(sprite.ControlTags))
+        self.assertEqual(tags['DefineShape'].count, 8)
+        self.assertEqual(tags['DefineShape'].ok, 8)
+        self.assertEqual(tags['SetBackgroundColor'].bytes, 3)
+        for stats in tags.values():
+            self.assertGreaterEqual(stats.wall, 0)
+            self.assertGreaterEqual(stats.cpu, 0)
+
+    def test_actions(self):
+        swf = self._parse('subscribe.swf', profile=True)
+        actions = swf.profile.actions
+        self.assertEqual(actions['ActionStop'].count, 1)
+        self.assertEqual(actions['ActionStop'].bytes, 1)
+        # code, length and the payload
+        self.assertEqual(actions['ActionGetURL'].bytes, 19)
+
+    def test_empty_push(self):
+        # a push without values gives no action, but is accounted
+        data = _fws(_tag(12, b'\x96\x00\x00\x00'))
+        swf = SWFParser(io.BytesIO(data), profile=True)
+        self.assertEqual(swf.tags[0].Actions, [])
+        stats = swf.profile.actions['ActionPush']
+        self.assertEqual((stats.count, stats.ok, stats.failed), (1, 1, 0))
+
+    def test_empty_push_after_other(self):
+        data = _fws(_tag(12, b'\x07\x96\x00\x00\x00'))
+        swf = SWFParser(io.BytesIO(data), profile=True)
+        self.assertEqual([a.name for a in swf.tags[0].Actions], ['ActionStop'])
+        self.assertEqual(swf.profile.actions['ActionPush'].count, 1)
+        self.assertEqual(swf.profile.actions['ActionStop'].count, 1)
+
+    def test_outcomes(self):
+        swf = self._parse('dqsv1.swf', profile=True)
+        self.assertEqual(swf.profile.tags['DefineShape2'].failed, 1)
+        swf = self._parse('wivet1.swf', profile=True)
+        stats = swf.profile.tags['UnspecifiedObject(tag=63)']
+        self.assertEqual((stats.ok, stats.failed, stats.unknown), (0, 0, 1))
+
+    def test_merge(self):
+        profile = self._parse('subscribe.swf', profile=True).profile
+        other = self._parse('subscribe.swf', profile=True).profile
+        shapes = profile.tags['DefineShape'].bytes
+        profile.merge(other)
+        self.assertEqual(profile.tags['DefineShape'].count, 16)
+        self.assertEqual(profile.tags['DefineShape'].bytes, shapes * 2)
+        self.assertEqual(profile.actions['ActionStop'].count, 2)
+
+    def test_table(self):
+        profile = self._parse('subscribe.swf', profile=True).profile
+        lines = profile.table()
+        self.assertTrue(lines[0].startswith("Tag "))
+        self.assertTrue(any(line.startswith("Action ") for line in lines))
+        self.assertTrue(any(line.startswith("DefineShape ") for line in lines))
+
+    def test_not_in_parallel(self):
+        with self.assertRaises(ValueError):
+            self._parse('subscribe.swf', profile=True, jobs=2)
+
+
+class IOTraceTestCase(unittest.TestCase):
+    """Trace the I/O calls."""
+
+    def _parse(self, data, **kwargs):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return SWFParser(io.BytesIO(data), trace_io=True, **kwargs)
+
+    def _read(self, fname):
+        with open(os.path.join(BASEDIR, fname), 'rb') as fh:
+            return fh.read()
+
+    def test_off(self):
+        swf = parsefile(os.path.join(BASEDIR, 'subscribe.swf'))
+        self.assertIsNone(swf.io_trace)
+
+    def test_all_read(self):
+        data = _to_fws(self._read('subscribe.swf'))
+        swf = self._parse(data)
+        stats = swf.io_trace.stats
+        # everything is read, and some parts again after seeking back
+        self.assertGreaterEqual(sum(s.read_bytes for s in stats.values()),
+                                len(data))
+        self.assertEqual(stats['DefineButton2'].backward_seeks, 14)
+        self.assertEqual(stats['DefineFont2'].backward_seeks, 0)
+        for s in stats.values():
+            self.assertEqual(sum(s.read_sizes.values()), s.reads)
+
+        # each tag type by itself, also the ones inside the sprite (the
+        # tag is read at once, and then its fields from those bytes)
+        self.assertEqual(stats['SetBackgroundColor'].read_sizes,
+                         {3: 1, 1: 3})
+        self.assertIn('RemoveObject2', stats)
+        self.assertEqual(stats['Header'].read_bytes, 20)
+        self.assertIn('(tag headers)', stats)
+
+    def test_compressed(self):
+        data = self._read('subscribe.swf')
+        swf = self._parse(data)
+        stats = swf.io_trace.stats
+        # the compressed content is read at once
+        self.assertEqual(stats['Header'].read_sizes[4096], 1)
+        self.assertEqual(stats['SetBackgroundColor'].read_bytes, 6)
+
+    def test_failing_not_read_again(self):
+        # the raw payload is what was read for the tag
+        swf = self._parse(self._read('dqsv1.swf'))
+        stats = swf.io_trace.stats['DefineShape2']
+        self.assertEqual(stats.backward_seeks, 0)
+
+    def test_big_tags_from_source(self):
+        # without buffering, the fields are read straight from the source
+        # (with the same seeks back)
+        data = _to_fws(self._read('subscribe.swf'))
+        with patch.object(swfparser, 'BUFFERED_TAG_SIZE', 0):
+            swf = self._parse(data)
+        stats = swf.io_trace.stats
+        self.assertEqual(stats['DefineButton2'].backward_seeks, 14)
+        self.assertEqual(stats['SetBackgroundColor'].read_bytes, 3)
+
+    def test_pickle(self):
+        swf = self._parse(_to_fws(self._read('subscribe.swf')))
+        new = pickle.loads(pickle.dumps(swf))
+        self.assertIsNone(new.io_trace.fh)
+        self.assertEqual(new.io_trace.stats.keys(), swf.io_trace.stats.keys())
+
+    def test_table(self):
+        swf = self._parse(self._read('subscribe.swf'))
+        lines = swf.io_trace.table()
+        self.assertTrue(lines[0].startswith("Tag "))
+        self.assertTrue(any(line.startswith("PlaceObject2 ")
+                            for line in lines))
+
+    def test_not_in_parallel(self):
+        with self.assertRaises(ValueError):
+            self._parse(self._read('subscribe.swf'), jobs=2)
+
+
+class MemoryProfileTestCase(unittest.TestCase):
+    """Account the memory kept by each tag and record."""
+
+    def _parse(self, fname, **kwargs):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return parsefile(os.path.join(BASEDIR, fname), **kwargs)
+
+    def test_off(self):
+        swf = self._parse('subscribe.swf')
+        self.assertIsNone(swf.memory_profile)
+
+    def test_tags(self):
+        swf = self._parse('subscribe.swf', trace_memory=True)
+        self.assertFalse(tracemalloc.is_tracing())
+        tags = swf.memory_profile.tags
+        self.assertEqual(tags['DefineFont2'].count, 1)
+        self.assertGreater(tags['DefineFont2'].bytes, 0)
+        self.assertGreater(tags['DefineFont2'].blocks, 0)
+        # the ones inside sprites, by themselves
+        self.assertEqual(tags['RemoveObject2'].count, 2)
+
+    def test_records(self):
+        swf = self._parse('subscribe.swf', trace_memory=True)
+        records = swf.memory_profile.records
+        self.assertEqual(records['DefineFont2'].count, 1)
+        self.assertEqual(records['Matrix'].count, 83)
+        self.assertEqual(
+            sum(stats.bytes for stats in records.values()),
+            sum(stats.bytes for stats in swf.memory_profile.tags.values()))
+
+        # each object has its own class, also accounted
+        matrix = records['Matrix']
+        self.assertGreater(matrix.bytes / matrix.count, 1000)
+
+    def test_records_kind(self):
+        swf = self._parse('wivet1.swf', trace_memory=True)
+        records = swf.memory_profile.records
+        self.assertEqual(
+            records['UnspecifiedObject(tag=63) [UnknownObject]'].count, 1)
+        swf = self._parse('dqsv1.swf', trace_memory=True)
+        records = swf.memory_profile.records
+        self.assertEqual(records['DefineShape2 [FailingObject]'].count, 1)
+
+    def test_not_wrapped_after(self):
+        swf = self._parse('subscribe.swf', trace_memory=True)
+        self.assertNotIn('_get_struct_matrix', vars(swf))
+
+    def test_table(self):
+        swf = self._parse('subscribe.swf', trace_memory=True)
+        lines = swf.memory_profile.table(top=3)
+        self.assertEqual(len(lines), 8)
+        self.assertTrue(lines[0].startswith("Tag "))
+        self.assertTrue(lines[4].startswith("Record "))
+
+    def test_pickle(self):
+        swf = self._parse('subscribe.swf', trace_memory=True)
+        new = pickle.loads(pickle.dumps(swf))
+        self.assertEqual(new.memory_profile.tags.keys(),
+                         swf.memory_profile.tags.keys())
+
+    def test_already_tracing(self):
+        tracemalloc.start()
+        try:
+            with self.assertRaises(ValueError):
+                self._parse('subscribe.swf', trace_memory=True)
+        finally:
+            tracemalloc.stop()
+
+    def test_not_in_parallel(self):
+        with self.assertRaises(ValueError):
+            self._parse('subscribe.swf', trace_memory=True, jobs=2)
+
+
+class FieldsTestCase(unittest.TestCase):
+    """Decode only some fields of some tags."""
+
+    fields = {
+        'DefineShape': ['ShapeId', 'ShapeBounds'],
+        'PlaceObject2': ['Depth', 'CharacterId'],
+    }
+
+    def _parse(self, fname='subscribe.swf', **kwargs):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return parsefile(os.path.join(BASEDIR, fname), **kwargs)
+
+    def test_projected(self):
+        full = self._parse()
+        swf = self._parse(fields=self.fields)
+        self.assertEqual(len(swf.tags), len(full.tags))
+        for tag, full_tag in zip(swf.tags, full.tags):
+            self.assertEqual(tag.name, full_tag.name)
+            if tag.name == 'DefineShape':
+                self.assertEqual(tag._attribs, ['ShapeId', 'ShapeBounds'])
+                self.assertEqual(tag.ShapeBounds, full_tag.ShapeBounds)
+            elif tag.name != 'PlaceObject2':
+                self.assertEqual(str(tag), str(full_tag))
+
+        # still indexed
+        self.assertEqual(swf.characters.keys(), full.characters.keys())
+
+    def test_missing_field(self):
+        full = self._parse()
+        swf = self._parse(fields=self.fields)
+        places = [(tag, full_tag) for tag, full_tag in zip(swf.tags, full.tags)
+                  if tag.name == 'PlaceObject2']
+        with_character = [tag for tag, _ in places
+                          if tag.PlaceFlagHasCharacter]
+        self.assertTrue(with_character)
+        for tag, full_tag in places:
+            if tag.PlaceFlagHasCharacter:
+                self.assertEqual(tag._attribs[-2:], ['Depth', 'CharacterId'])
+                self.assertLess(len(tag._attribs), len(full_tag._attribs))
+            else:
+                # never complete, decoded fully
+                self.assertEqual(str(tag), str(full_tag))
+
+    def test_inside_sprites(self):
+        swf = self._parse(fields={'RemoveObject2': ['Depth']})
+        sprites = [tag for tag in swf.tags if tag.name == 'DefineSprite']
+        removes = [tag for sprite in sprites for tag in sprite.ControlTags
+                   if tag.name == 'RemoveObject2']
+        self.assertEqual(len(removes), 2)
+
+    def test_sprite(self):
+        swf = self._parse(fields={'DefineSprite': ['CharacterID']})
+        sprites = [tag for tag in swf.tags if tag.name == 'DefineSprite']
+        self.assertTrue(sprites)
+        for tag in sprites:
+            self.assertEqual(tag._attribs, ['CharacterID'])
+
+    def test_parallel(self):
+        swf = self._parse(fields=self.fields)
+        parallel = self._parse(fields=self.fields, jobs=2)
+        self.assertEqual([str(tag) for tag in parallel.tags],
+                         [str(tag) for tag in swf.tags])
+
+    def test_pickle(self):
+        swf = self._parse(fields=self.fields)
+        new = pickle.loads(pickle.dumps(swf))
+        self.assertEqual([str(tag) for tag in new.tags],
+                         [str(tag) for tag in swf.tags])
+
+    def test_cache(self):
+        cache = MemoryCache()
+        full = self._parse(cache=cache)
+        swf = self._parse(cache=cache, fields=self.fields)
+        self.assertIsNot(swf.tags, full.tags)
+        self.assertIs(self._parse(cache=cache, fields=self.fields).tags,
+                      swf.tags)
+        self.assertEqual(cache.hits, 1)
+
+    def test_not_projected_otherwise(self):
+        self._parse(fields=self.fields)
+        swf = self._parse()
+        shape = [tag for tag in swf.tags if tag.name == 'DefineShape'][0]
+        self.assertIn('Shapes', shape._attribs)
+
+
+class CoverageTestCase(unittest.TestCase):
+    """The coverage of the parsed objects."""
+
+    def _coverage(self, fname):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return parsefile(os.path.join(BASEDIR, fname)).coverage()
+
+    def test_lists_and_sprites(self):
+        coverage = self._coverage('subscribe.swf')
+        self.assertEqual(coverage.files, 1)
+        # records inside lists
+        self.assertEqual(coverage.parsed['CurvedEdgeRecord'], 144)
+        self.assertEqual(coverage.parsed['ShowFrame'], 71)
+        # tags inside sprites
+        self.assertEqual(coverage.parsed['RemoveObject2'], 2)
+        self.assertEqual(coverage.percentage, 100)
+
+    def test_unknown_and_failing(self):
+        coverage = self._coverage('dqsv1.swf')
+        self.assertEqual(coverage.failing, {'DefineShape2': 1})
+        self.assertEqual(coverage.total,
+                         sum(coverage.parsed.values()) + 1)
+        self.assertLess(coverage.percentage, 100)
+
+        coverage = self._coverage('wivet1.swf')
+        self.assertEqual(coverage.unknown, {'UnspecifiedObject(tag=41)': 1,
+                                            'UnspecifiedObject(tag=63)': 1})
+
+    def test_merge(self):
+        first = self._coverage('subscribe.swf')
+        second = self._coverage('dqsv1.swf')
+        total = first + second
+        self.assertEqual(total.files, 2)
+        self.assertEqual(total.total, first.total + second.total)
+        self.assertEqual(
+            total.parsed['ShowFrame'],
+            first.parsed['ShowFrame'] + second.parsed['ShowFrame'])
+        self.assertEqual(first.files, 1)
+
+        merged = Coverage()
+        merged.merge(first)
+        merged.merge(second)
+        self.assertEqual(merged.parsed, total.parsed)
+        self.assertEqual(merged.failing, total.failing)
+
+    def test_pickle(self):
+        coverage = self._coverage('dqsv1.swf')
+        new = pickle.loads(pickle.dumps(coverage))
+        self.assertEqual(new.report(), coverage.report())
+
+    def test_report(self):
+        lines = self._coverage('1252533834.swf').report(top=2)
+        self.assertEqual(lines, [
+            "Coverage is 99.7% of 726 total items",
+            "Most common parsed objects:",
+            "  316 CurvedEdgeRecord",
+            "  203 StraightEdgeRecord",
+            "Most common Unknown objects",
+            "    2 DefineMorphShape2",
+        ])
+
+    def test_empty(self):
+        coverage = Coverage()
+        self.assertEqual(coverage.total, 0)
+        self.assertEqual(coverage.percentage, 100)
+
+    def test_deep(self):
+        # no recursion, so any nesting is fine
+        value = []
+        for _ in range(10000):
+            value = [value]
+        coverage = Coverage()
+        coverage.add(value)
+        self.assertEqual(coverage.total, 0)
+
+
+class NestedSpritesTestCase(unittest.TestCase):
+    """Process the nested sprites."""
+
+    def _parse(self, depth, **kwargs):
+        data = synth.generate(compression='FWS', shapes=1, edges=1, fonts=0,
+                              bitmaps=0, actions=0, sprite_depth=depth)
+        with warnings.catch_warnings(record=True) as warned:
+            warnings.simplefilter("always")
+            swf = SWFParser(io.BytesIO(data), **kwargs)
+        return swf, warned
+
+    def _depth(self, swf):
+        """Return the depth of the nested sprites, and the innermost."""
+        depth = 0
+        (tag,) = [tag for tag in swf.tags if tag.name == 'DefineSprite']
+        while type(tag).__name__ == 'DefineSprite':
+            depth += 1
+            inner = [tag for tag in tag.ControlTags
+                     if tag.name == 'DefineSprite']
+            if not inner:
+                break
+            (tag,) = inner
+        return depth, tag
+
+    def test_deeper_than_recursion(self):
+        swf, warned = self._parse(3000, max_sprite_depth=5000)
+        self.assertEqual(warned, [])
+        depth, innermost = self._depth(swf)
+        self.assertEqual(depth, 3000)
+        self.assertEqual([tag.name for tag in innermost.ControlTags],
+                         ['PlaceObject2', 'ShowFrame'])
+
+    def test_limit(self):
+        with self.assertRaises(LimitExceeded) as cm:
+            self._parse(8, max_sprite_depth=5)
+        self.assertEqual(cm.exception.limit, 'max_depth')
+        self.assertEqual(cm.exception.value, 6)
+
+        swf, warned = self._parse(5, max_sprite_depth=5)
+        self.assertEqual(self._depth(swf)[0], 5)
+        self.assertEqual(warned, [])
+
+    def test_limit_in_limits(self):
+        limits = Limits(max_depth=5)
+        with self.assertRaises(LimitExceeded) as cm:
+            self._parse(8, max_sprite_depth=50, limits=limits)
+        self.assertEqual((cm.exception.limit, cm.exception.value),
+                         ('max_depth', 6))
+        swf, _ = self._parse(8, max_sprite_depth=5, limits=Limits(max_depth=8))
+        self.assertEqual(self._depth(swf)[0], 8)
+
+    def test_default_limit(self):
+        self.assertEqual(SWFParser.max_sprite_depth, 100)
+        self.assertRaises(LimitExceeded, self._parse, 101)
+        swf, _ = self._parse(100)
+        self.assertEqual(self._depth(swf)[0], 100)
+
+        with patch.object(SWFParser, 'max_sprite_depth', 200):
+            swf, warned = self._parse(101)
+        self.assertEqual(warned, [])
+
+    def test_parallel(self):
+        swf, _ = self._parse(8, max_sprite_depth=8)
+        parallel, _ = self._parse(8, max_sprite_depth=8, jobs=2)
+        self.assertEqual(self._depth(parallel)[0], 8)
+        self.assertEqual([str(tag) for tag in parallel.tags],
+                         [str(tag) for tag in swf.tags])
+        with self.assertRaises(LimitExceeded):
+            self._parse(8, max_sprite_depth=5, jobs=2)
+
+    def test_profile(self):
+        swf, _ = self._parse(300, max_sprite_depth=500, profile=True)
+        self.assertEqual(swf.profile.tags['DefineSprite'].count, 300)
+        self.assertEqual(swf.profile.tags['DefineSprite'].ok, 300)
+
+    def test_visitor(self):
+        data = synth.generate(compression='FWS', shapes=1, edges=1, fonts=0,
+                              bitmaps=0, actions=0, sprite_depth=2000)
+
+        class Counter(visitor.Visitor):
+            sprites = 0
+
+            def tag_start(self, name, length):
+                if name == 'DefineSprite':
+                    self.sprites += 1
+                return visitor.RECORDS
+
+        counter = Counter()
+        with patch.object(SWFParser, 'max_sprite_depth', 3000):
+            visitor.visit(io.BytesIO(data), counter)
+        self.assertEqual(counter.sprites, 2000)
+
+
+def _tag(tag_type, payload):
+    """Build a tag with a long header."""
+    return struct.pack("<HI", tag_type << 6 | 0x3f, len(payload)) + payload
+
+
+def _fws(*tags):
+    """Build a FWS file with the given tags."""
+    body = b'\x00' + struct.pack("<HH", 0x1800, 1) + b''.join(tags) + b'\0\0'
+    return b'FWS\x0a' + struct.pack("<I", 8 + len(body)) + body
+
+
+class TagBoundsTestCase(unittest.TestCase):
+    """Each tag is decoded from exactly its bytes."""
+
+    def _parse(self, data):
+        with warnings.catch_warnings(record=True) as warned:
+            warnings.simplefilter("always")
+            swf = SWFParser(io.BytesIO(data))
+        return swf, [str(warning.message) for warning in warned]
+
+    def test_overrun(self):
+        # the background color needs 3 bytes
+        swf, warned = self._parse(_fws(_tag(9, b'\x01\x02'), _tag(1, b'')))
+        bad, show = swf.tags
+        self.assertEqual(type(bad).__name__, 'FailingObject')
+        self.assertEqual(bad.raw_payload, b'\x01\x02')
+        self.assertEqual(show.name, 'ShowFrame')
+        self.assertEqual(len(warned), 1)
+
+    def test_underrun(self):
+        swf, warned = self._parse(
+            _fws(_tag(9, b'\x01\x02\x03\x04'), _tag(1, b'')))
+        bad, show = swf.tags
+        self.assertEqual(type(bad).__name__, 'FailingObject')
+        self.assertEqual(bad.raw_payload, b'\x01\x02\x03\x04')
+        self.assertIn("Bad reading quantity", warned[0])
+        self.assertEqual(show.name, 'ShowFrame')
+
+    def test_raw_bytes_short(self):
+        # DefineBitsJPEG3 with the alpha data offset after the tag end
+        payload = struct.pack("<HI", 1, 1000) + b'\xff\xd8'
+        swf, warned = self._parse(_fws(_tag(35, payload), _tag(1, b'')))
+        bad, show = swf.tags
+        self.assertEqual(type(bad).__name__, 'FailingObject')
+        self.assertEqual(bad.raw_payload, payload)
+        self.assertIn("Not enough data", warned[0])
+
+    def test_sprite_content_exceeds(self):
+        # the ShowFrame inside the sprite is cut by the sprite's end
+        inner = _tag(1, b'') + b'\0\0'
+        payload = struct.pack("<HH", 5, 1) + inner[:4]
+        following = _tag(9, b'\x01\x02\x03')
+        swf, warned = self._parse(_fws(_tag(39, payload), following))
+        bad, color = swf.tags
+        self.assertEqual(type(bad).__name__, 'FailingObject')
+        self.assertEqual(bad.raw_payload, payload)
+        self.assertIn("processing DefineSprite", warned[0])
+        self.assertEqual(color.name, 'SetBackgroundColor')
+
+    def test_nested_sprite_content_exceeds(self):
+        # the nested sprites can not read past their end (here, the
+        # header of the tag inside)
+        inner = _tag(1, b'') + b'\0\0'
+        nested = _tag(39, struct.pack("<HH", 6, 1) + inner[:4])
+        payload = struct.pack("<HH", 5, 1) + nested + inner
+        swf, warned = self._parse(_fws(_tag(39, payload), _tag(1, b'')))
+        self.assertEqual(warned, [
+            "processing DefineSprite tag: unpack requires a buffer of "
+            "4 bytes"])
+        sprite, show = swf.tags
+        bad, inner_show = sprite.ControlTags
+        self.assertEqual(type(bad).__name__, 'FailingObject')
+        self.assertEqual(inner_show.name, 'ShowFrame')
+        self.assertEqual(show.name, 'ShowFrame')
+
+    def test_big_tags(self):
+        # decoded from the source, with the same result
+        data = synth.generate(compression='FWS', bitmaps=2, bitmap_size=200)
+        swf, _ = self._parse(data)
+        with patch.object(swfparser, 'BUFFERED_TAG_SIZE', 0):
+            unbuffered, _ = self._parse(data)
+        self.assertEqual([repr(tag) for tag in unbuffered.tags],
+                         [repr(tag) for tag in swf.tags])
+
+    def test_sprite_without_end(self):
+        payload = struct.pack("<HH", 5, 1) + _tag(1, b'')
+        swf, warned = self._parse(_fws(_tag(39, payload), _tag(1, b'')))
+        bad, show = swf.tags
+        self.assertEqual(type(bad).__name__, 'FailingObject')
+        self.assertEqual(bad.raw_payload, payload)
+        self.assertEqual(show.name, 'ShowFrame')
+
+    def _peak(self, data):
+        """Parse, returning also the peak of memory used."""
+        tracemalloc.start()
+        try:
+            swf, warned = self._parse(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return swf, warned, peak
+
+    def test_big_tag_overrun(self):
+        # a big DoAction (not copied) with a string without end, followed
+        # by a bigger tag: the string is not searched in the next tag
+        def pool(size, length=None):
+            string = b'a' * size + b'\0'
+            if length is None:
+                length = len(string) + 2
+            return b'\x88' + struct.pack("<HH", length, 1) + string
+
+        first = pool(60000)
+        bad = first + pool(10000, 0xffff)[:-1]
+        following = _tag(1023, b'x' * 1024 ** 2)
+        data = _fws(_tag(12, bad), following, _tag(1, b''))
+        swf, warned, peak = self._peak(data)
+        self.assertEqual(warned[0],
+                         "processing DoAction tag: String without end")
+        failing, unknown, show = swf.tags
+        self.assertEqual(type(failing).__name__, 'FailingObject')
+        self.assertEqual(failing.raw_payload, bad)
+        self.assertEqual(len(unknown.raw_payload), 1024 ** 2)
+        self.assertEqual(show.name, 'ShowFrame')
+
+        # about the same memory than when the string is fine
+        good = first + pool(10000) + b'\0'
+        data = _fws(_tag(12, good), following, _tag(1, b''))
+        swf, _, ok_peak = self._peak(data)
+        self.assertEqual(swf.tags[0].name, 'DoAction')
+        self.assertLess(peak, ok_peak * 1.5)
+
+    def test_sprite_ok(self):
+        payload = struct.pack("<HH", 5, 1) + _tag(1, b'') + b'\0\0'
+        swf, warned = self._parse(_fws(_tag(39, payload), _tag(1, b'')))
+        self.assertEqual(warned, [])
+        sprite, show = swf.tags
+        self.assertEqual([tag.name for tag in sprite.ControlTags],
+                         ['ShowFrame'])
+
+
+class TruncatedTestCase(unittest.TestCase):
+    """Parse files that end before they should."""
+
+    def _check(self, data, cut, **kwargs):
+        full = SWFParser(io.BytesIO(data))
+        swf = SWFParser(io.BytesIO(data[:cut]), allow_truncated=True,
+                        warn=False, **kwargs)
+        self.assertTrue(swf.partial)
+        self.assertLess(len(swf.tags), len(full.tags))
+        self.assertEqual([repr(tag) for tag in swf.tags],
+                         [repr(tag) for tag in full.tags[:len(swf.tags)]])
+        (event,) = swf.diagnostics
+        self.assertEqual(event.code, 'truncated')
+        return swf, event
+
+    def test_fws(self):
+        data = synth.generate(compression='FWS')
+        swf, event = self._check(data, len(data) // 2)
+        self.assertEqual(swf.truncated_at, len(data) // 2)
+        # the cut tag is after the returned ones, and includes the cut
+        self.assertLess(event.offset, swf.truncated_at)
+        self.assertGreater(event.offset + 6 + event.length,
+                           swf.truncated_at)
+
+    def test_compressed(self):
+        for compression in ('CWS', 'ZWS'):
+            data = synth.generate(compression=compression)
+            swf, event = self._check(data, len(data) // 2)
+            self.assertLess(event.offset, swf.truncated_at)
+            self.assertLess(swf.truncated_at, swf.header.FileLength)
+
+    def test_parallel(self):
+        data = synth.generate(compression='CWS')
+        serial, _ = self._check(data, len(data) // 2)
+        parallel, _ = self._check(data, len(data) // 2, jobs=2)
+        self.assertEqual(list(parallel.diagnostics),
+                         list(serial.diagnostics))
+        self.assertEqual(parallel.truncated_at, serial.truncated_at)
+
+    def test_in_tag_header(self):
+        data = _fws(_tag(1, b''), _tag(1, b''))
+        # the second tag has only 4 of its 6 bytes of header
+        swf, event = self._check(data, len(data) - 2 - 2)
+        self.assertEqual(len(swf.tags), 1)
+        self.assertEqual(event.tag_type, 1)
+        self.assertIsNone(event.length)
+        self.assertEqual(event.offset, len(data) - 2 - 6)
+
+    def test_without_end(self):
+        data = _fws(_tag(1, b''))
+        swf = SWFParser(io.BytesIO(data[:-2]), allow_truncated=True,
+                        warn=False)
+        self.assertTrue(swf.partial)
+        self.assertEqual([tag.name for tag in swf.tags], ['ShowFrame'])
+        (event,) = swf.diagnostics
+        self.assertIsNone(event.tag_type)
+        self.assertEqual(swf.truncated_at, len(data) - 2)
+
+    def test_complete(self):
+        data = synth.generate(compression='ZWS')
+        swf = SWFParser(io.BytesIO(data), allow_truncated=True)
+        self.assertFalse(swf.partial)
+        self.assertIsNone(swf.truncated_at)
+        self.assertEqual(len(swf.diagnostics), 0)
+
+    def test_not_allowed(self):
+        data = synth.generate(compression='CWS')
+        with self.assertRaises(ValueError):
+            SWFParser(io.BytesIO(data[:len(data) // 2]))
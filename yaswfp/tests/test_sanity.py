@@ -22,7 +22,7 @@ import unittest
 
 from unittest import mock
 
-from yaswfp.swfparser import SWFParser, parsefile
+from yaswfp.swfparser import CHARACTER_TAGS, SWFParser, parsefile
 
 BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
 
@@ -399,6 +399,49 @@ class SanityTestCase(unittest.TestCase):
         for tag_name, real_tag in itertools.zip_longest(should_tags, swf.tags):
             self.assertEqual(real_tag.name, tag_name)
 
+    def test_symbols_index(self):
+        swf = parsefile(os.path.join(BASEDIR, 'wivet1.swf'))
+
+        t = swf.tags[8]
+        self.assertEqual(t.name, 'DoABC')
+        self.assertEqual(_get_attribs(t), {'Flags', 'Name', 'ABCData'})
+
+        t = swf.tags[9]
+        self.assertEqual(t.name, 'SymbolClass')
+        self.assertEqual(_get_attribs(t), {'NumSymbols', 'Tag1', 'Name1'})
+
+        self.assertEqual(swf.symbols, {'wivet1': 0})
+        symbol = swf.resolve_symbol('wivet1')
+        self.assertEqual(symbol.CharacterId, 0)
+        self.assertIsNone(symbol.Tag)
+        self.assertIs(symbol.ABCTag, swf.tags[8])
+        self.assertRaises(KeyError, swf.resolve_symbol, 'missing')
+
+    def test_characters_index(self):
+        swf = parsefile(os.path.join(BASEDIR, 'subscribe.swf'))
+        self.assertIs(swf.characters[1], swf.tags[1])
+        self.assertEqual(swf.characters[1].name, 'DefineShape')
+
+    def test_characters_index_only_definitions(self):
+        # the font is followed by its DefineFontAlignZones and
+        # DefineFontName, that refer to the same font id
+        swf = parsefile(os.path.join(BASEDIR, 'dqsv1.swf'))
+        names = {tag.name for tag in swf.tags}
+        self.assertIn('DefineFontAlignZones', names)
+        self.assertIn('DefineFontName', names)
+        self.assertEqual(swf.characters[8].name, 'DefineFont3')
+        self.assertEqual(swf.characters[12].name, 'DefineFont3')
+        self.assertLessEqual({tag.name for tag in swf.characters.values()},
+                             CHARACTER_TAGS)
+
+    def test_parallel_decoding(self):
+        for fname in os.listdir(BASEDIR):
+            fpath = os.path.join(BASEDIR, fname)
+            swf = parsefile(fpath)
+            swf_parallel = parsefile(fpath, jobs=2)
+            self.assertEqual([repr(t) for t in swf_parallel.tags],
+                             [repr(t) for t in swf.tags])
+
     def test_subscribe(self):
         with mock.patch.object(SWFParser, 'unknown_alert', True):
             swf = parsefile(os.path.join(BASEDIR, 'subscribe.swf'))
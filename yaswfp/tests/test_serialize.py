@@ -0,0 +1,116 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Tests for the serialization."""
+
+import io
+import os
+import unittest
+import warnings
+
+from yaswfp import serialize
+from yaswfp.swfparser import _freeze, _make_object, parsefile
+
+BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
+
+
+class RoundtripTestCase(unittest.TestCase):
+    """Dump and load."""
+
+    def _check_same(self, new, swf):
+        self.assertEqual(repr(new.header), repr(swf.header))
+        self.assertEqual([repr(t) for t in new.tags],
+                         [repr(t) for t in swf.tags])
+        self.assertEqual([type(t).__name__ for t in new.tags],
+                         [type(t).__name__ for t in swf.tags])
+
+    def test_samples(self):
+        for fname in os.listdir(BASEDIR):
+            swf = parsefile(os.path.join(BASEDIR, fname))
+            fh = io.BytesIO()
+            serialize.dump(swf, fh)
+            fh.seek(0)
+            new = serialize.load(fh)
+            self._check_same(new, swf)
+            self.assertEqual(new.symbols, swf.symbols)
+            self.assertEqual(new.characters.keys(), swf.characters.keys())
+
+    def test_values(self):
+        swf = parsefile(os.path.join(BASEDIR, 'wivet1.swf'))
+        obj = _make_object("Test")
+        obj.Ints = [0, 1, -1, -64, -65, 175, 176, 127, 128, -129, 2 ** 70,
+                    -2 ** 70]
+        obj.Floats = (0.5, -3.25)
+        obj.Misc = {'a': None, 'b': True, 'c': False, 'd': b'\x00\xff'}
+        obj.Text = "ñandú"
+        swf.tags.append(obj)
+        new = serialize.loads(serialize.dumps(swf))
+        self._check_same(new, swf)
+        self.assertEqual(new.tags[-1].Ints, obj.Ints)
+        self.assertEqual(new.tags[-1].Floats, obj.Floats)
+        self.assertEqual(new.tags[-1].Misc, obj.Misc)
+        self.assertEqual(new.tags[-1].Text, obj.Text)
+
+    def test_outcome(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            swf = parsefile(os.path.join(BASEDIR, 'wivet1.swf'),
+                            max_diagnostics=1)
+        swf.partial = True
+        swf.truncated_at = 1234
+        with warnings.catch_warnings(record=True) as warned:
+            warnings.simplefilter("always")
+            new = serialize.loads(serialize.dumps(swf))
+        self.assertEqual(warned, [])
+        self.assertEqual(list(new.diagnostics), list(swf.diagnostics))
+        self.assertEqual(new.diagnostics.counts, swf.diagnostics.counts)
+        self.assertEqual(new.diagnostics.dropped, 1)
+        self.assertEqual(new.diagnostics.limit, 1)
+        self.assertTrue(new.partial)
+        self.assertEqual(new.truncated_at, 1234)
+
+    def test_frozen(self):
+        swf = parsefile(os.path.join(BASEDIR, 'subscribe.swf'))
+        swf.tags = _freeze(swf.tags)
+        should = [repr(t) for t in swf.tags]
+        new = serialize.loads(serialize.dumps(swf))
+        self.assertIsInstance(new.tags, tuple)
+        self.assertEqual([repr(t) for t in new.tags], should)
+        new.tags[0].Foo = 1  # loaded objects are not frozen
+
+    def test_names_once(self):
+        swf = parsefile(os.path.join(BASEDIR, '1252533834.swf'))
+        serialized = serialize.dumps(swf)
+        self.assertEqual(serialized.count(b'PlaceObject2'), 1)
+        self.assertEqual(serialized.count(b'PlaceFlagHasMatrix'), 1)
+
+
+class ErrorsTestCase(unittest.TestCase):
+    """Bad serialized data."""
+
+    def setUp(self):
+        swf = parsefile(os.path.join(BASEDIR, 'wivet1.swf'))
+        self.serialized = serialize.dumps(swf)
+
+    def test_bad_magic(self):
+        self.assertRaises(ValueError, serialize.loads, b'garbage')
+
+    def test_bad_version(self):
+        data = serialize.MAGIC + b'\x63' + self.serialized[5:]
+        self.assertRaises(ValueError, serialize.loads, data)
+
+    def test_truncated(self):
+        self.assertRaises(ValueError, serialize.loads, self.serialized[:-10])
@@ -0,0 +1,153 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Tests for the synthetic SWF generator."""
+
+import io
+import tracemalloc
+import unittest
+import warnings
+
+from yaswfp import synth
+from yaswfp.swfparser import SWFParser
+
+
+class _Sink(io.RawIOBase):
+    """A file object that can not seek, and only counts the bytes."""
+
+    def __init__(self):
+        self.written = bytearray()
+        self.keep = True
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.keep:
+            self.written += data
+        return len(data)
+
+
+def _parse(data):
+    """Parse the SWF, failing on any warning."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        return SWFParser(io.BytesIO(data), unknown_alert=True)
+
+
+class BitWriterTestCase(unittest.TestCase):
+    """Write bits."""
+
+    def test_unsigned(self):
+        bw = synth.BitWriter()
+        bw.u_put(1, 1)
+        bw.u_put(0, 2)
+        bw.u_put(5, 3)
+        bw.u_put(0x1FF, 9)
+        self.assertEqual(bw.getvalue(), b'\x97\xfe')
+
+    def test_signed(self):
+        bw = synth.BitWriter()
+        bw.s_put(-1, 4)
+        bw.s_put(3, 4)
+        bw.s_put(-8, 4)
+        self.assertEqual(bw.getvalue(), b'\xf3\x80')
+
+
+class GenerateTestCase(unittest.TestCase):
+    """Generate the files."""
+
+    def test_deterministic(self):
+        self.assertEqual(synth.generate(seed=7), synth.generate(seed=7))
+        self.assertNotEqual(synth.generate(seed=7), synth.generate(seed=8))
+
+    def test_compressions(self):
+        for compression in synth.COMPRESSIONS:
+            swf = _parse(synth.generate(compression=compression))
+            self.assertEqual(swf.header.Signature, compression)
+            self.assertEqual([t.name for t in swf.tags], [
+                'DefineShape'] * 10 + ['DefineFont3', 'DefineBitsLossless2',
+                                       'DefineSprite', 'DoAction',
+                                       'ShowFrame'])
+
+    def test_bad_compression(self):
+        with self.assertRaises(ValueError):
+            synth.generate(compression='XWS')
+
+    def test_mix(self):
+        swf = _parse(synth.generate(
+            shapes=2, edges=500, fonts=1, glyphs=300, bitmaps=1,
+            bitmap_size=100, sprite_depth=6, actions=50))
+        shapes = [t for t in swf.tags if t.name == 'DefineShape']
+        self.assertEqual(len(shapes), 2)
+        for shape in shapes:
+            # the style change, and the edges
+            self.assertEqual(len(shape.Shapes.ShapeRecords), 501)
+
+        (font,) = [t for t in swf.tags if t.name == 'DefineFont3']
+        self.assertEqual(font.NumGlyphs, 300)
+        self.assertEqual(len(font.GlyphShapeTable[0].ShapeRecords), 51)
+
+        (bitmap,) = [t for t in swf.tags if t.name == 'DefineBitsLossless2']
+        self.assertEqual((bitmap.BitmapWidth, bitmap.BitmapHeight),
+                         (100, 100))
+        self.assertEqual(len(bitmap.BitmapPixelData), 100 * 100 * 4)
+
+        (sprite,) = [t for t in swf.tags if t.name == 'DefineSprite']
+        depth = 0
+        while sprite is not None:
+            depth += 1
+            inner = [t for t in sprite.ControlTags
+                     if t.name == 'DefineSprite']
+            sprite = inner[0] if inner else None
+        self.assertEqual(depth, 6)
+
+        (action,) = [t for t in swf.tags if t.name == 'DoAction']
+        self.assertEqual(len(action.Actions), 50 * 5)
+
+    def test_empty_mix(self):
+        swf = _parse(synth.generate(shapes=0, fonts=0, bitmaps=0,
+                                    sprite_depth=0, actions=0))
+        self.assertEqual([t.name for t in swf.tags], ['ShowFrame'])
+
+    def test_size(self):
+        data = synth.generate(compression='FWS', size=200000)
+        self.assertGreaterEqual(len(data), 200000)
+        swf = _parse(data)
+        self.assertEqual(swf.header.FileLength, len(data))
+        frames = [t for t in swf.tags if t.name == 'ShowFrame']
+        self.assertEqual(swf.header.FrameCount, len(frames))
+        self.assertGreater(len(frames), 1)
+
+    def test_zws_not_seekable(self):
+        sink = _Sink()
+        synth.write(sink, compression='ZWS', size=100000)
+        self.assertEqual(bytes(sink.written),
+                         synth.generate(compression='ZWS', size=100000))
+
+    def test_streaming(self):
+        # the generated tags are not kept in memory (small mixes, so the
+        # tags of only one mix are not much)
+        sink = _Sink()
+        sink.keep = False
+        tracemalloc.start()
+        try:
+            synth.write(sink, compression='FWS', size=100000, shapes=1,
+                        fonts=0, bitmaps=0, sprite_depth=0, actions=10)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 20000)
@@ -0,0 +1,193 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Tests for the visitor API."""
+
+import io
+import os
+import unittest
+import warnings
+
+from yaswfp import visitor
+from yaswfp.swfparser import (
+    ACTION_NAMES, TAG_NAMES, SWFObject, parsefile)
+
+BASEDIR = os.path.join(os.path.dirname(__file__), 'samples')
+
+
+def _visit(fname, the_visitor):
+    """Visit the sample file."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        with open(os.path.join(BASEDIR, fname), 'rb') as fh:
+            return visitor.visit(fh, the_visitor)
+
+
+def _parse(fname):
+    """Parse the sample file."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return parsefile(os.path.join(BASEDIR, fname))
+
+
+def _find(value, names):
+    """Return all the objects with those names, all the way down."""
+    found = []
+    pending = [value]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, SWFObject):
+            if value.name in names:
+                found.append(value)
+            pending.extend(getattr(value, name) for name in value._attribs)
+        elif isinstance(value, (list, tuple)):
+            pending.extend(reversed(value))
+    return found
+
+
+class _Recorder(visitor.Visitor):
+    """Record all the events."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.events = []
+
+    def start(self, header):
+        self.events.append(('start', header.Signature))
+
+    def end(self):
+        self.events.append(('end',))
+
+    def tag_start(self, name, length):
+        self.events.append(('tag_start', name, length))
+        return self.mode
+
+    def payload(self, name, data):
+        self.events.append(('payload', name, len(data)))
+
+    def tag_end(self, name, tag):
+        self.events.append(('tag_end', name, tag))
+
+    def straight_edge(self, delta_x, delta_y):
+        self.events.append(('straight', delta_x, delta_y))
+
+    def curved_edge(self, *deltas):
+        self.events.append(('curved',) + deltas)
+
+    def style_change(self, record):
+        self.events.append(('style', record.name))
+
+    def shape_end(self):
+        self.events.append(('shape_end',))
+
+    def glyph(self, index, code):
+        self.events.append(('glyph', index, code))
+
+    def action(self, name, length):
+        self.events.append(('action', name, length))
+
+    def of_kind(self, kind):
+        return [event for event in self.events if event[0] == kind]
+
+
+class VisitorTestCase(unittest.TestCase):
+    """The visitor API."""
+
+    def test_tree_builder(self):
+        for fname in sorted(os.listdir(BASEDIR)):
+            builder = _visit(fname, visitor.TreeBuilder())
+            swf = _parse(fname)
+            self.assertEqual(str(builder.header), str(swf.header))
+            self.assertEqual([str(tag) for tag in builder.tags],
+                             [str(tag) for tag in swf.tags])
+
+    def test_skip(self):
+        recorder = _visit('subscribe.swf', _Recorder(visitor.SKIP))
+        swf = _parse('subscribe.swf')
+        self.assertEqual(recorder.events[0], ('start', 'CWS'))
+        self.assertEqual(recorder.events[-1], ('end',))
+        # only the first level tags, as the sprites are not entered
+        self.assertEqual([event[1] for event in recorder.of_kind('tag_end')],
+                         [tag.name for tag in swf.tags])
+        self.assertEqual(
+            len(recorder.events), 2 + 2 * len(swf.tags))
+        self.assertTrue(all(event[2] is None
+                            for event in recorder.of_kind('tag_end')))
+
+    def test_payload(self):
+        recorder = _visit('subscribe.swf', _Recorder(visitor.PAYLOAD))
+        starts = recorder.of_kind('tag_start')
+        payloads = recorder.of_kind('payload')
+        self.assertEqual(payloads, [('payload', name, length)
+                                    for _, name, length in starts])
+
+    def test_records(self):
+        recorder = _visit('subscribe.swf', _Recorder(visitor.RECORDS))
+        swf = _parse('subscribe.swf')
+
+        # the tags inside sprites are visited too
+        names = _find(swf.tags, set(TAG_NAMES.values()))
+        self.assertEqual(len(recorder.of_kind('tag_start')), len(names))
+
+        edges = _find(swf.tags, {'StraightEdgeRecord', 'CurvedEdgeRecord'})
+        self.assertEqual(
+            len(recorder.of_kind('straight')) +
+            len(recorder.of_kind('curved')), len(edges))
+        straight = [('straight', getattr(edge, 'DeltaX', 0),
+                     getattr(edge, 'DeltaY', 0))
+                    for edge in edges if edge.name == 'StraightEdgeRecord']
+        self.assertEqual(recorder.of_kind('straight'), straight)
+        curved = [('curved', edge.ControlDeltaX, edge.ControlDeltaY,
+                   edge.AnchorDeltaX, edge.AnchorDeltaY)
+                  for edge in edges if edge.name == 'CurvedEdgeRecord']
+        self.assertEqual(recorder.of_kind('curved'), curved)
+
+        styles = _find(swf.tags, {'StyleChangeRecord'})
+        self.assertEqual(len(recorder.of_kind('style')), len(styles))
+
+        fonts = _find(swf.tags, {'DefineFont2', 'DefineFont3'})
+        self.assertEqual(
+            recorder.of_kind('glyph'),
+            [('glyph', index, code) for font in fonts
+             for index, code in enumerate(font.CodeTable)])
+
+        actions = _find(swf.tags, set(ACTION_NAMES.values()))
+        self.assertEqual([event[1] for event in recorder.of_kind('action')],
+                         [action.name for action in actions])
+
+    def test_shape_end(self):
+        recorder = _visit('subscribe.swf', _Recorder(visitor.RECORDS))
+        swf = _parse('subscribe.swf')
+        shapes = _find(swf.tags, {'Shape', 'ShapeWithStyle'})
+        morphs = _find(swf.tags, {'DefineMorphShape', 'DefineMorphShape2'})
+        self.assertEqual(len(recorder.of_kind('shape_end')),
+                         len(shapes) + 2 * len(morphs))
+
+    def test_bad_mode(self):
+        with self.assertRaises(ValueError):
+            _visit('subscribe.swf', _Recorder('whatever'))
+
+    def test_base_does_nothing(self):
+        base = visitor.Visitor()
+        self.assertIs(_visit('subscribe.swf', base), base)
+        self.assertEqual(base.tag_start('ShowFrame', 0), visitor.SKIP)
+
+    def test_from_bytes(self):
+        with open(os.path.join(BASEDIR, 'wivet1.swf'), 'rb') as fh:
+            data = fh.read()
+        builder = visitor.visit(io.BytesIO(data), visitor.TreeBuilder())
+        self.assertEqual(builder.header.Signature, 'CWS')
+        self.assertTrue(builder.tags)
@@ -0,0 +1,122 @@
+# Copyright 2014 Facundo Batista
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# For further info, check  http://github.com/facundobatista/yaswfp
+
+"""Walk the SWF content calling a visitor, without building all the tree."""
+
+from .swfparser import SWFParser
+
+# what to do with each tag, as answered by the visitor's tag_start
+SKIP = 'skip'
+PAYLOAD = 'payload'
+RECORDS = 'records'
+BUILD = 'build'
+
+
+class Visitor:
+    """The base for the visitors, which do nothing.
+
+    It's called with the header in `start`, and then for each tag (also
+    those inside sprites, unless the sprite is skipped or built) with
+    `tag_start`, which returns what to do with the tag:
+
+    - SKIP: the tag is not even read.
+
+    - PAYLOAD: the tag is not decoded, its bytes are given to `payload`.
+
+    - RECORDS: the tag is decoded, but the shape edges, glyph codes and
+      actions are given to the visitor without building objects for them
+      (the style changes of the shapes are built and given to
+      `style_change`, and `shape_end` is called after the records of each
+      shape). The tags inside a sprite are visited too.
+
+    - BUILD: the tag object is built, as the parser would do.
+
+    After that, `tag_end` is called with the tag object if it was built
+    (None otherwise). Finally, `end` is called.
+    """
+
+    def start(self, header):
+        """The header of the file was parsed."""
+
+    def end(self):
+        """All the tags were visited."""
+
+    def tag_start(self, name, length):
+        """A tag starts; return what to do with it (default to skip it)."""
+        return SKIP
+
+    def payload(self, name, data):
+        """The bytes of the current tag."""
+
+    def tag_end(self, name, tag):
+        """The tag ended; the object is given if it was built."""
+
+    def straight_edge(self, delta_x, delta_y):
+        """A straight edge in the current shape."""
+
+    def curved_edge(self, control_delta_x, control_delta_y,
+                    anchor_delta_x, anchor_delta_y):
+        """A curved edge in the current shape."""
+
+    def style_change(self, record):
+        """A style change record in the current shape."""
+
+    def shape_end(self):
+        """The current shape ended (fonts have one shape per glyph)."""
+
+    def glyph(self, index, code):
+        """The code of a glyph of the current font (after the shapes)."""
+
+    def action(self, name, length):
+        """An action (its payload is not decoded)."""
+
+
+class TreeBuilder(Visitor):
+    """Build all the tags, getting what SWFParser gets."""
+
+    def __init__(self):
+        self.header = None
+        self.tags = []
+
+    def start(self, header):
+        """Keep the header."""
+        self.header = header
+
+    def tag_start(self, name, length):
+        """Build all the tags."""
+        return BUILD
+
+    def tag_end(self, name, tag):
+        """Keep the tag."""
+        self.tags.append(tag)
+
+
+def visit(src, visitor, read_twips=True, unknown_alert=None):
+    """Parse the SWF from the file object, calling the visitor.
+
+    The tags that fail to be decoded (or are unknown) are handled as by
+    SWFParser, but note that the visitor may have received some of their
+    records before the failure. Return the visitor.
+    """
+    if unknown_alert is None:
+        unknown_alert = SWFParser.unknown_alert
+    parser = SWFParser.__new__(SWFParser)
+    parser._init_state(src, read_twips, unknown_alert)
+    visitor.start(parser._get_header())
+    parser._visitor = visitor
+    parser._process_tags()
+    visitor.end()
+    return visitor